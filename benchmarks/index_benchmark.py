@@ -0,0 +1,90 @@
+"""Time the hot read queries on a synthetic database before and after the
+index migration.
+
+Usage: python benchmarks/index_benchmark.py [matches] [players]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from database.migrations import MIGRATIONS, migrate
+
+QUERIES = {
+    'player win/loss (OR predicate)': ('''
+        SELECT COUNT(*),
+            SUM(CASE WHEN (player1_id = ? AND player1_score > player2_score) OR
+                        (player2_id = ? AND player2_score > player1_score)
+                    THEN 1 ELSE 0 END)
+        FROM matches WHERE player1_id = ? OR player2_id = ?
+    ''', lambda p: (p, p, p, p)),
+    'last 5 matches by timestamp': ('''
+        SELECT player1_score, player2_score FROM matches
+        WHERE player1_id = ? OR player2_id = ?
+        ORDER BY timestamp DESC LIMIT 5
+    ''', lambda p: (p, p)),
+    'rating history join': ('''
+        SELECT rh.mu, rh.sigma, m.timestamp FROM ratings_history rh
+        JOIN matches m ON rh.match_id = m.match_id
+        WHERE rh.player_id = ? ORDER BY m.timestamp ASC
+    ''', lambda p: (p,)),
+    'peak rating': ('SELECT MAX(mu) FROM ratings_history WHERE player_id = ?', lambda p: (p,)),
+    'pre-match ratings by match': ('SELECT player_id, mu FROM ratings_history WHERE match_id = ?',
+                                   lambda p: (p * 997,)),
+    'season matches': ('''
+        SELECT COUNT(*) FROM matches WHERE season = ? ORDER BY timestamp
+    ''', lambda p: (p % 4 + 1,)),
+    'one week of matches': ('''
+        SELECT COUNT(*) FROM matches WHERE timestamp BETWEEN ? AND ?
+    ''', lambda p: ('2024-03-01 00:00:00', '2024-03-07 23:59:59')),
+}
+
+def build(path, n_matches, n_players, seed=1):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    MIGRATIONS[0](conn)
+    conn.execute('PRAGMA user_version = 1')
+    conn.executemany('INSERT INTO players (name, mu, sigma) VALUES (?, 25.0, 8.333)',
+                     [(f'Player {i}',) for i in range(n_players)])
+    matches, history = [], []
+    for i in range(1, n_matches + 1):
+        p1, p2 = rng.sample(range(1, n_players + 1), 2)
+        ts = f'2024-{1 + i * 12 // (n_matches + 1):02d}-{1 + i % 28:02d} 12:{i % 60:02d}:00'
+        matches.append((i, ts, p1, p2, 11, rng.randint(0, 9), 1 + i * 4 // (n_matches + 1)))
+        history += [(p1, i, 25.0, 8.3), (p2, i, 25.0, 8.3)]
+    conn.executemany('INSERT INTO matches VALUES (?, ?, ?, ?, ?, ?, ?)', matches)
+    conn.executemany('INSERT INTO ratings_history (player_id, match_id, mu, sigma) VALUES (?, ?, ?, ?)',
+                     history)
+    conn.commit()
+    return conn
+
+def run(conn, n_players, repeat=20):
+    results = {}
+    for name, (sql, params) in QUERIES.items():
+        start = time.perf_counter()
+        for i in range(repeat):
+            conn.execute(sql, params(1 + i % n_players)).fetchall()
+        results[name] = (time.perf_counter() - start) / repeat * 1000
+    return results
+
+def main():
+    n_matches = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    n_players = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = build(os.path.join(tmp, 'bench.db'), n_matches, n_players)
+        before = run(conn, n_players)
+        start = time.perf_counter()
+        migrate(conn)
+        print(f"migration to v{len(MIGRATIONS)}: {time.perf_counter() - start:.1f}s")
+        after = run(conn, n_players)
+        conn.close()
+
+    print(f"{n_matches:,} matches, {n_players} players (ms per query)")
+    print(f"{'query':<32} {'before':>10} {'after':>10}")
+    for name in QUERIES:
+        print(f"{name:<32} {before[name]:>10.2f} {after[name]:>10.2f}")
+
+if __name__ == '__main__':
+    main()
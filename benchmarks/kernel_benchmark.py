@@ -0,0 +1,42 @@
+"""Benchmark the closed-form 1v1 kernel against trueskill.rate_1vs1.
+
+Usage: python benchmarks/kernel_benchmark.py [pairs]
+"""
+import os
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import numpy as np
+from trueskill import Rating, rate_1vs1, setup
+from core.trueskill_kernel import rate_1vs1 as rate_scalar, rate_1vs1_batch
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    setup(draw_probability=0)
+    rng = np.random.default_rng(7)
+    w_mu, l_mu = rng.uniform(0, 50, n), rng.uniform(0, 50, n)
+    w_sigma, l_sigma = rng.uniform(0.5, 8.4, n), rng.uniform(0.5, 8.4, n)
+    rows = list(zip(w_mu.tolist(), w_sigma.tolist(), l_mu.tolist(), l_sigma.tolist()))
+
+    start = time.perf_counter()
+    library = [rate_1vs1(Rating(a, b), Rating(c, d)) for a, b, c, d in rows]
+    t_library = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scalar = [rate_scalar(*row) for row in rows]
+    t_scalar = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = rate_1vs1_batch(w_mu, w_sigma, l_mu, l_sigma)
+    t_batch = time.perf_counter() - start
+
+    expected = np.array([(r1.mu, r1.sigma, r2.mu, r2.sigma) for r1, r2 in library]).T
+    print(f"{n:,} pairings")
+    print(f"trueskill.rate_1vs1: {t_library:.3f}s ({n / t_library:>12,.0f} pairs/sec)")
+    print(f"scalar kernel:       {t_scalar:.3f}s ({n / t_scalar:>12,.0f} pairs/sec)")
+    print(f"batch kernel:        {t_batch:.3f}s ({n / t_batch:>12,.0f} pairs/sec)")
+    print(f"max |diff| scalar: {np.max(np.abs(np.array(scalar).T - expected)):.2e}, "
+          f"batch: {np.max(np.abs(np.array(batch) - expected)):.2e}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Compare the per-match recompute path with the in-memory replay engine.
+
+Usage: python benchmarks/replay_benchmark.py [matches] [players]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from trueskill import Rating
+from core.match_processor import MatchProcessor
+
+def build_database(db_name, n_matches, n_players, seed=42):
+    rng = random.Random(seed)
+    processor = MatchProcessor(db_name)
+    with processor.db_handler.connection() as conn:
+        conn.executemany('INSERT INTO players (name, mu, sigma) VALUES (?, 25.0, 8.333)',
+                         [(f'Player {i}',) for i in range(n_players)])
+        rows = []
+        for i in range(n_matches):
+            p1, p2 = rng.sample(range(1, n_players + 1), 2)
+            s1, s2 = (11, rng.randint(0, 9)) if rng.random() < 0.5 else (rng.randint(0, 9), 11)
+            rows.append((f'2024-01-01 00:00:{i % 60:02d}', p1, p2, s1, s2))
+        conn.executemany('''
+            INSERT INTO matches (timestamp, player1_id, player2_id, player1_score, player2_score)
+            VALUES (?, ?, ?, ?, ?)
+        ''', rows)
+    return processor
+
+def legacy_recalculate(processor):
+    """The previous recompute: two SELECTs and two UPDATEs per match"""
+    with processor.db_handler.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE players SET mu = 25.0, sigma = 8.333")
+        cursor.execute('''
+            SELECT match_id, player1_id, player2_id, player1_score, player2_score
+            FROM matches ORDER BY timestamp ASC, match_id ASC
+        ''')
+        for match_id, p1_id, p2_id, score1, score2 in cursor.fetchall():
+            p1 = processor._get_player(p1_id, cursor)
+            p2 = processor._get_player(p2_id, cursor)
+            new_p1, new_p2 = processor.trueskill.rate_match(
+                Rating(p1.mu, p1.sigma), Rating(p2.mu, p2.sigma), 1 if score1 > score2 else 2)
+            cursor.execute('UPDATE players SET mu = ?, sigma = ? WHERE player_id = ?',
+                           (new_p1.mu, new_p1.sigma, p1_id))
+            cursor.execute('UPDATE players SET mu = ?, sigma = ? WHERE player_id = ?',
+                           (new_p2.mu, new_p2.sigma, p2_id))
+
+def main():
+    n_matches = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    n_players = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    with tempfile.TemporaryDirectory() as tmp:
+        processor = build_database(os.path.join(tmp, 'bench.db'), n_matches, n_players)
+
+        start = time.perf_counter()
+        legacy_recalculate(processor)
+        legacy = time.perf_counter() - start
+        print(f"legacy recompute: {legacy:.3f}s ({n_matches / legacy:,.0f} matches/sec)")
+
+        stats = processor.rebuild_ratings()
+        print(f"replay engine:    {stats.seconds:.3f}s ({stats.matches_per_sec:,.0f} matches/sec)"
+              f" incl. rewriting {2 * stats.matches} ratings_history rows")
+
+if __name__ == '__main__':
+    main()
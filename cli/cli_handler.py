@@ -1,7 +1,10 @@
 import argparse
 from core.match_processor import MatchProcessor
 from core.prediction_model import EnhancedPredictor, FORM_LOOKBACK_GAMES
+from core.match_import import read_matches
+from core import match_export
 import os
+import sys
 from datetime import datetime
 
 class TableTennisCLI:
@@ -26,10 +29,17 @@ class TableTennisCLI:
         match_parser.add_argument('player2', type=int, help='Player 2 ID')
         match_parser.add_argument('score1', type=int, help='Player 1 score')
         match_parser.add_argument('score2', type=int, help='Player 2 score')
+        match_parser.add_argument('--played-at', type=str, default=None,
+                                help='When the match was played (UTC, YYYY-MM-DD HH:MM:SS); default now')
 
         # Show Ladder
         subparsers.add_parser('ladder', help='Display current rankings')
 
+        ladder_as_of_parser = subparsers.add_parser('ladder-as-of',
+            help='Display the rankings as they stood at a date or after a match')
+        ladder_as_of_parser.add_argument('when', type=str,
+            help='Match ID, date (YYYY-MM-DD) or timestamp (YYYY-MM-DD HH:MM:SS)')
+
         # Head-to-Head
         h2h_parser = subparsers.add_parser('h2h', help='Show head-to-head stats')
         h2h_parser.add_argument('player1', type=int, help='First player ID')
@@ -46,6 +56,12 @@ class TableTennisCLI:
                                         help='View match history - omit ID for recent matches')
         history_parser.add_argument('player_id', nargs='?', type=int, default=None,  # Fix order here
                                 help='(Optional) Player ID for specific history')
+        history_parser.add_argument('--season', type=int, default=None,
+                                help='Only matches from this season')
+        history_parser.add_argument('--limit', type=int, default=10,
+                                help='Matches per page (default: 10)')
+        history_parser.add_argument('--before', type=int, default=None, metavar='MATCH_ID',
+                                help='Page cursor: show matches older than this match ID')
         
         #delete matches
         delete_parser = subparsers.add_parser('delete-match', 
@@ -53,6 +69,12 @@ class TableTennisCLI:
         delete_parser.add_argument('match_id', type=int, 
                                 help='ID of the match to delete')
         
+        edit_parser = subparsers.add_parser('edit-match',
+                                            help='Correct the score of a match')
+        edit_parser.add_argument('match_id', type=int, help='ID of the match to edit')
+        edit_parser.add_argument('score1', type=int, help='Corrected player 1 score')
+        edit_parser.add_argument('score2', type=int, help='Corrected player 2 score')
+        
         #sudo rm -rf nuke
         clear_parser = subparsers.add_parser('clearalldata', 
                                    help='Delete ALL players, matches, and rankings')
@@ -78,6 +100,11 @@ class TableTennisCLI:
         predict_parser.add_argument('id1', type=int, help='First player ID')
         predict_parser.add_argument('id2', type=int, help='Second player ID')  
 
+        predict_many_parser = subparsers.add_parser('predict-many',
+            help='Predict win probabilities for every pair listed in a file')
+        predict_many_parser.add_argument('file', type=str,
+            help='One "id1,id2" or "id1 id2" pair per line; - reads stdin')
+
         weekly_parser = subparsers.add_parser('weekly-wrapped', help='Generate weekly summary stats')
 
         start_season_parser = subparsers.add_parser('start-new-season', 
@@ -86,6 +113,43 @@ class TableTennisCLI:
             help='Show ladder for a specific season')
         season_ladder_parser.add_argument('season_id', type=int, help='Season number (e.g., 1)')
 
+        subparsers.add_parser('rebuild-ratings',
+            help='Replay every match from scratch and rewrite all ratings')
+
+        subparsers.add_parser('verify-aggregates',
+            help='Rebuild per-season player stats and report rows that drifted')
+
+        backtest_parser = subparsers.add_parser('backtest',
+            help='Score the predictors on past matches using only earlier results')
+        backtest_parser.add_argument('--batch-size', type=int, default=10000,
+            help='Matches read and scored per batch (default: 10000)')
+
+        features_parser = subparsers.add_parser('rebuild-features',
+            help='Rebuild prediction features (recent form, head-to-head tallies) and report drift')
+        features_parser.add_argument('--check', action='store_true',
+            help='Only report out-of-date rows, do not rewrite them')
+
+        import_parser = subparsers.add_parser('import-matches',
+            help='Bulk-import matches from a CSV or JSONL file (resumes if interrupted)')
+        import_parser.add_argument('file', type=str,
+            help='Columns/keys: player1, player2, score1, score2, [timestamp], [season]')
+        import_parser.add_argument('--format', choices=['csv', 'jsonl'], default=None,
+            help='File format (default: from extension)')
+        import_parser.add_argument('--chunk-size', type=int, default=5000,
+            help='Matches per transaction')
+
+        export_parser = subparsers.add_parser('export',
+            help='Stream matches, rating history or the ladder to a file')
+        export_parser.add_argument('dataset', choices=sorted(match_export.DATASETS),
+            help='What to export')
+        export_parser.add_argument('--format', choices=match_export.FORMATS, default='csv',
+            help='Output format (columnar is a compact binary layout)')
+        export_parser.add_argument('--since', type=int, default=None, metavar='MATCH_ID',
+            help='Only export matches after this match ID (matches only; '
+                 'edits and deletions are not picked up)')
+        export_parser.add_argument('-o', '--output', type=str, default=None,
+            help='Output file (default: stdout)')
+
 
 
     def run(self):
@@ -97,8 +161,12 @@ class TableTennisCLI:
             
         elif args.command == 'record-match':
             match = self.processor.record_match(args.player1, args.player2, 
-                                               args.score1, args.score2)
-            print(f"Recorded Match {match.match_id}")
+                                               args.score1, args.score2,
+                                               played_at=args.played_at)
+            if args.played_at:
+                print(f"Recorded Match {match.match_id} at {match.timestamp}")
+            else:
+                print(f"Recorded Match {match.match_id}")
             
         elif args.command == 'ladder':
             ladder = self.processor.get_ladder()
@@ -106,6 +174,14 @@ class TableTennisCLI:
             for idx, player in enumerate(ladder, 1):
                 print(f"{idx}. {player.name} (Rating: {player.mu:.1f} ±{player.sigma:.1f})")
                 
+        elif args.command == 'ladder-as-of':
+            when = int(args.when) if args.when.isdigit() else args.when
+            ladder = self.processor.get_ladder_as_of(when)
+            label = f"after match {when}" if isinstance(when, int) else f"as of {args.when}"
+            print(f"\nRankings {label}:")
+            for idx, player in enumerate(ladder, 1):
+                print(f"{idx}. {player.name} (Rating: {player.mu:.1f} ±{player.sigma:.1f})")
+                
         elif args.command == 'h2h':
             stats = self.processor.get_head_to_head(args.player1, args.player2)
             
@@ -123,40 +199,34 @@ class TableTennisCLI:
             print(f"Removed player ID {args.player_id} and associated matches")
         
         elif args.command == 'match-history':
-            history = self.processor.get_match_history(args.player_id)
-            player_name = self._get_player_name(args.player_id)
-        
-            print(f"\nMatch History for {player_name} (ID: {args.player_id})")
-            print("-" * 60)
-            for match in history:
-                outcome = "WON" if match['is_win'] else "LOST"
-                print(f"{match['date']} | {match['player1']} {match['score1']}-{match['score2']} {match['player2']} ({outcome})") 
+            try:
+                page = self.processor.get_matches_page(
+                    before=args.before, limit=args.limit,
+                    player_id=args.player_id, season=args.season
+                )
+            except Exception as e:
+                print(f"Error: {str(e)}")
+                return
+            if not page['matches']:
+                print("\nNo matches recorded yet")
+                return
 
-        elif args.command == 'match-history':
             if args.player_id is not None:
-                # Player-specific history
-                try:
-                    history = self.processor.get_match_history(args.player_id)
-                    player_name = self._get_player_name(args.player_id)
-                    
-                    print(f"\nMatch History for {player_name} (ID: {args.player_id})")
-                    print("-" * 60)
-                    for match in history:
-                        outcome = "WON" if match['is_win'] else "LOST"
-                        print(f"{match['date']} | {match['player1']} {match['score1']}-{match['score2']} {match['player2']} ({outcome})")
-                except Exception as e:
-                    print(f"Error: {str(e)}")
+                player_name = self._get_player_name(args.player_id)
+                print(f"\nMatch History for {player_name} (ID: {args.player_id})")
             else:
-                # Show recent matches
-                matches = self.processor.get_recent_matches()
-                if not matches:
-                    print("\nNo matches recorded yet")
-                    return
-                    
-                print("\nLast 10 Recent Matches")
-                print("-" * 40)
-                for match in matches:
-                    print(f"{match['date']} | {match['player1']} {match['score1']}-{match['score2']} {match['player2']}")
+                print("\nRecent Matches")
+            print("-" * 60)
+            for match in page['matches']:
+                line = (f"#{match['match_id']} {match['date']} | {match['player1']} "
+                        f"{match['score1']}-{match['score2']} {match['player2']}")
+                if args.player_id is not None:
+                    won = (match['score1'] > match['score2']) == (match['player1_id'] == args.player_id)
+                    line += " (WON)" if won else " (LOST)"
+                print(line)
+            print(f"\n{len(page['matches'])} of {page['total']} matches")
+            if page['older']:
+                print(f"Older matches: add --before {page['older']}")
 
         elif args.command == 'delete-match':
             confirm = input(f"WARNING: Deleting match {args.match_id} will recalculate all subsequent ratings. Continue? (y/N) ")
@@ -170,6 +240,15 @@ class TableTennisCLI:
             except Exception as e:
                 print(f"Error: {str(e)}")
         
+        elif args.command == 'edit-match':
+            try:
+                match = self.processor.edit_match(args.match_id, args.score1, args.score2)
+                print(f"Match {match.match_id} is now "
+                      f"{self._get_player_name(match.player1_id)} {match.player1_score} - "
+                      f"{match.player2_score} {self._get_player_name(match.player2_id)}")
+            except Exception as e:
+                print(f"Error: {str(e)}")
+        
         elif args.command == 'wlt':
             table = self.processor.get_win_loss_table()
             print("\nWin/Loss Table:")
@@ -339,6 +418,16 @@ class TableTennisCLI:
             except Exception as e:
                 print(f"An unexpected error occurred: {e}")
 
+        elif args.command == 'predict-many':
+            try:
+                pairs = self._read_pairs(args.file)
+                for prediction in self.predictor.predict_many(pairs):
+                    print(f"{prediction['player1_name']} vs {prediction['player2_name']}: "
+                          f"{prediction['final_prediction']*100:.1f}% "
+                          f"(A {prediction['model_a']*100:.1f}%, B {prediction['model_b']*100:.1f}%)")
+            except (OSError, ValueError) as e:
+                print(f"Error: {e}")
+
         elif args.command == 'weekly-wrapped':
             from datetime import datetime, timedelta
             today = datetime.now()
@@ -392,17 +481,8 @@ class TableTennisCLI:
                 print("Operation cancelled.")
                 return
             
-            with self.processor.db_handler.connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('SELECT value FROM system_settings WHERE key = "current_season"')
-                current = int(cursor.fetchone()[0])
-                new_season = current + 1
-                cursor.execute('''
-                    INSERT INTO system_settings (key, value) 
-                    VALUES ('current_season', ?)
-                    ON CONFLICT(key) DO UPDATE SET value=excluded.value
-                ''', (new_season,))
-                print(f"✅ New season {new_season} started! All future matches will be part of season {new_season}.")
+            new_season = self.processor.start_new_season()
+            print(f"✅ New season {new_season} started! All future matches will be part of season {new_season}.")
 
         elif args.command == 'season-ladder':
             season_id = args.season_id
@@ -412,7 +492,109 @@ class TableTennisCLI:
             for idx, player in enumerate(ladder, 1):
                 print(f"{idx:<6} {player.name:<20} {player.mu:.1f}{'':<5} ±{player.sigma:.1f}")
 
-
+        elif args.command == 'rebuild-ratings':
+            stats = self.processor.rebuild_ratings()
+            print(f"Replayed {stats.matches} matches for {stats.players} players "
+                  f"in {stats.seconds:.3f}s ({stats.matches_per_sec:,.0f} matches/sec)")
+
+        elif args.command == 'import-matches':
+            def report(count, seconds):
+                rate = count / seconds if seconds > 0 else 0
+                print(f"\r  {count:,} matches imported ({rate:,.0f} matches/sec)", end='', flush=True)
+
+            stats = self.processor.import_matches(
+                read_matches(args.file, args.format),
+                chunk_size=args.chunk_size,
+                checkpoint=os.path.abspath(args.file),
+                progress=report
+            )
+            print()
+            if stats.skipped:
+                print(f"Resumed after {stats.skipped:,} previously imported rows")
+            print(f"Imported {stats.matches:,} matches and created {stats.players_created} players "
+                  f"in {stats.seconds:.2f}s ({stats.matches_per_sec:,.0f} matches/sec)")
+
+        elif args.command == 'export':
+            if args.since is not None and args.dataset not in match_export.INCREMENTAL:
+                print(f"Error: --since only applies to {', '.join(match_export.INCREMENTAL)}")
+                return
+            binary = args.format == 'columnar'
+            if args.output:
+                out = open(args.output, 'wb') if binary else \
+                    open(args.output, 'w', newline='', encoding='utf-8')
+                with out:
+                    count = self.processor.export(args.dataset, out, args.format, args.since)
+                print(f"Exported {count:,} {args.dataset} rows to {args.output}")
+            else:
+                out = sys.stdout.buffer if binary else sys.stdout
+                self.processor.export(args.dataset, out, args.format, args.since)
+                out.flush()
+
+        elif args.command == 'verify-aggregates':
+            diffs = self.processor.verify_aggregates()
+            if not diffs:
+                print("Season aggregates are up to date")
+            for diff in diffs:
+                name = self._get_player_name(diff['player_id'])
+                print(f"{name}, season {diff['season']}:")
+                print(f"  stored:   {diff['stored']}")
+                print(f"  expected: {diff['expected']}")
+            if diffs:
+                print(f"Rebuilt {len(diffs)} out-of-date rows")
+
+        elif args.command == 'backtest':
+            report = self.processor.backtest(batch_size=args.batch_size)
+            print(f"\nWalk-forward backtest: {report.matches} matches in {report.seconds:.1f}s")
+            print("-" * 50)
+            print(f"{'Model':<22}{'Log-loss':>10}{'Brier':>9}{'Accuracy':>10}")
+            labels = {'model_a': 'Historical (A)', 'model_b': 'TrueSkill (B)', 'blend': 'Blend'}
+            for name, score in report.models.items():
+                print(f"{labels[name]:<22}{score.log_loss:>10.4f}{score.brier:>9.4f}"
+                      f"{score.accuracy*100:>9.1f}%")
+
+            print("\nBlend calibration (predicted vs observed win rate):")
+            for low, high, count, predicted, observed in report.models['blend'].calibration:
+                print(f"  {low*100:>3.0f}-{high*100:>3.0f}%  {count:>8}  "
+                      f"{predicted*100:>5.1f}% vs {observed*100:>5.1f}%")
+
+            print("\nLog-loss by historical model weight:")
+            for weight, loss in report.weight_sweep:
+                print(f"  A {weight:.1f} / B {1 - weight:.1f}: {loss:.4f}")
+            print(f"Best weight for model A: {report.best_weight:.1f}")
+
+        elif args.command == 'rebuild-features':
+            diffs = self.processor.rebuild_features(write=not args.check)
+            if not diffs:
+                print("Prediction features are up to date")
+            for diff in diffs:
+                print(f"{diff['table']} {diff['key']}:")
+                print(f"  stored:   {diff['stored']}")
+                print(f"  expected: {diff['expected']}")
+            if diffs:
+                action = "Found" if args.check else "Rebuilt"
+                print(f"{action} {len(diffs)} out-of-date rows")
+                if args.check:
+                    sys.exit(1)
+
+
+
+    @staticmethod
+    def _read_pairs(path: str) -> list[tuple]:
+        f = sys.stdin if path == '-' else open(path, encoding='utf-8')
+        try:
+            pairs = []
+            for line_no, line in enumerate(f, 1):
+                line = line.split('#', 1)[0].strip()
+                if not line:
+                    continue
+                fields = line.replace(',', ' ').split()
+                if len(fields) != 2 or not all(field.isdigit() for field in fields):
+                    raise ValueError(f"Line {line_no}: expected two player IDs")
+                pairs.append((int(fields[0]), int(fields[1])))
+            return pairs
+        finally:
+            if f is not sys.stdin:
+                f.close()
 
     def _get_player_name(self, player_id: int) -> str:
         """Get player name safely"""
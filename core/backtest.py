@@ -0,0 +1,139 @@
+# core/backtest.py
+"""Walk-forward evaluation of the prediction models.
+
+Matches are streamed once in replay order. Each one is scored from state
+built only from the matches before it, then folded into that state:
+ratings through the same kernel as the replayer, and the totals, recent
+form and head-to-head tallies the historical model reads. Probabilities
+are computed per batch with the predictor's own model functions.
+"""
+import time
+from collections import deque
+from dataclasses import dataclass, field
+import numpy as np
+from core.match_export import iter_batches
+from core.prediction_model import (FORM_LOOKBACK_GAMES, _h2h_rate, _share,
+                                   blend_probability, historical_probability)
+from core.win_matrix import win_probability
+
+_EPSILON = 1e-15
+
+@dataclass
+class ModelScore:
+    log_loss: float
+    brier: float
+    accuracy: float
+    # (bin low, bin high, matches, mean predicted, observed win rate)
+    calibration: list = field(default_factory=list)
+
+@dataclass
+class BacktestReport:
+    matches: int
+    seconds: float
+    models: dict          # 'model_a' / 'model_b' / 'blend' -> ModelScore
+    weight_sweep: list    # (model A weight, log-loss) over a grid of blends
+
+    @property
+    def best_weight(self) -> float:
+        return min(self.weight_sweep, key=lambda item: item[1])[0]
+
+class _Scores:
+    """Running sums for one probability series"""
+    def __init__(self, bins: int):
+        self.bins = bins
+        self.log_loss = self.brier = self.correct = 0.0
+        self.counts = np.zeros(bins)
+        self.predicted = np.zeros(bins)
+        self.observed = np.zeros(bins)
+
+    def add(self, p, outcome):
+        clipped = np.clip(p, _EPSILON, 1 - _EPSILON)
+        self.log_loss -= np.sum(outcome * np.log(clipped) + (1 - outcome) * np.log(1 - clipped))
+        self.brier += np.sum((p - outcome) ** 2)
+        self.correct += np.sum(np.where(p == 0.5, 0.5, (p > 0.5) == outcome))
+        index = np.minimum((p * self.bins).astype(int), self.bins - 1)
+        self.counts += np.bincount(index, minlength=self.bins)
+        self.predicted += np.bincount(index, weights=p, minlength=self.bins)
+        self.observed += np.bincount(index, weights=outcome, minlength=self.bins)
+
+    def score(self, total: int) -> ModelScore:
+        total = max(total, 1)
+        calibration = [(i / self.bins, (i + 1) / self.bins, int(count),
+                        float(self.predicted[i] / count), float(self.observed[i] / count))
+                       for i, count in enumerate(self.counts) if count]
+        return ModelScore(float(self.log_loss / total), float(self.brier / total),
+                          float(self.correct / total), calibration)
+
+def run(cursor, trueskill, beta: float, batch_size: int = 10000,
+        bins: int = 10, sweep_steps: int = 10) -> BacktestReport:
+    """Score every match in the database with only the data before it"""
+    started = time.perf_counter()
+    default = trueskill.create_rating()
+    default = (default.mu, default.sigma)
+    rate_values = trueskill.rate_values
+
+    ratings, played, wins, recent, h2h = {}, {}, {}, {}, {}
+    weights = np.linspace(0.0, 1.0, sweep_steps + 1)
+    scores = {name: _Scores(bins) for name in ('model_a', 'model_b', 'blend')}
+    sweep = np.zeros(len(weights))
+    total = 0
+
+    for rows in iter_batches(cursor, '''
+        SELECT player1_id, player2_id, player1_score > player2_score
+        FROM matches
+        ORDER BY timestamp ASC, match_id ASC
+    ''', batch_size=batch_size):
+        features = []
+        for p1, p2, p1_won in rows:
+            r1 = ratings.get(p1, default)
+            r2 = ratings.get(p2, default)
+            n1, n2 = played.get(p1, 0), played.get(p2, 0)
+            form1, form2 = recent.get(p1), recent.get(p2)
+            pair = h2h.get((p1, p2), (0, 0))
+            features.append((
+                wins.get(p1, 0) / n1 if n1 else 0.0,
+                wins.get(p2, 0) / n2 if n2 else 0.0,
+                sum(form1) if form1 else 0, sum(form2) if form2 else 0,
+                pair[1], pair[0], *r1, *r2
+            ))
+
+            # Fold the result in for the matches that follow
+            ratings[p1], ratings[p2] = rate_values(r1, r2, 1 if p1_won else 2)
+            played[p1], played[p2] = n1 + 1, n2 + 1
+            wins[p1] = wins.get(p1, 0) + p1_won
+            wins[p2] = wins.get(p2, 0) + (1 - p1_won)
+            for pid, won in ((p1, p1_won), (p2, 1 - p1_won)):
+                form = recent.get(pid)
+                if form is None:
+                    form = recent[pid] = deque(maxlen=FORM_LOOKBACK_GAMES)
+                form.append(won)
+            h2h[(p1, p2)] = (pair[0] + 1, pair[1] + p1_won)
+            back = h2h.get((p2, p1), (0, 0))
+            h2h[(p2, p1)] = (back[0] + 1, back[1] + 1 - p1_won)
+
+        features = np.array(features, dtype=float)
+        outcome = np.array([row[2] for row in rows], dtype=float)
+        momentum_scale = FORM_LOOKBACK_GAMES if FORM_LOOKBACK_GAMES > 0 else 1
+        model_a = historical_probability(
+            gross=_share(features[:, 0], features[:, 1]),
+            momentum=_share(features[:, 2] / momentum_scale, features[:, 3] / momentum_scale),
+            h2h=_h2h_rate(features[:, 4], features[:, 5])
+        )
+        model_b = win_probability(features[:, 6], features[:, 7],
+                                  features[:, 8], features[:, 9], beta)
+        blend = blend_probability(model_a, model_b)
+
+        scores['model_a'].add(model_a, outcome)
+        scores['model_b'].add(model_b, outcome)
+        scores['blend'].add(blend, outcome)
+        for i, weight in enumerate(weights):
+            p = np.clip(weight * model_a + (1 - weight) * model_b, _EPSILON, 1 - _EPSILON)
+            sweep[i] -= np.sum(outcome * np.log(p) + (1 - outcome) * np.log(1 - p))
+        total += len(rows)
+
+    return BacktestReport(
+        matches=total,
+        seconds=time.perf_counter() - started,
+        models={name: s.score(total) for name, s in scores.items()},
+        weight_sweep=[(float(w), float(loss / max(total, 1))) for w, loss in zip(weights, sweep)]
+    )
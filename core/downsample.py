@@ -0,0 +1,77 @@
+# core/downsample.py
+"""Reduce a chart series to a bounded number of points.
+
+Both methods work on numpy columns and return the indices to keep, in
+order, always including the first and last point and the series' highest
+and lowest values. ``max_points`` must be at least 4.
+
+``lttb``     Largest-Triangle-Three-Buckets: one point per bucket, the one
+             forming the largest triangle with its neighbours' picks; keeps
+             the visual shape of the line.
+``min_max``  The lowest and highest point of each bucket; keeps every
+             local extreme at up to twice the density.
+"""
+import numpy as np
+
+METHODS = ('lttb', 'min_max')
+
+def _edges(size: int, buckets: int) -> np.ndarray:
+    """Bucket boundaries splitting the points between the first and last"""
+    return np.linspace(1, size - 1, buckets + 1).astype(np.int64)
+
+def lttb(x, y, max_points: int) -> np.ndarray:
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    size = len(x)
+    if max_points >= size:
+        return np.arange(size)
+    edges = _edges(size, max_points - 2)
+    picked = np.empty(max_points, dtype=np.int64)
+    picked[0], picked[-1] = 0, size - 1
+
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # The next bucket is summarised by its average; after the last
+        # bucket comes the final point
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else size
+        next_x, next_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        picked[bucket + 1] = previous
+
+    # Swap the extremes in for their bucket's pick so they always survive
+    extremes = sorted(e for e in {int(np.argmin(y)), int(np.argmax(y))} if 0 < e < size - 1)
+    slots = [int(np.searchsorted(edges, e, side='right')) for e in extremes]
+    if len(slots) == 2 and slots[0] == slots[1]:
+        # Same bucket: the later one takes the next bucket's slot, or the
+        # earlier one the previous bucket's, which keeps the picks in order
+        if slots[1] < max_points - 2:
+            slots[1] += 1
+        else:
+            slots[0] -= 1
+    for slot, extreme in zip(slots, extremes):
+        picked[slot] = extreme
+    return picked
+
+def min_max(x, y, max_points: int) -> np.ndarray:
+    y = np.asarray(y, dtype=float)
+    size = len(y)
+    if max_points >= size:
+        return np.arange(size)
+    edges = _edges(size, (max_points - 2) // 2)
+    picked = [0]
+    for start, end in zip(edges[:-1], edges[1:]):
+        low = start + int(np.argmin(y[start:end]))
+        high = start + int(np.argmax(y[start:end]))
+        picked.extend(sorted({low, high}))
+    picked.append(size - 1)
+    return np.array(picked, dtype=np.int64)
+
+def downsample(x, y, max_points: int, method: str = 'lttb') -> np.ndarray:
+    """Indices of at most ``max_points`` points of (x, y) to plot"""
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method {method!r}; use one of {', '.join(METHODS)}")
+    if max_points < 4:
+        raise ValueError("max_points must be at least 4")
+    return (lttb if method == 'lttb' else min_max)(x, y, max_points)
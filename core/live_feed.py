@@ -0,0 +1,192 @@
+# core/live_feed.py
+"""Server-sent events describing each committed match change.
+
+MatchProcessor registers a post-commit hook for every recorded, edited or
+deleted match. The hook diffs the RatingStore against the ratings of the previous
+event, renders one SSE message holding the match row, each changed rating
+and its move in the dashboard ranking (by mu), and the two players' recent
+form, and wakes every viewer. Viewers only copy the rendered text, so their
+number does not change the work done per match.
+
+Writes from other processes have no hook; viewers poll ``data_version``
+between events and publish their diff as a ``ratings_changed`` event.
+"""
+import json
+import threading
+import time
+from collections import deque
+import numpy as np
+from core.rating_store import RatingStore
+
+class LiveFeed:
+    _feeds = {}
+    _feeds_lock = threading.Lock()
+
+    @classmethod
+    def for_handler(cls, db_handler) -> 'LiveFeed':
+        """Shared feed for the handler's database"""
+        with cls._feeds_lock:
+            feed = cls._feeds.get(db_handler.db_name)
+            if feed is None:
+                feed = cls._feeds[db_handler.db_name] = cls(RatingStore.for_handler(db_handler))
+            return feed
+
+    def __init__(self, store, capacity: int = 256, poll_seconds: float = 15.0):
+        self.store = store
+        self.db_handler = store.db_handler
+        self.poll_seconds = poll_seconds
+        # Ratings as of the last event; None until someone subscribes, so
+        # processes nobody watches do no work
+        self.version = None
+        self._ratings = None
+        self._events = deque(maxlen=capacity)   # (event_id, rendered message)
+        self._last_id = 0
+        self._polled_at = 0.0
+        self._cond = threading.Condition()
+        self.stats = {'published': 0, 'viewers': 0}
+
+    # --------------------------
+    # Writer side
+    # --------------------------
+    def match_recorded(self, cursor, match_id: int):
+        """Publish the match and its rating changes once the transaction commits"""
+        self._match_written(cursor, match_id, 'match_recorded')
+
+    def match_edited(self, cursor, match_id: int):
+        self._match_written(cursor, match_id, 'match_edited')
+
+    def match_deleted(self, cursor, match_id: int, player_ids):
+        if self._ratings is None:
+            return
+        form = self._form(cursor, player_ids)
+        self.db_handler.after_commit(
+            lambda version: self._publish('match_deleted', {'match_id': match_id}, form))
+
+    # --------------------------
+    # Viewer side
+    # --------------------------
+    def subscribe(self, last_id: int = None) -> tuple:
+        """(messages to send first, id to wait after) for a new viewer.
+
+        A viewer reconnecting with the id of the last event it saw gets
+        what it missed, or a ``refresh`` event if that has left the buffer.
+        """
+        with self._cond:
+            if self._ratings is None:
+                self._ratings = self._snapshot()
+            self.stats['viewers'] += 1
+            if last_id is None:
+                return [], self._last_id
+            first_kept = self._events[0][0] if self._events else self._last_id + 1
+            if last_id > self._last_id or last_id + 1 < first_kept:
+                # From before a restart, or too far behind
+                return [self._render(self._last_id, 'refresh', {'version': self.version})], self._last_id
+            return self._since(last_id)
+
+    def unsubscribe(self):
+        with self._cond:
+            self.stats['viewers'] -= 1
+
+    def wait(self, after_id: int, timeout: float) -> tuple:
+        """(messages newer than ``after_id``, new last id); empty after ``timeout``"""
+        with self._cond:
+            if self._last_id == after_id:
+                self._cond.wait(timeout)
+            if self._last_id != after_id:
+                return self._since(after_id)
+            # One viewer per interval checks for writes from other processes
+            now = time.monotonic()
+            poll = now - self._polled_at >= self.poll_seconds
+            if poll:
+                self._polled_at = now
+        if poll:
+            self.poll()
+            with self._cond:
+                return self._since(after_id)
+        return [], after_id
+
+    def poll(self):
+        """Publish whatever other processes changed since the last event"""
+        if self.db_handler.data_version() != self.version:
+            self._publish('ratings_changed')
+
+    # --------------------------
+    # Internals
+    # --------------------------
+    def _snapshot(self) -> tuple:
+        version, player_ids, names, mu, sigma, _ = self.store.snapshot()
+        # Ranked like the dashboard table (get_rankings): by mu, ties by
+        # player_id, which is the store's order
+        order = np.argsort(-mu, kind='stable')
+        ranks = np.empty(len(order), dtype=np.int64)
+        ranks[order] = np.arange(1, len(order) + 1)
+        return version, dict(zip(player_ids.tolist(), zip(names, mu.tolist(), sigma.tolist(),
+                                                             ranks.tolist())))
+
+    def _match_written(self, cursor, match_id: int, kind: str):
+        if self._ratings is None:
+            return
+        cursor.execute('''
+            SELECT m.match_id, m.timestamp, m.season,
+                m.player1_id, p1.name, m.player1_score,
+                m.player2_id, p2.name, m.player2_score
+            FROM matches m
+            JOIN players p1 ON m.player1_id = p1.player_id
+            JOIN players p2 ON m.player2_id = p2.player_id
+            WHERE m.match_id = ?
+        ''', (match_id,))
+        match = dict(zip(('match_id', 'date', 'season', 'player1_id', 'player1', 'score1',
+                          'player2_id', 'player2', 'score2'), cursor.fetchone()))
+        form = self._form(cursor, (match['player1_id'], match['player2_id']))
+        self.db_handler.after_commit(lambda version: self._publish(kind, match, form))
+
+    @staticmethod
+    def _form(cursor, player_ids) -> dict:
+        """player_id -> recent results as 'W'/'L', newest first"""
+        form = {pid: '' for pid in player_ids}
+        cursor.execute(f'''
+            SELECT player_id, recent FROM player_features
+            WHERE player_id IN ({', '.join('?' * len(form))})
+        ''', list(form))
+        for pid, recent in cursor.fetchall():
+            form[pid] = recent.replace('1', 'W').replace('0', 'L')
+        return form
+
+    def _since(self, after_id: int) -> tuple:
+        return [text for event_id, text in self._events if event_id > after_id], self._last_id
+
+    def _publish(self, kind: str, match: dict = None, form: dict = None):
+        with self._cond:
+            if self._ratings is None:
+                return
+            before = self._ratings[1]
+            self._ratings = self._snapshot()
+            self.version, after = self._ratings
+            changed = []
+            for pid, (name, mu, sigma, rank) in after.items():
+                old = before.get(pid)
+                if old is not None and old[1:3] == (mu, sigma):
+                    # Unchanged, or only moved by someone else's change
+                    continue
+                changed.append({
+                    'player_id': pid,
+                    'name': name,
+                    'mu': mu,
+                    'sigma': sigma,
+                    'delta_mu': mu - old[1] if old else None,
+                    'rank': rank,
+                    'previous_rank': old[3] if old else None
+                })
+            if kind == 'ratings_changed' and not changed:
+                return
+            removed = sorted(before.keys() - after.keys())
+            payload = {'version': self.version, 'match': match, 'ratings': changed,
+                       'form': form or {}, 'removed_players': removed}
+            self._last_id += 1
+            self._events.append((self._last_id, self._render(self._last_id, kind, payload)))
+            self.stats['published'] += 1
+            self._cond.notify_all()
+
+    @staticmethod
+    def _render(event_id: int, kind: str, payload: dict) -> str:
+        return f"id: {event_id}\nevent: {kind}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
@@ -0,0 +1,196 @@
+# core/match_export.py
+"""Streaming export of matches, rating history and the ladder.
+
+Rows are pulled with ``cursor.fetchmany`` and written as they arrive, so
+memory use does not grow with the size of the database.
+
+The ``columnar`` format is a compact binary layout for bulk loaders::
+
+    header  b'TTRC' u8 version u16 column count,
+            then per column: u16 name length, name (utf-8), type byte
+            ('q' int64, 'd' float64, 's' text)
+    block   u32 row count, then per column:
+            'q'/'d'  row count little-endian values
+            's'      row count u32 byte lengths (0xFFFFFFFF = NULL), then the bytes
+    end     u32 0
+
+Every value in a block is little-endian.
+"""
+import csv
+import json
+import struct
+
+MAGIC = b'TTRC'
+VERSION = 1
+_NULL_LENGTH = 0xFFFFFFFF
+
+# name -> (query, columns as (name, type)); queries with a parameter take
+# the --since match_id bound, which only suits append-only rows
+DATASETS = {
+    'matches': ('''
+        SELECT
+            m.match_id,
+            m.timestamp,
+            m.season,
+            m.player1_id,
+            p1.name AS player1_name,
+            m.player2_id,
+            p2.name AS player2_name,
+            m.player1_score,
+            m.player2_score
+        FROM matches m
+        JOIN players p1 ON m.player1_id = p1.player_id
+        JOIN players p2 ON m.player2_id = p2.player_id
+        WHERE m.match_id > ?
+        ORDER BY m.match_id
+    ''', [('match_id', 'q'), ('timestamp', 's'), ('season', 'q'),
+          ('player1_id', 'q'), ('player1', 's'), ('player2_id', 'q'), ('player2', 's'),
+          ('score1', 'q'), ('score2', 'q')]),
+
+    'ratings_history': ('''
+        SELECT
+            rh.match_id,
+            m.timestamp,
+            rh.player_id,
+            p.name,
+            rh.mu,
+            rh.sigma
+        FROM ratings_history rh
+        JOIN matches m ON rh.match_id = m.match_id
+        JOIN players p ON rh.player_id = p.player_id
+        ORDER BY rh.match_id, rh.player_id
+    ''', [('match_id', 'q'), ('timestamp', 's'), ('player_id', 'q'), ('name', 's'),
+          ('mu', 'd'), ('sigma', 'd')]),
+
+    # Replays rewrite history rows of old matches, so ratings_history and
+    # the ladder are always exported whole
+    'ladder': ('''
+        SELECT
+            ROW_NUMBER() OVER (ORDER BY p.mu - 3 * p.sigma DESC) AS rank,
+            p.player_id,
+            p.name,
+            p.mu,
+            p.sigma,
+            p.mu - 3 * p.sigma AS conservative,
+            (SELECT COALESCE(SUM(s.played), 0) FROM player_season_stats s
+             WHERE s.player_id = p.player_id) AS played
+        FROM players p
+        ORDER BY rank
+    ''', [('rank', 'q'), ('player_id', 'q'), ('name', 's'), ('mu', 'd'), ('sigma', 'd'),
+          ('conservative', 'd'), ('played', 'q')]),
+}
+
+FORMATS = ('csv', 'jsonl', 'columnar')
+# Datasets that accept ``since``
+INCREMENTAL = tuple(name for name, (query, _) in DATASETS.items() if '?' in query)
+
+def export(cursor, dataset: str, out, fmt: str = 'csv',
+           since: int = None, batch_size: int = 1000) -> int:
+    """Stream ``dataset`` to ``out`` and return the number of rows written.
+
+    ``out`` is a text file for csv/jsonl and a binary file for columnar.
+    ``since`` limits matches to those with a greater match_id, which
+    covers every match recorded later, backdated ones included. Edits and
+    deletions of earlier matches are not picked up.
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown dataset: {dataset}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if since is not None and dataset not in INCREMENTAL:
+        raise ValueError(f"--since only applies to {', '.join(INCREMENTAL)}; "
+                         f"export {dataset} whole")
+    query, columns = DATASETS[dataset]
+    params = (since or 0,) if '?' in query else ()
+    return WRITERS[fmt](iter_batches(cursor, query, params, batch_size), columns, out)
+
+def iter_batches(cursor, query: str, params=(), batch_size: int = 1000):
+    """Run ``query`` and yield lists of at most ``batch_size`` rows"""
+    cursor.execute(query, params)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+def write_csv(batches, columns, out) -> int:
+    writer = csv.writer(out)
+    writer.writerow([name for name, _ in columns])
+    count = 0
+    for rows in batches:
+        writer.writerows(rows)
+        count += len(rows)
+    return count
+
+def write_jsonl(batches, columns, out) -> int:
+    names = [name for name, _ in columns]
+    count = 0
+    for rows in batches:
+        out.write(''.join(json.dumps(dict(zip(names, row))) + '\n' for row in rows))
+        count += len(rows)
+    return count
+
+def _pack_column(values, kind: str) -> bytes:
+    if kind in ('q', 'd'):
+        return struct.pack(f'<{len(values)}{kind}', *values)
+
+    lengths, blobs = [], []
+    for value in values:
+        if value is None:
+            lengths.append(_NULL_LENGTH)
+            continue
+        blob = str(value).encode('utf-8')
+        lengths.append(len(blob))
+        blobs.append(blob)
+    return struct.pack(f'<{len(lengths)}I', *lengths) + b''.join(blobs)
+
+def write_columnar(batches, columns, out) -> int:
+    out.write(MAGIC + struct.pack('<BH', VERSION, len(columns)))
+    for name, kind in columns:
+        encoded = name.encode('utf-8')
+        out.write(struct.pack('<H', len(encoded)) + encoded + kind.encode('ascii'))
+
+    count = 0
+    for rows in batches:
+        out.write(struct.pack('<I', len(rows)))
+        for index, (_, kind) in enumerate(columns):
+            out.write(_pack_column([row[index] for row in rows], kind))
+        count += len(rows)
+    out.write(struct.pack('<I', 0))
+    return count
+
+def _read_exact(f, size: int) -> bytes:
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("Truncated columnar export")
+    return data
+
+def read_columnar(f):
+    """Yield (column names, rows) blocks from a ``columnar`` export"""
+    if _read_exact(f, 4) != MAGIC:
+        raise ValueError("Not a columnar export")
+    version, ncols = struct.unpack('<BH', _read_exact(f, 3))
+    if version != VERSION:
+        raise ValueError(f"Unsupported columnar version {version}")
+    columns = []
+    for _ in range(ncols):
+        (length,) = struct.unpack('<H', _read_exact(f, 2))
+        name = _read_exact(f, length).decode('utf-8')
+        columns.append((name, _read_exact(f, 1).decode('ascii')))
+    names = [name for name, _ in columns]
+
+    while True:
+        (nrows,) = struct.unpack('<I', _read_exact(f, 4))
+        if nrows == 0:
+            return
+        data = []
+        for _, kind in columns:
+            if kind in ('q', 'd'):
+                data.append(struct.unpack(f'<{nrows}{kind}', _read_exact(f, 8 * nrows)))
+                continue
+            lengths = struct.unpack(f'<{nrows}I', _read_exact(f, 4 * nrows))
+            data.append([None if n == _NULL_LENGTH else _read_exact(f, n).decode('utf-8')
+                         for n in lengths])
+        yield names, list(zip(*data))
+
+WRITERS = {'csv': write_csv, 'jsonl': write_jsonl, 'columnar': write_columnar}
@@ -0,0 +1,65 @@
+# core/match_import.py
+import csv
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+@dataclass
+class ImportStats:
+    matches: int
+    players_created: int
+    skipped: int
+    seconds: float
+
+    @property
+    def matches_per_sec(self) -> float:
+        return self.matches / self.seconds if self.seconds > 0 else float('inf')
+
+def normalize_timestamp(value):
+    """Render a timestamp the way SQLite's CURRENT_TIMESTAMP does.
+
+    Replay order sorts timestamps as text, so imported values must share the
+    'YYYY-MM-DD HH:MM:SS' UTC format of recorded ones. Returns None for
+    blanks.
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        parsed = datetime.fromtimestamp(value, timezone.utc)
+    elif isinstance(value, datetime):
+        parsed = value
+    else:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        # CURRENT_TIMESTAMP is UTC
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.strftime('%Y-%m-%d %H:%M:%S')
+
+def played_timestamp(value):
+    """``normalize_timestamp`` for when a match was played; the future is rejected.
+
+    Replay order puts later matches after it, yet matches recorded now
+    would already be rated on top of it.
+    """
+    timestamp = normalize_timestamp(value)
+    if timestamp and timestamp > datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'):
+        raise ValueError(f"Played-at time {timestamp} is in the future")
+    return timestamp
+
+def read_matches(path: str, fmt: str = None):
+    """Stream match rows from a CSV or JSONL file.
+
+    Yields dicts with player1, player2, score1, score2 and optionally
+    timestamp and season. CSV files need a header row with those names.
+    """
+    fmt = fmt or os.path.splitext(path)[1].lstrip('.').lower()
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+        elif fmt in ('jsonl', 'ndjson'):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ValueError(f"Unsupported import format: {fmt}")
@@ -1,16 +1,40 @@
 # core/match_processor.py
-import math
-from trueskill import Rating, TrueSkill
+import itertools
+import time
+import numpy as np
+from trueskill import TrueSkill
 from datetime import datetime
 from database.db_handler import DatabaseHandler
 from core.models import Player, Match
 from core.trueskill_setup import TrueSkillSystem
+from core.rating_replay import RatingReplayer, ReplayStats
+from core.rating_store import RatingStore
+from core.win_matrix import WinProbabilityMatrix, win_probability
+from core import season_stats, player_features
+from core.player_features import FeatureCache
+from core.live_feed import LiveFeed
+from core.match_import import ImportStats, normalize_timestamp, played_timestamp
+from core import match_export
+from core.backtest import BacktestReport, run as run_backtest
+from core.downsample import downsample
+
+# Sorts after every real match ID with the same timestamp
+_MAX_MATCH_ID = 2**63 - 1
+# Set while imported matches are committed but not yet rated
+_REPLAY_PENDING = 'ratings_replay_pending'
 
 class MatchProcessor:
     def __init__(self, db_name='rankings.db'):
         self.db_handler = DatabaseHandler(db_name)
         self.trueskill = TrueSkillSystem()
         self.trueskill_env = TrueSkill()
+        self.replayer = RatingReplayer(self.trueskill)
+        self.ratings = RatingStore.for_handler(self.db_handler)
+        self.win_matrix = WinProbabilityMatrix(self.ratings, self.trueskill_env.beta)
+        self.features = FeatureCache.for_handler(self.db_handler)
+        self.live_feed = LiveFeed.for_handler(self.db_handler)
+        with self.db_handler.connection() as conn:
+            self._finish_pending_replay(conn)
 
     def add_player(self, name: str) -> Player:
         rating = self.trueskill.create_rating()
@@ -20,7 +44,8 @@ class MatchProcessor:
                 INSERT INTO players (name, mu, sigma)
                 VALUES (?, ?, ?)
             ''', (name, rating.mu, rating.sigma))
-            
+            self.ratings.write_through(cursor, [cursor.lastrowid])
+
             return Player(
                 player_id=cursor.lastrowid,
                 name=name,
@@ -30,25 +55,48 @@ class MatchProcessor:
             )
 
     def record_match(self, player1_id: int, player2_id: int, 
-                    score1: int, score2: int) -> Match:
+                    score1: int, score2: int, played_at=None) -> Match:
+        """Record a match, by default as played now.
+
+        ``played_at`` (UTC) backdates the match: it is rated from both
+        players' ratings at that point in history and only the matches
+        after it are replayed, and its season is that of the last match
+        played before it. A time after every recorded match just sets the
+        timestamp. A time in the future raises ValueError.
+        """
         if score1 == score2:
             raise ValueError("Draws are not allowed")
 
         with self.db_handler.connection() as conn:
+            self._finish_pending_replay(conn)
             cursor = conn.cursor()
             
             # Get current ratings first
             p1 = self._get_player(player1_id, cursor)
             p2 = self._get_player(player2_id, cursor)
+            timestamp = played_timestamp(played_at)
+
+            # The new match_id is the highest, so only a later timestamp
+            # sorts after it
+            backdated = False
+            if timestamp:
+                cursor.execute('SELECT 1 FROM matches WHERE timestamp > ? LIMIT 1', (timestamp,))
+                backdated = cursor.fetchone() is not None
 
             # Create the match record
+            season = self._season_at(cursor, timestamp) if backdated else self._get_current_season(cursor)
             cursor.execute('''
                 INSERT INTO matches 
-                (player1_id, player2_id, player1_score, player2_score, season)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (player1_id, player2_id, score1, score2, self._get_current_season(cursor)))
+                (timestamp, player1_id, player2_id, player1_score, player2_score, season)
+                VALUES (COALESCE(?, CURRENT_TIMESTAMP), ?, ?, ?, ?, ?)
+            ''', (timestamp, player1_id, player2_id, score1, score2, season))
             match_id = cursor.lastrowid
 
+            if backdated:
+                before = self._ratings_at(cursor, timestamp, match_id, (player1_id, player2_id))
+                p1.mu, p1.sigma = before[player1_id]
+                p2.mu, p2.sigma = before[player2_id]
+
             # Store historical ratings
             cursor.execute('''
                 INSERT INTO ratings_history (player_id, match_id, mu, sigma)
@@ -59,28 +107,49 @@ class MatchProcessor:
                 VALUES (?, ?, ?, ?)
             ''', (player2_id, match_id, p2.mu, p2.sigma))
 
-            # Process ratings update
+            # Process ratings update; the same tuple kernel as every replay,
+            # so incremental and replayed ratings agree bit for bit
             winner = 1 if score1 > score2 else 2
-            new_p1, new_p2 = self.trueskill.rate_match(
-                Rating(p1.mu, p1.sigma),
-                Rating(p2.mu, p2.sigma),
-                winner
-            )
-
-            # Update player ratings
-            cursor.execute('''
-                UPDATE players 
-                SET mu = ?, sigma = ?, last_updated = ?
-                WHERE player_id = ?
-            ''', (new_p1.mu, new_p1.sigma, datetime.now(), player1_id))
-            cursor.execute('''
-                UPDATE players 
-                SET mu = ?, sigma = ?, last_updated = ?
-                WHERE player_id = ?
-            ''', (new_p2.mu, new_p2.sigma, datetime.now(), player2_id))
+            new_p1, new_p2 = self.trueskill.rate_values((p1.mu, p1.sigma), (p2.mu, p2.sigma), winner)
 
             # Update matchup stats
             self._update_matchup_stats(player1_id, player2_id, winner, cursor)
+            self._insert_participants(match_id, cursor)
+
+            if backdated:
+                # Re-rate what came after; this also writes both players'
+                # current ratings
+                changed = {player1_id, player2_id}
+                seed = {player1_id: new_p1, player2_id: new_p2}
+                if not self.replayer.replay_from(cursor, timestamp, match_id, seed, changed):
+                    # Legacy rows without snapshots - replay everything
+                    self._recalculate_all_ratings(conn)
+                else:
+                    season_stats.refresh(cursor, (player1_id, player2_id), season)
+                    season_stats.refresh_peaks(cursor, changed - {player1_id, player2_id}, season)
+                    player_features.refresh(cursor, (player1_id, player2_id))
+                    self.ratings.write_through(cursor, changed)
+                    self.features.write_through(cursor, (player1_id, player2_id))
+                self._invalidate_season_ratings(cursor, [season])
+            else:
+                # Update player ratings
+                cursor.execute('''
+                    UPDATE players 
+                    SET mu = ?, sigma = ?, last_updated = ?
+                    WHERE player_id = ?
+                ''', (*new_p1, datetime.now(), player1_id))
+                cursor.execute('''
+                    UPDATE players 
+                    SET mu = ?, sigma = ?, last_updated = ?
+                    WHERE player_id = ?
+                ''', (*new_p2, datetime.now(), player2_id))
+
+                season_stats.apply_match(cursor, match_id)
+                player_features.apply_match(cursor, match_id)
+                self._update_season_ratings(cursor, season, player1_id, player2_id, winner)
+                self.ratings.write_through(cursor, (player1_id, player2_id))
+                self.features.write_through(cursor, (player1_id, player2_id))
+            self.live_feed.match_recorded(cursor, match_id)
             
             return Match(
                 match_id=match_id,
@@ -88,24 +157,25 @@ class MatchProcessor:
                 player2_id=player2_id,
                 player1_score=score1,
                 player2_score=score2,
-                timestamp=datetime.now()
+                timestamp=timestamp or datetime.now()
             )
 
     def delete_match(self, match_id: int):
         """Delete match and restore ratings"""
         with self.db_handler.connection() as conn:
+            self._finish_pending_replay(conn)
             cursor = conn.cursor()
             
             # 1. Get full match details including scores
             cursor.execute('''
-                SELECT player1_id, player2_id, player1_score, player2_score 
+                SELECT player1_id, player2_id, player1_score, player2_score, timestamp, season
                 FROM matches WHERE match_id = ?
             ''', (match_id,))
             match_data = cursor.fetchone()
             if not match_data:
                 raise ValueError(f"Match {match_id} not found")
-                
-            p1_id, p2_id, score1, score2 = match_data
+
+            p1_id, p2_id, score1, score2, timestamp, season = match_data
 
             # 2. Determine original winner and matchup order
             original_winner = 1 if score1 > score2 else 2
@@ -137,70 +207,295 @@ class MatchProcessor:
                 AND matches_played <= 0
             ''', (a, b))
 
-            # 4. Proceed with original deletion logic
+            # 4. Keep the pre-match snapshots: they are the ratings both
+            # players go back to, and the starting point for the replay
+            cursor.execute('''
+                SELECT player_id, mu, sigma FROM ratings_history WHERE match_id = ?
+            ''', (match_id,))
+            seed = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
             cursor.execute('DELETE FROM ratings_history WHERE match_id = ?', (match_id,))
+            cursor.execute('DELETE FROM match_participants WHERE match_id = ?', (match_id,))
             cursor.execute('DELETE FROM matches WHERE match_id = ?', (match_id,))
+            self._invalidate_season_ratings(cursor, [season])
 
+            # 5. Recalculate subsequent matches only
+            changed = {p1_id, p2_id}
+            if set(seed) != changed or not self.replayer.replay_from(cursor, timestamp, match_id, seed, changed):
+                # Legacy rows without snapshots - replay everything
+                self._recalculate_all_ratings(conn)
+            else:
+                # Replayed players' later snapshots moved, and with them peak_mu
+                season_stats.refresh(cursor, (p1_id, p2_id), season)
+                season_stats.refresh_peaks(cursor, changed - {p1_id, p2_id}, season)
+                player_features.refresh(cursor, (p1_id, p2_id))
+                self.ratings.write_through(cursor, changed)
+                self.features.write_through(cursor, (p1_id, p2_id))
+            self.live_feed.match_deleted(cursor, match_id, (p1_id, p2_id))
+
+    def edit_match(self, match_id: int, score1: int, score2: int) -> Match:
+        """Correct a match's score in place, keeping its timestamp and season.
 
-            # Restore player ratings
-            cursor.execute('SELECT mu, sigma FROM players WHERE player_id = ?', (p1_id,))
-            p1_mu, p1_sigma = cursor.fetchone()
-            cursor.execute('SELECT mu, sigma FROM players WHERE player_id = ?', (p2_id,))
-            p2_mu, p2_sigma = cursor.fetchone()
+        Ratings only depend on who won, so a correction that keeps the
+        winner touches the scores and point totals alone. Otherwise the
+        match is re-rated from its stored pre-match snapshots and only the
+        matches after it are replayed.
+        """
+        if score1 == score2:
+            raise ValueError("Draws are not allowed")
 
+        with self.db_handler.connection() as conn:
+            self._finish_pending_replay(conn)
+            cursor = conn.cursor()
             cursor.execute('''
-                UPDATE players 
-                SET mu = ?, sigma = ?
-                WHERE player_id = ?
-            ''', (p1_mu, p1_sigma, p1_id))
+                SELECT player1_id, player2_id, player1_score, player2_score, timestamp, season
+                FROM matches WHERE match_id = ?
+            ''', (match_id,))
+            match_data = cursor.fetchone()
+            if not match_data:
+                raise ValueError(f"Match {match_id} not found")
+
+            p1_id, p2_id, old_score1, old_score2, timestamp, season = match_data
+            old_winner = 1 if old_score1 > old_score2 else 2
+            winner = 1 if score1 > score2 else 2
+
             cursor.execute('''
-                UPDATE players 
-                SET mu = ?, sigma = ?
-                WHERE player_id = ?
-            ''', (p2_mu, p2_sigma, p2_id))
+                UPDATE matches SET player1_score = ?, player2_score = ? WHERE match_id = ?
+            ''', (score1, score2, match_id))
+            cursor.executemany('''
+                UPDATE match_participants
+                SET won = ?, points_for = ?, points_against = ?
+                WHERE match_id = ? AND player_id = ?
+            ''', [(int(winner == 1), score1, score2, match_id, p1_id),
+                  (int(winner == 2), score2, score1, match_id, p2_id)])
 
-            # Recalculate subsequent matches
-            self._recalculate_all_ratings(conn)
+            if winner == old_winner:
+                cursor.executemany('''
+                    UPDATE player_season_stats
+                    SET points_for = points_for + ?, points_against = points_against + ?
+                    WHERE player_id = ? AND season = ?
+                ''', [(score1 - old_score1, score2 - old_score2, p1_id, season),
+                      (score2 - old_score2, score1 - old_score1, p2_id, season)])
+                # Only points change: the stores keep their rows and just
+                # follow the data_version bump
+                self.ratings.unaffected_write()
+                self.features.unaffected_write()
+            else:
+                # Move the win across in matchups
+                a, b = sorted((p1_id, p2_id))
+                winner_id = p1_id if winner == 1 else p2_id
+                cursor.execute('''
+                    UPDATE matchups SET wins_a = wins_a + ?, wins_b = wins_b + ?
+                    WHERE player_a_id = ? AND player_b_id = ?
+                ''', (1 if winner_id == a else -1, 1 if winner_id == b else -1, a, b))
+
+                cursor.execute('''
+                    SELECT player_id, mu, sigma FROM ratings_history WHERE match_id = ?
+                ''', (match_id,))
+                before = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+                changed = {p1_id, p2_id}
+                if set(before) == changed:
+                    new_p1, new_p2 = self.trueskill.rate_values(before[p1_id], before[p2_id], winner)
+                    seed = {p1_id: new_p1, p2_id: new_p2}
+                if set(before) != changed or not self.replayer.replay_from(cursor, timestamp, match_id, seed, changed):
+                    # Legacy rows without snapshots - replay everything
+                    self._recalculate_all_ratings(conn)
+                else:
+                    season_stats.refresh(cursor, (p1_id, p2_id), season)
+                    season_stats.refresh_peaks(cursor, changed - {p1_id, p2_id}, season)
+                    player_features.refresh(cursor, (p1_id, p2_id))
+                    self.ratings.write_through(cursor, changed)
+                    self.features.write_through(cursor, (p1_id, p2_id))
+                self._invalidate_season_ratings(cursor, [season])
+            self.live_feed.match_edited(cursor, match_id)
+
+            return Match(
+                match_id=match_id,
+                player1_id=p1_id,
+                player2_id=p2_id,
+                player1_score=score1,
+                player2_score=score2,
+                timestamp=timestamp
+            )
 
     def _recalculate_all_ratings(self, conn):
         """Full ratings recalculation from scratch"""
         cursor = conn.cursor()
-        cursor.execute('''
-            UPDATE players 
-            SET mu = 25.0, 
-                sigma = 8.333,
-                last_updated = datetime('now')
-        ''')
-        
-        cursor.execute('''
-            SELECT match_id, player1_id, player2_id, player1_score, player2_score
-            FROM matches 
-            ORDER BY timestamp ASC
-        ''')
-        
-        for match in cursor.fetchall():
-            match_id, p1_id, p2_id, score1, score2 = match
-            
-            p1 = self._get_player(p1_id, cursor)
-            p2 = self._get_player(p2_id, cursor)
-            
-            winner = 1 if score1 > score2 else 2
-            new_p1, new_p2 = self.trueskill.rate_match(
-                Rating(p1.mu, p1.sigma),
-                Rating(p2.mu, p2.sigma),
-                winner
-            )
-            
-            cursor.execute('''
-                UPDATE players 
-                SET mu = ?, sigma = ?
-                WHERE player_id = ?
-            ''', (new_p1.mu, new_p1.sigma, p1_id))
-            cursor.execute('''
-                UPDATE players 
-                SET mu = ?, sigma = ?
-                WHERE player_id = ?
-            ''', (new_p2.mu, new_p2.sigma, p2_id))
+        stats = self.replayer.rebuild(cursor)
+        season_stats.rebuild(cursor)
+        player_features.rebuild(cursor)
+        return stats
+
+    def _finish_pending_replay(self, conn):
+        """Rate matches an interrupted import committed without a replay"""
+        cursor = conn.cursor()
+        cursor.execute('SELECT 1 FROM system_settings WHERE key = ?', (_REPLAY_PENDING,))
+        if cursor.fetchone():
+            self._recalculate_all_ratings(conn)
+            cursor.execute('DELETE FROM system_settings WHERE key = ?', (_REPLAY_PENDING,))
+
+    def import_matches(self, rows, chunk_size: int = 5000,
+                       checkpoint: str = None, progress=None) -> ImportStats:
+        """Bulk-load matches and rate them with one replay at the end.
+
+        ``rows`` yields dicts with player1/player2 (names), score1/score2 and
+        optional timestamp and season. Unknown players are created. Each chunk
+        is committed on its own; when ``checkpoint`` names the source, the
+        number of rows committed is stored alongside the chunk so a rerun
+        skips them. ``progress(matches, seconds)`` is called after each chunk.
+
+        If a row fails, the chunks already committed are rated before the
+        error propagates. Should that replay not happen either, a marker
+        stored with the first chunk makes the next write, or the next
+        start-up, run it.
+        """
+        start = time.perf_counter()
+        key = f'import_checkpoint:{checkpoint}' if checkpoint else None
+        default = self.trueskill.create_rating()
+
+        with self.db_handler.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT name, player_id FROM players')
+            player_ids = dict(cursor.fetchall())
+            season = self._get_current_season(cursor)
+            done = 0
+            if key:
+                cursor.execute('SELECT value FROM system_settings WHERE key = ?', (key,))
+                row = cursor.fetchone()
+                done = int(row[0]) if row else 0
+
+        skipped, imported, created = done, 0, 0
+        seasons = set()
+        rows = iter(rows)
+        for _ in range(skipped):
+            next(rows, None)
+
+        try:
+            while True:
+                chunk = list(itertools.islice(rows, chunk_size))
+                if not chunk:
+                    break
+
+                with self.db_handler.connection() as conn:
+                    cursor = conn.cursor()
+                    values = []
+                    matchups = {}
+                    for offset, row in enumerate(chunk, done + 1):
+                        score1, score2 = int(row['score1']), int(row['score2'])
+                        if score1 == score2:
+                            raise ValueError(f"Row {offset}: draws are not allowed")
+
+                        ids = []
+                        for name in (row['player1'], row['player2']):
+                            if name not in player_ids:
+                                cursor.execute('''
+                                    INSERT INTO players (name, mu, sigma) VALUES (?, ?, ?)
+                                ''', (name, default.mu, default.sigma))
+                                player_ids[name] = cursor.lastrowid
+                                created += 1
+                            ids.append(player_ids[name])
+
+                        try:
+                            timestamp = played_timestamp(row.get('timestamp'))
+                        except ValueError as e:
+                            raise ValueError(f"Row {offset}: {e}")
+                        values.append((timestamp, *ids,
+                                       score1, score2, int(row.get('season') or season)))
+
+                        a, b = sorted(ids)
+                        stats = matchups.setdefault((a, b), [0, 0, 0])
+                        stats[0] += 1
+                        stats[1 if (score1 > score2) == (ids[0] == a) else 2] += 1
+
+                    cursor.execute('SELECT COALESCE(MAX(match_id), 0) FROM matches')
+                    last_id = cursor.fetchone()[0]
+                    cursor.executemany('''
+                        INSERT INTO matches
+                        (timestamp, player1_id, player2_id, player1_score, player2_score, season)
+                        VALUES (COALESCE(?, CURRENT_TIMESTAMP), ?, ?, ?, ?, ?)
+                    ''', values)
+                    cursor.execute('''
+                        INSERT INTO match_participants
+                        SELECT match_id, player1_id, player2_id, player1_score > player2_score,
+                            player1_score, player2_score, season, timestamp
+                        FROM matches WHERE match_id > ?
+                        UNION ALL
+                        SELECT match_id, player2_id, player1_id, player2_score > player1_score,
+                            player2_score, player1_score, season, timestamp
+                        FROM matches WHERE match_id > ?
+                    ''', (last_id, last_id))
+                    cursor.executemany('''
+                        INSERT INTO matchups (player_a_id, player_b_id, matches_played, wins_a, wins_b)
+                        VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT(player_a_id, player_b_id) DO UPDATE SET
+                            matches_played = matches_played + excluded.matches_played,
+                            wins_a = wins_a + excluded.wins_a,
+                            wins_b = wins_b + excluded.wins_b
+                    ''', [(a, b, *stats) for (a, b), stats in matchups.items()])
+
+                    chunk_seasons = {value[-1] for value in values}
+                    self._invalidate_season_ratings(cursor, chunk_seasons)
+                    seasons |= chunk_seasons
+                    cursor.execute('''
+                        INSERT OR REPLACE INTO system_settings (key, value) VALUES (?, '1')
+                    ''', (_REPLAY_PENDING,))
+
+                    done += len(chunk)
+                    imported += len(chunk)
+                    if key:
+                        cursor.execute('''
+                            INSERT OR REPLACE INTO system_settings (key, value) VALUES (?, ?)
+                        ''', (key, str(done)))
+
+                if progress:
+                    progress(imported, time.perf_counter() - start)
+        except Exception:
+            # Rate what earlier chunks committed before reporting the row
+            if imported:
+                with self.db_handler.connection() as conn:
+                    self._finish_pending_replay(conn)
+            raise
+
+        # Imported matches have no snapshots yet: one replay rates them all
+        with self.db_handler.connection() as conn:
+            self._recalculate_all_ratings(conn)
+            self._invalidate_season_ratings(conn.cursor(), seasons)
+            conn.execute('DELETE FROM system_settings WHERE key = ?', (_REPLAY_PENDING,))
+            if key:
+                conn.execute('DELETE FROM system_settings WHERE key = ?', (key,))
+
+        return ImportStats(imported, created, skipped, time.perf_counter() - start)
+
+    def export(self, dataset: str, out, fmt: str = 'csv',
+               since: int = None, batch_size: int = 1000) -> int:
+        """Stream matches, ratings_history or the ladder to a file object"""
+        with self.db_handler.connection() as conn:
+            return match_export.export(conn.cursor(), dataset, out, fmt, since, batch_size)
+
+    def verify_aggregates(self) -> list[dict]:
+        """Rebuild player_season_stats and return the rows that had drifted"""
+        with self.db_handler.connection() as conn:
+            return season_stats.rebuild(conn.cursor())
+
+    def backtest(self, batch_size: int = 10000) -> BacktestReport:
+        """Score every recorded match with the predictors, using only the
+        matches before it"""
+        with self.db_handler.connection() as conn:
+            return run_backtest(conn.cursor(), self.trueskill, self.trueskill_env.beta,
+                                batch_size=batch_size)
+
+    def rebuild_features(self, write: bool = True) -> list[dict]:
+        """Check player_features and matchups against the match history.
+
+        Returns the rows that had drifted; with ``write`` they are rebuilt.
+        """
+        with self.db_handler.connection() as conn:
+            return player_features.rebuild(conn.cursor(), write)
+
+    def rebuild_ratings(self) -> ReplayStats:
+        """Replay the whole history and rewrite players and ratings_history"""
+        with self.db_handler.connection() as conn:
+            return self._recalculate_all_ratings(conn)
 
     def _get_player(self, player_id: int, cursor) -> Player:
         cursor.execute('''
@@ -229,15 +524,83 @@ class MatchProcessor:
             (1 if (winner == 2 and not is_reversed) or (winner == 1 and is_reversed) else 0)
         ))
 
+    def _insert_participants(self, match_id: int, cursor):
+        """Mirror a match into match_participants, one row per player"""
+        cursor.execute('''
+            INSERT INTO match_participants
+            SELECT match_id, player1_id, player2_id, player1_score > player2_score,
+                player1_score, player2_score, season, timestamp
+            FROM matches WHERE match_id = ?
+            UNION ALL
+            SELECT match_id, player2_id, player1_id, player2_score > player1_score,
+                player2_score, player1_score, season, timestamp
+            FROM matches WHERE match_id = ?
+        ''', (match_id, match_id))
+
     def get_ladder(self) -> list[Player]:
+        return self.ratings.ladder()
+
+    def get_ladder_as_of(self, when) -> list[Player]:
+        """Ladder as it stood after a match ID (int) or at a timestamp.
+
+        ratings_history already checkpoints every player before each of
+        their matches, so a player's rating at any point is the snapshot of
+        their next match, or their current rating if they have not played
+        since. No replay is needed and replays keep the snapshots current.
+        A bare date includes every match played that day.
+        """
         with self.db_handler.connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT player_id, name, mu, sigma, last_updated 
-                FROM players 
-                ORDER BY (mu - 3*sigma) DESC
-            ''')
-            return [Player(*row) for row in cursor.fetchall()]
+            if isinstance(when, int):
+                cursor.execute('SELECT timestamp FROM matches WHERE match_id = ?', (when,))
+                row = cursor.fetchone()
+                if not row:
+                    raise ValueError(f"Match {when} not found")
+                bound = (row[0], when)
+            else:
+                if isinstance(when, str) and len(when.strip()) == 10:
+                    when = f"{when.strip()} 23:59:59"
+                bound = (normalize_timestamp(when), _MAX_MATCH_ID)
+
+            ratings = self._ratings_at(cursor, *bound)
+            cursor.execute('SELECT player_id, name FROM players')
+            ladder = [Player(pid, name, *ratings[pid], bound[0]) for pid, name in cursor.fetchall()]
+            ladder.sort(key=lambda p: (p.mu - 3*p.sigma), reverse=True)
+            return ladder
+
+    def _ratings_at(self, cursor, timestamp, match_id: int, player_ids=None) -> dict:
+        """(mu, sigma) per player just after the (timestamp, match_id) position.
+
+        That is the pre-match snapshot of the player's next match, or their
+        current rating if they have not played since.
+        """
+        where = ''
+        params = [timestamp, timestamp, match_id]
+        if player_ids is not None:
+            where = f"WHERE p.player_id IN ({', '.join('?' * len(player_ids))})"
+            params.extend(player_ids)
+        cursor.execute(f'''
+            SELECT p.player_id, COALESCE(nxt.mu, p.mu), COALESCE(nxt.sigma, p.sigma)
+            FROM players p
+            LEFT JOIN ratings_history nxt ON nxt.player_id = p.player_id AND nxt.match_id = (
+                SELECT mp.match_id FROM match_participants mp
+                WHERE mp.player_id = p.player_id
+                    AND (mp.timestamp > ? OR (mp.timestamp = ? AND mp.match_id > ?))
+                ORDER BY mp.timestamp ASC, mp.match_id ASC
+                LIMIT 1
+            )
+            {where}
+        ''', params)
+        return {pid: (mu, sigma) for pid, mu, sigma in cursor.fetchall()}
+
+    def _season_at(self, cursor, timestamp) -> int:
+        """Season of the last match played at or before ``timestamp``"""
+        cursor.execute('''
+            SELECT season FROM matches WHERE timestamp <= ?
+            ORDER BY timestamp DESC, match_id DESC LIMIT 1
+        ''', (timestamp,))
+        row = cursor.fetchone()
+        return row[0] if row else self._get_current_season(cursor)
 
     def get_head_to_head(self, player1_id: int, player2_id: int) -> dict:
         a, b = sorted((player1_id, player2_id))
@@ -276,32 +639,6 @@ class MatchProcessor:
             cursor = conn.cursor()
             cursor.execute('DELETE FROM players WHERE player_id = ?', (player_id,))
 
-    def get_match_history(self, player_id: int) -> list[dict]:
-        with self.db_handler.connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT m.timestamp, 
-                    p1.player_id, p1.name, m.player1_score,
-                    p2.player_id, p2.name, m.player2_score
-                FROM matches m
-                JOIN players p1 ON m.player1_id = p1.player_id
-                JOIN players p2 ON m.player2_id = p2.player_id
-                WHERE m.player1_id = ? OR m.player2_id = ?
-                ORDER BY m.timestamp DESC
-            ''', (player_id, player_id))
-            rows = cursor.fetchall()
-
-        return [{
-            'date': row[0],
-            'player1_id': row[1],
-            'player1': row[2],
-            'score1': row[3],
-            'player2_id': row[4],
-            'player2': row[5],
-            'score2': row[6],
-            'is_win': (row[3] > row[6]) if (row[1] == player_id) else (row[6] > row[3])
-        } for row in rows]
-
     def get_recent_matches(self, limit=10) -> list[dict]:
         with self.db_handler.connection() as conn:
             cursor = conn.cursor()
@@ -326,6 +663,97 @@ class MatchProcessor:
                 'score2': row[7]
             } for row in cursor.fetchall()]
 
+    def get_matches_page(self, before: int = None, after: int = None, limit: int = 10,
+                         player_id: int = None, season: int = None) -> dict:
+        """One page of matches, newest match_id first, by keyset.
+
+        Pass the ``older`` cursor of a page as ``before`` to get the next
+        page, or its ``newer`` cursor as ``after`` to go back; either is
+        None at the ends. ``total`` comes from player_season_stats, so no
+        page scans more than ``limit + 1`` rows whatever the history size.
+        """
+        if player_id is not None:
+            source = 'match_participants mp JOIN matches m ON m.match_id = mp.match_id'
+            key = 'mp.match_id'
+            conditions, params = ['mp.player_id = ?'], [player_id]
+        else:
+            source, key, conditions, params = 'matches m', 'm.match_id', [], []
+        if season is not None:
+            conditions.append('m.season = ?')
+            params.append(season)
+
+        def where(*extra):
+            clauses = conditions + list(extra)
+            return f"WHERE {' AND '.join(clauses)}" if clauses else ''
+
+        if after is not None:
+            page_where, order, bound = where(f'{key} > ?'), 'ASC', [after]
+        elif before is not None:
+            page_where, order, bound = where(f'{key} < ?'), 'DESC', [before]
+        else:
+            page_where, order, bound = where(), 'DESC', []
+
+        with self.db_handler.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT m.match_id, m.timestamp, m.season,
+                    p1.player_id, p1.name, m.player1_score,
+                    p2.player_id, p2.name, m.player2_score
+                FROM {source}
+                JOIN players p1 ON m.player1_id = p1.player_id
+                JOIN players p2 ON m.player2_id = p2.player_id
+                {page_where}
+                ORDER BY {key} {order}
+                LIMIT ?
+            ''', params + bound + [limit])
+            rows = cursor.fetchall()
+            if order == 'ASC':
+                rows.reverse()
+
+            def exists(condition, bound):
+                cursor.execute(f'SELECT 1 FROM {source} {where(condition)} LIMIT 1',
+                               params + [bound])
+                return cursor.fetchone() is not None
+
+            newer = older = None
+            if rows:
+                if exists(f'{key} > ?', rows[0][0]):
+                    newer = rows[0][0]
+                if exists(f'{key} < ?', rows[-1][0]):
+                    older = rows[-1][0]
+
+            stats_conditions, stats_params = [], []
+            if player_id is not None:
+                stats_conditions.append('player_id = ?')
+                stats_params.append(player_id)
+            if season is not None:
+                stats_conditions.append('season = ?')
+                stats_params.append(season)
+            stats_where = f"WHERE {' AND '.join(stats_conditions)}" if stats_conditions else ''
+            cursor.execute(f'''
+                SELECT COALESCE(SUM(played), 0) FROM player_season_stats {stats_where}
+            ''', stats_params)
+            played = cursor.fetchone()[0]
+            # Without a player filter every match is counted once per side
+            total = played if player_id is not None else played // 2
+
+        return {
+            'matches': [{
+                'match_id': row[0],
+                'date': row[1],
+                'season': row[2],
+                'player1_id': row[3],
+                'player1': row[4],
+                'score1': row[5],
+                'player2_id': row[6],
+                'player2': row[7],
+                'score2': row[8]
+            } for row in rows],
+            'newer': newer,
+            'older': older,
+            'total': total
+        }
+
     def get_ratings_by_match(self, match_id: int) -> list[dict]:
         with self.db_handler.connection() as conn:
             cursor = conn.cursor()
@@ -343,18 +771,11 @@ class MatchProcessor:
                 SELECT 
                     p.player_id,
                     p.name,
-                    COUNT(m.match_id) AS matches_played,
-                    SUM(CASE 
-                        WHEN (m.player1_id = p.player_id AND m.player1_score > m.player2_score) OR 
-                            (m.player2_id = p.player_id AND m.player2_score > m.player1_score) 
-                        THEN 1 ELSE 0 END) AS wins,
-                    SUM(CASE 
-                        WHEN (m.player1_id = p.player_id AND m.player1_score < m.player2_score) OR 
-                            (m.player2_id = p.player_id AND m.player2_score < m.player1_score) 
-                        THEN 1 ELSE 0 END) AS losses
+                    COALESCE(SUM(s.played), 0) AS matches_played,
+                    COALESCE(SUM(s.wins), 0) AS wins,
+                    COALESCE(SUM(s.losses), 0) AS losses
                 FROM players p
-                LEFT JOIN matches m 
-                    ON p.player_id = m.player1_id OR p.player_id = m.player2_id
+                LEFT JOIN player_season_stats s ON s.player_id = p.player_id
                 GROUP BY p.player_id, p.name
             ''')
             
@@ -379,6 +800,11 @@ class MatchProcessor:
             cursor = conn.cursor()
             # Order matters due to foreign key constraints
             cursor.execute('DELETE FROM ratings_history')
+            cursor.execute('DELETE FROM match_participants')
+            cursor.execute('DELETE FROM player_season_stats')
+            cursor.execute('DELETE FROM player_features')
+            cursor.execute('DELETE FROM season_ratings')
+            cursor.execute('DELETE FROM season_ratings_state')
             cursor.execute('DELETE FROM matches')
             cursor.execute('DELETE FROM matchups')
             cursor.execute('DELETE FROM players')
@@ -389,58 +815,33 @@ class MatchProcessor:
             cursor = conn.cursor()
             
             # Basic player info
-            player = self._get_player(player_id, cursor)
+            player = self.ratings.get(player_id)
             
-            # Peak rating
+            # Peak rating and match statistics
             cursor.execute('''
-                SELECT MAX(mu) FROM ratings_history 
+                SELECT MAX(peak_mu), SUM(played), SUM(wins), SUM(losses)
+                FROM player_season_stats
                 WHERE player_id = ?
             ''', (player_id,))
-            peak_rating = cursor.fetchone()[0] or player.mu
-
-            # Match statistics
-            cursor.execute('''
-                SELECT 
-                    COUNT(*) AS total_matches,
-                    SUM(CASE 
-                        WHEN (player1_id = ? AND player1_score > player2_score) OR
-                            (player2_id = ? AND player2_score > player1_score)
-                        THEN 1 ELSE 0 END) AS wins,
-                    SUM(CASE 
-                        WHEN (player1_id = ? AND player1_score < player2_score) OR
-                            (player2_id = ? AND player2_score < player1_score)
-                        THEN 1 ELSE 0 END) AS losses
-                FROM matches
-                WHERE player1_id = ? OR player2_id = ?
-            ''', (player_id, player_id, player_id, player_id, player_id, player_id))
-            total, wins, losses = cursor.fetchone()
+            peak_rating, total, wins, losses = cursor.fetchone()
+            peak_rating = peak_rating or player.mu
             total = total or 0
             wins = wins or 0
             losses = losses or 0
 
             # Opponent analysis
             cursor.execute('''
-                SELECT 
-                    CASE WHEN m.player1_id = ? THEN m.player2_id ELSE m.player1_id END AS opponent_id,
-                    COUNT(*) AS matches,
-                    SUM(CASE 
-                        WHEN (m.player1_id = ? AND m.player1_score > m.player2_score) OR
-                            (m.player2_id = ? AND m.player2_score > m.player1_score)
-                        THEN 1 ELSE 0 END) AS wins,
-                    SUM(CASE 
-                        WHEN (m.player1_id = ? AND m.player1_score < m.player2_score) OR
-                            (m.player2_id = ? AND m.player2_score < m.player1_score)
-                        THEN 1 ELSE 0 END) AS losses
-                FROM matches m
-                WHERE ? IN (m.player1_id, m.player2_id)
-                GROUP BY opponent_id
-            ''', (player_id, player_id, player_id, player_id, player_id, player_id))
+                SELECT mp.opponent_id, p.name,
+                    COUNT(*) AS matches, SUM(mp.won) AS wins, SUM(1 - mp.won) AS losses
+                FROM match_participants mp
+                JOIN players p ON p.player_id = mp.opponent_id
+                WHERE mp.player_id = ?
+                GROUP BY mp.opponent_id
+            ''', (player_id,))
             
             opponents = []
             for row in cursor.fetchall():
-                opp_id, matches, w, l = row
-                cursor.execute('SELECT name FROM players WHERE player_id = ?', (opp_id,))
-                name = cursor.fetchone()[0]
+                opp_id, name, matches, w, l = row
                 win_rate = w / matches if matches > 0 else 0
                 opponents.append({
                     'id': opp_id,
@@ -491,27 +892,18 @@ class MatchProcessor:
         
         return {'name': top['name'], 'rate': top['win_rate']}
     
-    def get_rating_history(self, player_id: int) -> list[dict]:
-        """Get historical ratings with match sequence numbers"""
+    def get_rating_history(self, player_id: int, max_points: int = None,
+                           method: str = 'lttb') -> list[dict]:
+        """Get historical ratings with match sequence numbers.
+
+        ``max_points`` downsamples the series for charts (see
+        core.downsample); only the kept points are turned into dicts.
+        """
         with self.db_handler.connection() as conn:
             cursor = conn.cursor()
             
             # Get initial rating
-            cursor.execute('''
-                SELECT mu, sigma, last_updated 
-                FROM players 
-                WHERE player_id = ?
-            ''', (player_id,))
-            initial = cursor.fetchone()
-            if not initial:
-                raise ValueError(f"Player {player_id} not found")
-            
-            history = [{
-                'mu': initial[0],
-                'sigma': initial[1],
-                'match_num': 0,
-                'timestamp': datetime.fromisoformat(initial[2])
-            }]
+            initial = self.ratings.get(player_id)
 
             # Get match-based ratings
             cursor.execute('''
@@ -521,68 +913,113 @@ class MatchProcessor:
                 WHERE rh.player_id = ?
                 ORDER BY m.timestamp ASC
             ''', (player_id,))
-            
-            for idx, row in enumerate(cursor.fetchall(), start=1):
-                history.append({
-                    'mu': row[0],
-                    'sigma': row[1],
-                    'match_num': idx,
-                    'timestamp': datetime.fromisoformat(row[2])
-                })
-                
-            return history
+            rows = cursor.fetchall()
+
+        mu = np.array([initial.mu] + [row[0] for row in rows])
+        sigma = np.array([initial.sigma] + [row[1] for row in rows])
+        timestamps = [initial.last_updated] + [row[2] for row in rows]
+        match_num = np.arange(len(mu))
+        keep = match_num if max_points is None else downsample(match_num, mu, max_points, method)
+        return [{
+            'mu': float(mu[i]),
+            'sigma': float(sigma[i]),
+            'match_num': int(i),
+            'timestamp': datetime.fromisoformat(str(timestamps[i]))
+        } for i in keep.tolist()]
     
-    def get_unified_rating_history(self, player_id: int) -> list[dict]:
-        """Get player's ratings aligned with global match sequence"""
+    def get_unified_rating_history(self, player_id: int, max_points: int = None,
+                                   method: str = 'lttb') -> list[dict]:
+        """Get player's ratings aligned with global match sequence.
+
+        The series is a step function over every match in the league, built
+        as arrays from the player's own rating changes; ``max_points``
+        downsamples it before any dicts are made.
+        """
         with self.db_handler.connection() as conn:
             cursor = conn.cursor()
-            
-            # Get all matches in chronological order
-            cursor.execute('''
-                SELECT match_id, timestamp 
-                FROM matches 
-                ORDER BY timestamp ASC
-            ''')
-            all_matches = [row[0] for row in cursor.fetchall()]
-            
-            # Get player's rating changes with match IDs
+            # Global match order, straight off the (timestamp, match_id) index
+            cursor.execute('SELECT match_id FROM matches ORDER BY timestamp, match_id')
+            order = np.fromiter((row[0] for row in cursor), dtype=np.int64)
+            total = len(order)
+
             cursor.execute('''
-                SELECT rh.mu, rh.sigma, m.match_id, m.timestamp
-                FROM ratings_history rh
-                JOIN matches m ON rh.match_id = m.match_id
-                WHERE rh.player_id = ?
-                ORDER BY m.timestamp ASC
+                SELECT match_id, mu, sigma FROM ratings_history WHERE player_id = ?
             ''', (player_id,))
-            player_changes = {row[2]: (row[0], row[1]) for row in cursor.fetchall()}
-            
+            changes = np.array(cursor.fetchall(), dtype=float).reshape(-1, 3)
+
             # Get initial rating
-            cursor.execute('SELECT mu, sigma FROM players WHERE player_id = ?', (player_id,))
-            current_mu, current_sigma = cursor.fetchone()
-            
-            # Build unified timeline
-            history = []
-            for global_match_num, match_id in enumerate(all_matches, start=1):
-                if match_id in player_changes:
-                    current_mu, current_sigma = player_changes[match_id]
-                history.append({
-                    'global_match_num': global_match_num,
-                    'mu': current_mu,
-                    'sigma': current_sigma
-                })
-                
-            return history
-        
+            player = self.ratings.get(player_id)
+
+        # Global match number of each change, in play order
+        sorter = np.argsort(order)
+        position = sorter[np.searchsorted(order, changes[:, 0].astype(np.int64), sorter=sorter)] + 1
+        steps = np.argsort(position)
+        position, step_mu, step_sigma = position[steps], changes[steps, 1], changes[steps, 2]
+
+        # Each global match shows the latest change at or before it, and
+        # the initial rating before the first
+        global_match_num = np.arange(1, total + 1)
+        mu = np.full(total, player.mu)
+        sigma = np.full(total, player.sigma)
+        latest = np.searchsorted(position, global_match_num, side='right') - 1
+        played = latest >= 0
+        mu[played] = step_mu[latest[played]]
+        sigma[played] = step_sigma[latest[played]]
+
+        keep = (np.arange(total) if max_points is None
+                else downsample(global_match_num, mu, max_points, method))
+        return [{
+            'global_match_num': int(global_match_num[i]),
+            'mu': float(mu[i]),
+            'sigma': float(sigma[i])
+        } for i in keep.tolist()]
+
+    def iter_rating_history(self, player_id: int, after: int = None, batch_size: int = 1000):
+        """Iterate a player's rating going into each of their matches, in play order.
+
+        Rows are read ``batch_size`` at a time by keyset, with the connection
+        released between batches, so a long history is never held in memory.
+        ``after`` is the match_id of the last row already seen. An unknown
+        player or cursor raises ValueError here, before anything is read.
+        """
+        self.ratings.get(player_id)
+        bound = ('', 0)
+        if after is not None:
+            with self.db_handler.connection() as conn:
+                row = conn.execute('''
+                    SELECT timestamp, match_id FROM match_participants
+                    WHERE player_id = ? AND match_id = ?
+                ''', (player_id, after)).fetchone()
+            if not row:
+                raise ValueError(f"Match {after} is not in player {player_id}'s history")
+            bound = row
+        return self._iter_rating_history(player_id, bound, batch_size)
+
+    def _iter_rating_history(self, player_id: int, bound, batch_size: int):
+        while True:
+            with self.db_handler.connection() as conn:
+                rows = conn.execute('''
+                    SELECT mp.match_id, mp.timestamp, rh.mu, rh.sigma
+                    FROM match_participants mp
+                    JOIN ratings_history rh
+                        ON rh.player_id = mp.player_id AND rh.match_id = mp.match_id
+                    WHERE mp.player_id = ?
+                        -- Row value, so each batch seeks rather than rescans
+                        AND (mp.timestamp, mp.match_id) > (?, ?)
+                    ORDER BY mp.timestamp ASC, mp.match_id ASC
+                    LIMIT ?
+                ''', (player_id, *bound, batch_size)).fetchall()
+            for match_id, timestamp, mu, sigma in rows:
+                yield {'match_id': match_id, 'timestamp': timestamp, 'mu': mu, 'sigma': sigma}
+            if len(rows) < batch_size:
+                return
+            bound = (rows[-1][1], rows[-1][0])
+
     def predict_win_probability(self, player1_id: int, player2_id: int) -> dict:
         """
         Predicts the win probability between two players based on their current ratings.
         """
-        with self.db_handler.connection() as conn:
-            cursor = conn.cursor()
-            try:
-                player1 = self._get_player(player1_id, cursor)
-                player2 = self._get_player(player2_id, cursor)
-            except ValueError as e:
-                raise e # Re-raise the error if a player isn't found
+        player1, player2 = self.ratings.get_many((player1_id, player2_id))
 
         # Use the formula based on TrueSkill principles
         # delta_mu = mu1 - mu2
@@ -590,20 +1027,10 @@ class MatchProcessor:
         # probability = cdf(delta_mu / denom) where cdf is the cumulative distribution function of a standard normal distribution
         # Alternatively, the formula from bayesian.py uses an equivalent logistic function: 1 / (1 + exp(-delta_mu / denominator))
 
-        delta_mu = player1.mu - player2.mu
-        sum_sigma_sq = player1.sigma**2 + player2.sigma**2
-        beta_sq = self.trueskill_env.beta**2 # Access beta from the TrueSkill instance
-
-        denominator = math.sqrt(2 * beta_sq + sum_sigma_sq)
-
-        if denominator == 0:
-             # Avoid division by zero; implies absolute certainty (rare)
-             # If delta_mu > 0, p1 wins; if < 0, p2 wins; if == 0, it's a 50/50 toss-up theoretically
-             prob_p1_wins = 0.5 if delta_mu == 0 else (1.0 if delta_mu > 0 else 0.0)
-        else:
-            # Using the logistic function approach equivalent to CDF for win probability
-            prob_p1_wins = 1 / (1 + math.exp(-delta_mu / denominator))
-
+        # Same function as the win probability matrix, so the two agree exactly
+        prob_p1_wins = float(win_probability(player1.mu, player1.sigma,
+                                             player2.mu, player2.sigma,
+                                             self.trueskill_env.beta))
 
         prob_p2_wins = 1.0 - prob_p1_wins
 
@@ -616,31 +1043,26 @@ class MatchProcessor:
             'player2_win_prob': prob_p2_wins
         }
 
+    def get_win_probability_matrix(self) -> dict:
+        """player_ids, names and an N x N array where ``matrix[i][j]`` is the
+        probability that player i beats player j"""
+        return self.win_matrix.get()
+
     def get_player_recent_matches(self, player_id: int, limit: int = 5) -> list[dict]:
         with self.db_handler.connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                SELECT m.player1_id, p1.name, m.player1_score,
-                    m.player2_id, p2.name, m.player2_score,
-                    m.timestamp
-                FROM matches m
-                JOIN players p1 ON m.player1_id = p1.player_id
-                JOIN players p2 ON m.player2_id = p2.player_id
-                WHERE m.player1_id = ? OR m.player2_id = ?
-                ORDER BY m.timestamp DESC
+                SELECT p.name, mp.won, mp.timestamp
+                FROM match_participants mp
+                JOIN players p ON p.player_id = mp.opponent_id
+                WHERE mp.player_id = ?
+                ORDER BY mp.timestamp DESC, mp.match_id DESC
                 LIMIT ?
-            ''', (player_id, player_id, limit))
+            ''', (player_id, limit))
             
             result = []
             for row in cursor.fetchall():
-                p1_id, p1_name, s1, p2_id, p2_name, s2, timestamp = row
-
-                if p1_id == player_id:
-                    opponent = p2_name
-                    is_win = s1 > s2
-                else:
-                    opponent = p1_name
-                    is_win = s2 > s1
+                opponent, is_win, timestamp = row
 
                 result.append({
                     'opponent': opponent,
@@ -651,10 +1073,7 @@ class MatchProcessor:
             return result
         
     def get_all_players(self):
-        with self.db_handler.connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT player_id, name FROM players ORDER BY name")
-            return [{"id": row[0], "name": row[1]} for row in cursor.fetchall()]
+        return [{"id": pid, "name": name} for pid, name in self.ratings.players()]
 
     def get_player_id_by_name(self, name: str) -> int:
         with self.db_handler.connection() as conn:
@@ -671,21 +1090,20 @@ class MatchProcessor:
             player_stats = []
 
             # Highest Climber and Biggest Thrower
-            cursor.execute('SELECT player_id, name FROM players')
-            players = cursor.fetchall()
+            # Initial rating is the snapshot before each player's first match of the week
+            cursor.execute('''
+                SELECT p.player_id, p.name, p.mu, (
+                    SELECT rh.mu FROM match_participants mp
+                    JOIN ratings_history rh
+                        ON rh.match_id = mp.match_id AND rh.player_id = mp.player_id
+                    WHERE mp.player_id = p.player_id AND mp.timestamp BETWEEN ? AND ?
+                    ORDER BY mp.timestamp ASC, mp.match_id ASC LIMIT 1
+                )
+                FROM players p
+            ''', (start_date, end_date))
             climbers = []
-            for (player_id, name) in players:
-                # Get initial rating (before first match of the week)
-                cursor.execute('''
-                    SELECT rh.mu FROM ratings_history rh
-                    JOIN matches m ON rh.match_id = m.match_id
-                    WHERE rh.player_id = ? AND m.timestamp >= ? AND m.timestamp <= ?
-                    ORDER BY m.timestamp ASC LIMIT 1
-                ''', (player_id, start_date, end_date))
-                initial_mu = cursor.fetchone()
-                cursor.execute('SELECT mu FROM players WHERE player_id = ?', (player_id,))
-                final_mu = cursor.fetchone()[0]
-                delta = final_mu - (initial_mu[0] if initial_mu else final_mu)
+            for (player_id, name, final_mu, initial_mu) in cursor.fetchall():
+                delta = final_mu - (initial_mu if initial_mu is not None else final_mu)
                 climbers.append((player_id, name, delta))
 
             # Sort climbers
@@ -695,17 +1113,14 @@ class MatchProcessor:
 
             # Win Rates
             win_rates = []
-            for (player_id, name) in players:
-                cursor.execute('''
-                    SELECT 
-                        SUM(CASE WHEN (player1_id = ? AND player1_score > player2_score) OR
-                                        (player2_id = ? AND player2_score > player1_score)
-                                THEN 1 ELSE 0 END) AS wins,
-                        COUNT(*) AS total
-                    FROM matches
-                    WHERE (player1_id = ? OR player2_id = ?) AND timestamp BETWEEN ? AND ?
-                ''', (player_id, player_id, player_id, player_id, start_date, end_date))
-                wins, total = cursor.fetchone()
+            cursor.execute('''
+                SELECT p.name, SUM(mp.won) AS wins, COUNT(mp.match_id) AS total
+                FROM players p
+                LEFT JOIN match_participants mp
+                    ON mp.player_id = p.player_id AND mp.timestamp BETWEEN ? AND ?
+                GROUP BY p.player_id
+            ''', (start_date, end_date))
+            for (name, wins, total) in cursor.fetchall():
                 win_rate = (wins / total) if total > 0 else 0.0
                 win_rates.append((name, win_rate))
 
@@ -733,27 +1148,10 @@ class MatchProcessor:
                 # In MatchProcessor.get_weekly_summary() method:
                 # In MatchProcessor.get_weekly_summary():
                 cursor.execute('''
-                    SELECT 
-                        SUM(CASE 
-                            WHEN (player1_id = ? AND player1_score > player2_score) OR 
-                                (player2_id = ? AND player2_score > player1_score) 
-                            THEN 1 ELSE 0 END) AS wins_p1,
-                        SUM(CASE 
-                            WHEN (player1_id = ? AND player1_score > player2_score) OR 
-                                (player2_id = ? AND player2_score > player1_score) 
-                            THEN 1 ELSE 0 END) AS wins_p2
-                    FROM matches
-                    WHERE (
-                        (player1_id = ? AND player2_id = ?) OR 
-                        (player2_id = ? AND player1_id = ?)
-                    ) AND timestamp BETWEEN ? AND ?
-                ''', (
-                    p1, p1,  # Wins for Luka (p1)
-                    p2, p2,  # Wins for Alex (p2)
-                    p1, p2,  # Matches where p1 is player1 and p2 is player2
-                    p1, p2,  # Matches where p2 is player1 and p1 is player2
-                    start_date, end_date
-                ))
+                    SELECT SUM(won) AS wins_p1, SUM(1 - won) AS wins_p2
+                    FROM match_participants
+                    WHERE player_id = ? AND opponent_id = ? AND timestamp BETWEEN ? AND ?
+                ''', (p1, p2, start_date, end_date))
                 wins_p1, wins_p2 = cursor.fetchone()
             else:
                 p1_name = p2_name = count = wins_p1 = wins_p2 = None
@@ -777,47 +1175,112 @@ class MatchProcessor:
             return 2
 
     def get_season_ladder(self, season_id: int) -> list[Player]:
-        """Generate ladder for a specific season by reprocessing its matches"""
-        from trueskill import Rating, rate_1vs1
-        
+        """Ladder for a specific season from the maintained season ratings"""
+        default = self.trueskill.create_rating()
+
         with self.db_handler.connection() as conn:
             cursor = conn.cursor()
-            # Get all matches in the season
-            cursor.execute('''
-                SELECT player1_id, player2_id, player1_score, player2_score
-                FROM matches
-                WHERE season = ?
-                ORDER BY timestamp ASC
-            ''', (season_id,))
-            matches = cursor.fetchall()
-            
-            # Initialize player ratings
-            cursor.execute('SELECT player_id FROM players')
-            players = {row[0]: Rating() for row in cursor.fetchall()}
-            
-            # Process each match
-            for p1_id, p2_id, s1, s2 in matches:
-                winner = 1 if s1 > s2 else 2
-                if winner == 1:
-                    new_p1, new_p2 = rate_1vs1(players[p1_id], players[p2_id])
-                else:
-                    new_p2, new_p1 = rate_1vs1(players[p2_id], players[p1_id])
-                players[p1_id] = new_p1
-                players[p2_id] = new_p2
-            
-            # Convert to Player objects sorted by TrueSkill
-            ladder = []
-            for player_id in players:
-                cursor.execute('SELECT name FROM players WHERE player_id = ?', (player_id,))
-                name = cursor.fetchone()[0]
-                mu = players[player_id].mu
-                sigma = players[player_id].sigma
-                ladder.append(Player(player_id, name, mu, sigma, datetime.now()))
-            
+            if not self._season_ratings_built(cursor, season_id):
+                # Filling the cache changes no ratings, so readers' caches
+                # keyed on data_version stay valid
+                with self.db_handler.cache_writes():
+                    self._build_season_ratings(cursor, season_id)
+
+            # Everyone appears on the ladder, untouched players at the default
             # Sort by TrueSkill mean minus 3*sigma
-            ladder.sort(key=lambda p: (p.mu - 3*p.sigma), reverse=True)
-            return ladder
-        
+            cursor.execute('''
+                SELECT p.player_id, p.name,
+                    COALESCE(s.mu, ?) AS season_mu, COALESCE(s.sigma, ?) AS season_sigma
+                FROM players p
+                LEFT JOIN season_ratings s
+                    ON s.season = ? AND s.player_id = p.player_id
+                ORDER BY (season_mu - 3*season_sigma) DESC, p.player_id
+            ''', (default.mu, default.sigma, season_id))
+            now = datetime.now()
+            return [Player(pid, name, mu, sigma, now) for pid, name, mu, sigma in cursor.fetchall()]
+
+    def _season_ratings_built(self, cursor, season_id: int) -> bool:
+        cursor.execute('SELECT 1 FROM season_ratings_state WHERE season = ?', (season_id,))
+        return cursor.fetchone() is not None
+
+    def _build_season_ratings(self, cursor, season_id: int):
+        """Replay one season into season_ratings and mark it complete"""
+        ratings = self.replayer.season_ratings(cursor, season_id)
+        cursor.execute('''
+            SELECT player_id, played FROM player_season_stats WHERE season = ?
+        ''', (season_id,))
+        played = dict(cursor.fetchall())
+
+        cursor.execute('DELETE FROM season_ratings WHERE season = ?', (season_id,))
+        cursor.executemany('''
+            INSERT INTO season_ratings (season, player_id, mu, sigma, matches)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(season_id, pid, mu, sigma, played.get(pid, 0)) for pid, (mu, sigma) in ratings.items()])
+        cursor.execute('''
+            INSERT OR REPLACE INTO season_ratings_state (season, matches) VALUES (?, ?)
+        ''', (season_id, sum(played.values()) // 2))
+
+    def _update_season_ratings(self, cursor, season_id: int, p1_id: int, p2_id: int, winner: int):
+        """Fold a newly recorded match into both players' season ratings.
+
+        A player's row is seeded at the default rating by their first match
+        of the season.
+        """
+        if not self._season_ratings_built(cursor, season_id):
+            # First write since an upgrade or an invalidation; the replay
+            # already includes this match
+            self._build_season_ratings(cursor, season_id)
+            return
+
+        default = self.trueskill.create_rating()
+        cursor.execute('''
+            SELECT player_id, mu, sigma FROM season_ratings
+            WHERE season = ? AND player_id IN (?, ?)
+        ''', (season_id, p1_id, p2_id))
+        current = {pid: (mu, sigma) for pid, mu, sigma in cursor.fetchall()}
+        new_p1, new_p2 = self.trueskill.rate_values(
+            current.get(p1_id, (default.mu, default.sigma)),
+            current.get(p2_id, (default.mu, default.sigma)),
+            winner
+        )
+        cursor.executemany('''
+            INSERT INTO season_ratings (season, player_id, mu, sigma, matches)
+            VALUES (?, ?, ?, ?, 1)
+            ON CONFLICT(season, player_id) DO UPDATE SET
+                mu = excluded.mu, sigma = excluded.sigma, matches = matches + 1
+        ''', [(season_id, p1_id, *new_p1), (season_id, p2_id, *new_p2)])
+        cursor.execute('''
+            UPDATE season_ratings_state SET matches = matches + 1 WHERE season = ?
+        ''', (season_id,))
+
+    def _invalidate_season_ratings(self, cursor, seasons):
+        """Mark seasons whose history changed for a replay on next use"""
+        for season_id in set(seasons):
+            cursor.execute('DELETE FROM season_ratings_state WHERE season = ?', (season_id,))
+            cursor.execute('DELETE FROM season_ratings WHERE season = ?', (season_id,))
+
+    def start_new_season(self) -> int:
+        """Advance the current season and return its number.
+
+        No per-player rows are written: each player's season rating is
+        seeded by their first match of the new season.
+        """
+        with self.db_handler.connection() as conn:
+            cursor = conn.cursor()
+            new_season = self._get_current_season(cursor) + 1
+            cursor.execute('''
+                INSERT INTO system_settings (key, value) 
+                VALUES ('current_season', ?)
+                ON CONFLICT(key) DO UPDATE SET value=excluded.value
+            ''', (new_season,))
+            # Empty seasons are complete as they are; one that already has
+            # matches (imported into it) is replayed on first use
+            cursor.execute('''
+                INSERT OR IGNORE INTO season_ratings_state (season, matches)
+                SELECT ?, 0 WHERE NOT EXISTS (SELECT 1 FROM matches WHERE season = ?)
+            ''', (new_season, new_season))
+            return new_season
+
     # In MatchProcessor class
     def get_current_season(self) -> int:
         with self.db_handler.connection() as conn:
@@ -829,7 +1292,9 @@ class MatchProcessor:
     def get_available_seasons(self) -> list[int]:
         with self.db_handler.connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('SELECT DISTINCT season FROM matches ORDER BY season DESC')
+            # The aggregate has a row per player per season played, far
+            # fewer than matches
+            cursor.execute('SELECT DISTINCT season FROM player_season_stats ORDER BY season DESC')
             seasons = [row[0] for row in cursor.fetchall()]
             # Ensure season 1 exists even if no matches
             if not seasons:
@@ -0,0 +1,228 @@
+# core/player_features.py
+"""Per-player inputs of the historical prediction model.
+
+``player_features.recent`` keeps each player's last RECENT_WINDOW results.
+Totals come from ``player_season_stats`` and per-opponent tallies from
+``matchups``, both already maintained on every write. ``FeatureCache``
+serves all three from memory.
+"""
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+RECENT_WINDOW = 20
+
+@dataclass
+class PlayerFeatures:
+    played: int = 0
+    wins: int = 0
+    recent: str = ''   # newest first, '1' for a win
+    h2h: dict = field(default_factory=dict)   # opponent_id -> (played, wins)
+
+    def win_rate(self) -> float:
+        return self.wins / self.played if self.played > 0 else 0.0
+
+    def recent_win_rate(self, games: int) -> float:
+        return self.recent[:games].count('1') / games if games > 0 else 0.0
+
+def apply_match(cursor, match_id: int):
+    """Push a match onto both players' recent results.
+
+    Only valid for a match ordered after every other match of its players.
+    """
+    cursor.execute('''
+        INSERT INTO player_features (player_id, recent)
+        SELECT player_id, CASE WHEN won THEN '1' ELSE '0' END
+        FROM match_participants WHERE match_id = ?
+        ON CONFLICT(player_id) DO UPDATE SET
+            recent = substr(excluded.recent || recent, 1, ?)
+    ''', (match_id, RECENT_WINDOW))
+
+def refresh(cursor, player_ids):
+    """Recompute the given players' recent results"""
+    for pid in set(player_ids):
+        cursor.execute('''
+            SELECT won FROM match_participants
+            WHERE player_id = ?
+            ORDER BY timestamp DESC, match_id DESC
+            LIMIT ?
+        ''', (pid, RECENT_WINDOW))
+        recent = ''.join('1' if won else '0' for (won,) in cursor.fetchall())
+        cursor.execute('''
+            INSERT OR REPLACE INTO player_features (player_id, recent) VALUES (?, ?)
+        ''', (pid, recent))
+
+def compute(cursor) -> dict:
+    """player_id -> recent results, from scratch"""
+    cursor.execute('''
+        SELECT player_id, won FROM (
+            SELECT player_id, won, ROW_NUMBER() OVER (
+                PARTITION BY player_id ORDER BY timestamp DESC, match_id DESC
+            ) AS recency
+            FROM match_participants
+        )
+        WHERE recency <= ?
+        ORDER BY player_id, recency
+    ''', (RECENT_WINDOW,))
+    recent = {}
+    for pid, won in cursor.fetchall():
+        recent[pid] = recent.get(pid, '') + ('1' if won else '0')
+    return recent
+
+def _expected_matchups(cursor) -> dict:
+    cursor.execute('''
+        SELECT player_id, opponent_id, COUNT(*), SUM(won)
+        FROM match_participants
+        WHERE player_id < opponent_id
+        GROUP BY player_id, opponent_id
+    ''')
+    return {(a, b): (played, wins, played - wins) for a, b, played, wins in cursor.fetchall()}
+
+def rebuild(cursor, write: bool = True) -> list[dict]:
+    """Check player_features and matchups against match_participants.
+
+    Returns the rows that were out of date and, unless ``write`` is False,
+    rewrites both tables.
+    """
+    expected = compute(cursor)
+    cursor.execute("SELECT player_id, recent FROM player_features WHERE recent != ''")
+    stored = dict(cursor.fetchall())
+    diffs = [{'table': 'player_features', 'key': (pid,),
+              'stored': stored.get(pid), 'expected': expected.get(pid)}
+             for pid in sorted(expected.keys() | stored.keys())
+             if stored.get(pid) != expected.get(pid)]
+
+    expected_matchups = _expected_matchups(cursor)
+    cursor.execute('SELECT player_a_id, player_b_id, matches_played, wins_a, wins_b FROM matchups')
+    stored_matchups = {(a, b): (played, wins_a, wins_b)
+                       for a, b, played, wins_a, wins_b in cursor.fetchall() if played > 0}
+    diffs.extend({'table': 'matchups', 'key': key,
+                  'stored': stored_matchups.get(key), 'expected': expected_matchups.get(key)}
+                 for key in sorted(expected_matchups.keys() | stored_matchups.keys())
+                 if stored_matchups.get(key) != expected_matchups.get(key))
+
+    if write and diffs:
+        cursor.execute('DELETE FROM player_features')
+        cursor.executemany('INSERT INTO player_features (player_id, recent) VALUES (?, ?)',
+                           expected.items())
+        cursor.execute('DELETE FROM matchups')
+        cursor.executemany('''
+            INSERT INTO matchups (player_a_id, player_b_id, matches_played, wins_a, wins_b)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(*key, *row) for key, row in expected_matchups.items()])
+    return diffs
+
+class FeatureCache:
+    """LRU of PlayerFeatures, kept coherent through ``data_version``.
+
+    Any commit this cache was not told about clears it; writers in this
+    process call ``write_through`` so only the players they touched are
+    evicted.
+    """
+    _caches = {}
+    _caches_lock = threading.Lock()
+
+    @classmethod
+    def for_handler(cls, db_handler) -> 'FeatureCache':
+        """Shared cache for the handler's database"""
+        with cls._caches_lock:
+            cache = cls._caches.get(db_handler.db_name)
+            if cache is None:
+                cache = cls._caches[db_handler.db_name] = cls(db_handler)
+            return cache
+
+    def __init__(self, db_handler, capacity: int = 1024):
+        self.db_handler = db_handler
+        self.capacity = capacity
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'clears': 0}
+
+    def get_many(self, player_ids) -> dict:
+        """player_id -> PlayerFeatures; players without matches get empty ones"""
+        player_ids = list(dict.fromkeys(player_ids))
+        with self.db_handler.connection() as conn:
+            cursor = conn.cursor()
+            if conn.in_transaction:
+                # Uncommitted writes in this thread: don't cache them
+                return self._load(cursor, player_ids)
+
+            version = self.db_handler.data_version(cursor)
+            found = {}
+            with self._lock:
+                if version != self.version:
+                    self._entries.clear()
+                    self.version = version
+                    self.stats['clears'] += 1
+                for pid in player_ids:
+                    entry = self._entries.get(pid)
+                    if entry is not None:
+                        self._entries.move_to_end(pid)
+                        found[pid] = entry
+                self.stats['hits'] += len(found)
+                self.stats['misses'] += len(player_ids) - len(found)
+
+            missing = [pid for pid in player_ids if pid not in found]
+            if missing:
+                loaded = self._load(cursor, missing)
+                found.update(loaded)
+                with self._lock:
+                    if self.version == version:
+                        self._entries.update(loaded)
+                        while len(self._entries) > self.capacity:
+                            self._entries.popitem(last=False)
+            return found
+
+    def write_through(self, cursor, player_ids):
+        """Evict these players once the current transaction commits"""
+        player_ids = list(player_ids)
+        self.db_handler.after_commit(lambda version: self._evict(player_ids, version))
+
+    def unaffected_write(self):
+        """Keep every entry across a transaction that changes no features"""
+        self.db_handler.after_commit(lambda version: self._evict((), version))
+
+    def _evict(self, player_ids, version):
+        with self._lock:
+            if version is None or self.version is None or self.version != version - 1:
+                return
+            for pid in player_ids:
+                self._entries.pop(pid, None)
+            self.version = version
+
+    @staticmethod
+    def _load(cursor, player_ids) -> dict:
+        ids_json = json.dumps(player_ids)
+        features = {pid: PlayerFeatures() for pid in player_ids}
+
+        cursor.execute('''
+            SELECT player_id, SUM(played), SUM(wins)
+            FROM player_season_stats
+            WHERE player_id IN (SELECT value FROM json_each(?))
+            GROUP BY player_id
+        ''', (ids_json,))
+        for pid, played, wins in cursor.fetchall():
+            features[pid].played, features[pid].wins = played, wins
+
+        cursor.execute('''
+            SELECT player_id, recent FROM player_features
+            WHERE player_id IN (SELECT value FROM json_each(?))
+        ''', (ids_json,))
+        for pid, recent in cursor.fetchall():
+            features[pid].recent = recent
+
+        cursor.execute('''
+            SELECT player_a_id, player_b_id, matches_played, wins_a, wins_b
+            FROM matchups WHERE player_a_id IN (SELECT value FROM json_each(?))
+            UNION ALL
+            SELECT player_a_id, player_b_id, matches_played, wins_a, wins_b
+            FROM matchups WHERE player_b_id IN (SELECT value FROM json_each(?))
+        ''', (ids_json, ids_json))
+        for a, b, played, wins_a, wins_b in cursor.fetchall():
+            if a in features:
+                features[a].h2h[b] = (played, wins_a)
+            if b in features:
+                features[b].h2h[a] = (played, wins_b)
+        return features
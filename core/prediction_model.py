@@ -1,165 +1,164 @@
 # core/prediction_model.py
-import math
+import numpy as np
 from trueskill import TrueSkill, Rating
 from database.db_handler import DatabaseHandler
 from datetime import datetime, timedelta
 from core.models import Player
+from core.rating_store import RatingStore
+from core.player_features import FeatureCache, RECENT_WINDOW
+from core.win_matrix import win_probability
 
 # Configuration
 FORM_LOOKBACK_GAMES = 5  # Recent matches for momentum analysis
+if FORM_LOOKBACK_GAMES > RECENT_WINDOW:
+    raise ValueError(f"FORM_LOOKBACK_GAMES ({FORM_LOOKBACK_GAMES}) exceeds the "
+                     f"{RECENT_WINDOW} results player_features keeps")
 MODEL_A_WEIGHT = 0.5     # Weight for historical model
 MODEL_B_WEIGHT = 0.5     # Weight for TrueSkill model
 
+# Model arithmetic shared by single and batch predictions; each works on
+# floats and elementwise on arrays
+def _share(a, b):
+    """a / (a + b), or 0.5 when both are zero"""
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    total = a + b
+    return np.where(total == 0, 0.5, a / np.where(total == 0, 1, total))
+
+def _h2h_rate(wins, total):
+    wins, total = np.asarray(wins, dtype=float), np.asarray(total, dtype=float)
+    return np.where(total > 0, wins / np.where(total > 0, total, 1), 0.5)
+
+def historical_probability(gross, momentum, h2h):
+    """Model A: weighted gross win rate, momentum and head-to-head"""
+    return 0.4 * h2h + 0.4 * momentum + 0.2 * gross
+
+def blend_probability(model_a, model_b):
+    return np.clip(MODEL_A_WEIGHT * model_a + MODEL_B_WEIGHT * model_b, 0.0, 1.0)
+
 class EnhancedPredictor:
     def __init__(self, db_name='rankings.db'):
         self.db_handler = DatabaseHandler(db_name)
         self.trueskill_env = TrueSkill()
+        self.ratings = RatingStore.for_handler(self.db_handler)
+        self.features = FeatureCache.for_handler(self.db_handler)
 
     # --------------------------
     # Core Prediction Method
     # --------------------------
     def predict_win_probability(self, player1_id: int, player2_id: int) -> dict:
-        with self.db_handler.connection() as conn:
-            cursor = conn.cursor()
-            
-            try:
-                # Get base player data
-                p1 = self._get_player(player1_id, cursor)
-                p2 = self._get_player(player2_id, cursor)
-            except ValueError as e:
-                raise e
-
-            # Model A: Historical Analysis
-            try:
-                model_a = self._historical_model(p1.player_id, p2.player_id, cursor)
-            except:
-                model_a = 0.5  # Fallback if historical data missing
-
-            # Model B: TrueSkill Analysis
-            model_b = self._trueskill_model(p1, p2)
-
-            # Blend predictions
-            # Blend predictions
-            blended = (MODEL_A_WEIGHT * model_a) + (MODEL_B_WEIGHT * model_b)
-            blended = max(0.0, min(1.0, blended))  # Fixed line
-
-            return {
-                'player1_id': p1.player_id,
-                'player1_name': p1.name,
-                'player2_id': p2.player_id,
-                'player2_name': p2.name,
-                'model_a': model_a,
-                'model_b': model_b,
-                'final_prediction': blended,
-                'model_weights': {'historical': MODEL_A_WEIGHT, 'trueskill': MODEL_B_WEIGHT}
-            }
+        # Get base player data
+        p1, p2 = self.ratings.get_many((player1_id, player2_id))
+        features = self.features.get_many((player1_id, player2_id))
+
+        # Model A: Historical Analysis
+        try:
+            model_a = self._historical_model(p1.player_id, p2.player_id, features)
+        except:
+            model_a = 0.5  # Fallback if historical data missing
+
+        # Model B: TrueSkill Analysis
+        model_b = self._trueskill_model(p1, p2)
+
+        # Blend predictions
+        blended = float(blend_probability(model_a, model_b))
+
+        return {
+            'player1_id': p1.player_id,
+            'player1_name': p1.name,
+            'player2_id': p2.player_id,
+            'player2_name': p2.name,
+            'model_a': model_a,
+            'model_b': model_b,
+            'final_prediction': blended,
+            'model_weights': {'historical': MODEL_A_WEIGHT, 'trueskill': MODEL_B_WEIGHT}
+        }
+
+    # --------------------------
+    # Batch Prediction
+    # --------------------------
+    def predict_many(self, pairs) -> list[dict]:
+        """Predict every (player1_id, player2_id) pair at once.
+
+        Features for all involved players are fetched together and the
+        models run vectorized. Results match predict_win_probability pair
+        by pair.
+        """
+        pairs = [(int(a), int(b)) for a, b in pairs]
+        if not pairs:
+            return []
+        ids = sorted({pid for pair in pairs for pid in pair})
+        index = {pid: i for i, pid in enumerate(ids)}
+        players = self.ratings.get_many(ids)
+        features = self.features.get_many(ids)
+        mu = np.array([p.mu for p in players])
+        sigma = np.array([p.sigma for p in players])
+        win_rate = np.array([features[pid].win_rate() for pid in ids])
+        recent_rate = np.array([features[pid].recent_win_rate(FORM_LOOKBACK_GAMES) for pid in ids])
+
+        first = np.array([index[a] for a, _ in pairs])
+        second = np.array([index[b] for _, b in pairs])
+        h2h_counts = np.array([features[a].h2h.get(b, (0, 0)) for a, b in pairs], dtype=float)
+
+        model_a = historical_probability(
+            gross=_share(win_rate[first], win_rate[second]),
+            momentum=_share(recent_rate[first], recent_rate[second]),
+            h2h=_h2h_rate(h2h_counts[:, 1], h2h_counts[:, 0])
+        )
+        model_b = win_probability(mu[first], sigma[first], mu[second], sigma[second],
+                                  self.trueskill_env.beta)
+        blended = blend_probability(model_a, model_b)
+
+        weights = {'historical': MODEL_A_WEIGHT, 'trueskill': MODEL_B_WEIGHT}
+        return [{
+            'player1_id': a,
+            'player1_name': players[index[a]].name,
+            'player2_id': b,
+            'player2_name': players[index[b]].name,
+            'model_a': float(pa),
+            'model_b': float(pb),
+            'final_prediction': float(pf),
+            'model_weights': dict(weights)
+        } for (a, b), pa, pb, pf in zip(pairs, model_a, model_b, blended)]
 
     # --------------------------
     # Historical Model (Model A)
     # --------------------------
-    def _historical_model(self, p1_id: int, p2_id: int, cursor) -> float:
+    def _historical_model(self, p1_id: int, p2_id: int, features: dict) -> float:
         """Combines gross WR, momentum, and head-to-head stats"""
         components = {
-            'gross': self._get_gross_win_rate(p1_id, p2_id, cursor),
-            'momentum': self._get_momentum(p1_id, p2_id, cursor),
-            'h2h': self._get_h2h_win_rate(p1_id, p2_id, cursor)
+            'gross': self._get_gross_win_rate(p1_id, p2_id, features),
+            'momentum': self._get_momentum(p1_id, p2_id, features),
+            'h2h': self._get_h2h_win_rate(p1_id, p2_id, features)
         }
         
         # Weighted average (adjust weights as needed)
-        return (
-            0.4 * components['h2h'] +
-            0.4 * components['momentum'] +
-            0.2 * components['gross']
-        )
+        return float(historical_probability(**components))
 
-    def _get_gross_win_rate(self, p1_id: int, p2_id: int, cursor) -> float:
+    def _get_gross_win_rate(self, p1_id: int, p2_id: int, features: dict) -> float:
         """Overall win rate comparison"""
-        p1_wr = self._calculate_win_rate(p1_id, cursor)
-        p2_wr = self._calculate_win_rate(p2_id, cursor)
-        
-        if p1_wr + p2_wr == 0:
-            return 0.5
-        return p1_wr / (p1_wr + p2_wr)
+        return float(_share(features[p1_id].win_rate(), features[p2_id].win_rate()))
 
-    def _get_momentum(self, p1_id: int, p2_id: int, cursor) -> float:
+    def _get_momentum(self, p1_id: int, p2_id: int, features: dict) -> float:
         """Recent performance comparison (last N games)"""
-        p1_momentum = self._calculate_recent_win_rate(p1_id, cursor)
-        p2_momentum = self._calculate_recent_win_rate(p2_id, cursor)
-        
-        if p1_momentum + p2_momentum == 0:
-            return 0.5
-        return p1_momentum / (p1_momentum + p2_momentum)
+        return float(_share(features[p1_id].recent_win_rate(FORM_LOOKBACK_GAMES),
+                            features[p2_id].recent_win_rate(FORM_LOOKBACK_GAMES)))
 
-    def _get_h2h_win_rate(self, p1_id: int, p2_id: int, cursor) -> float:
+    def _get_h2h_win_rate(self, p1_id: int, p2_id: int, features: dict) -> float:
         """Head-to-head win rate between these players"""
-        cursor.execute('''
-            SELECT COUNT(*),
-                SUM(CASE WHEN (player1_id = ? AND player1_score > player2_score) OR
-                            (player2_id = ? AND player2_score > player1_score)
-                        THEN 1 ELSE 0 END)
-            FROM matches
-            WHERE (player1_id = ? AND player2_id = ?)
-               OR (player2_id = ? AND player1_id = ?)
-        ''', (p1_id, p1_id, p1_id, p2_id, p1_id, p2_id))
-        
-        total, wins = cursor.fetchone()
-        return wins / total if total > 0 else 0.5
+        played, wins = features[p1_id].h2h.get(p2_id, (0, 0))
+        return float(_h2h_rate(wins, played))
 
     # --------------------------
     # TrueSkill Model (Model B)
     # --------------------------
     def _trueskill_model(self, p1: Player, p2: Player) -> float:
         """Pure TrueSkill prediction"""
-        delta_mu = p1.mu - p2.mu
-        sum_sigma = p1.sigma**2 + p2.sigma**2
-        beta_sq = self.trueskill_env.beta**2
-        denominator = math.sqrt(2 * beta_sq + sum_sigma)
-
-        if abs(denominator) < 1e-9:
-            return 0.5
-        return 1 / (1 + math.exp(-delta_mu / denominator))
+        return float(win_probability(p1.mu, p1.sigma, p2.mu, p2.sigma,
+                                     self.trueskill_env.beta))
 
     # --------------------------
     # Helper Methods
     # --------------------------
-    def _calculate_win_rate(self, player_id: int, cursor) -> float:
-        """Overall win rate for a single player"""
-        cursor.execute('''
-            SELECT COUNT(*),
-                SUM(CASE WHEN (player1_id = ? AND player1_score > player2_score) OR
-                            (player2_id = ? AND player2_score > player1_score)
-                        THEN 1 ELSE 0 END)
-            FROM matches
-            WHERE player1_id = ? OR player2_id = ?
-        ''', (player_id, player_id, player_id, player_id))
-        
-        total, wins = cursor.fetchone()
-        return wins / total if total > 0 else 0.0
-
-    def _calculate_recent_win_rate(self, player_id: int, cursor) -> float:
-        """Win rate in last N matches"""
-        cursor.execute('''
-            SELECT player1_score, player2_score 
-            FROM matches
-            WHERE player1_id = ? OR player2_id = ?
-            ORDER BY timestamp DESC
-            LIMIT ?
-        ''', (player_id, player_id, FORM_LOOKBACK_GAMES))
-        
-        wins = 0
-        for score1, score2 in cursor.fetchall():
-            if (score1 > score2 and player_id == score1) or (score2 > score1 and player_id == score2):
-                wins += 1
-        return wins / FORM_LOOKBACK_GAMES if FORM_LOOKBACK_GAMES > 0 else 0.0
-
-    def _get_player(self, player_id: int, cursor) -> Player:
+    def _get_player(self, player_id: int) -> Player:
         """Fetch player with error handling"""
-        cursor.execute('''
-            SELECT player_id, name, mu, sigma 
-            FROM players 
-            WHERE player_id = ?
-        ''', (player_id,))
-        row = cursor.fetchone()
-        if not row:
-            raise ValueError(f"Player {player_id} not found")
-        return Player(player_id=row[0], name=row[1], mu=row[2], sigma=row[3], last_updated=datetime.now())
\ No newline at end of file
+        return self.ratings.get(player_id)
\ No newline at end of file
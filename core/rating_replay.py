@@ -0,0 +1,150 @@
+# core/rating_replay.py
+import time
+from dataclasses import dataclass
+from core.trueskill_setup import TrueSkillSystem
+
+@dataclass
+class ReplayStats:
+    matches: int
+    players: int
+    seconds: float
+
+    @property
+    def matches_per_sec(self) -> float:
+        return self.matches / self.seconds if self.seconds > 0 else float('inf')
+
+class RatingReplayer:
+    """Replays match history in memory and writes the result in bulk.
+
+    Matches are always replayed in (timestamp, match_id) order so that
+    matches recorded within the same second keep their insertion order.
+    """
+
+    def __init__(self, trueskill: TrueSkillSystem):
+        self.trueskill = trueskill
+
+    def replay(self, matches, ratings: dict = None, history: list = None) -> dict:
+        """Rate ``matches`` in order, starting from ``ratings``.
+
+        ``matches`` yields (match_id, player1_id, player2_id, score1, score2)
+        and ``ratings`` maps player_id -> (mu, sigma); unseen players start at
+        the default rating. When ``history`` is given, the pre-match snapshots
+        are appended to it as (player_id, match_id, mu, sigma) rows.
+        """
+        default = self.trueskill.create_rating()
+        default = (default.mu, default.sigma)
+        ratings = {} if ratings is None else ratings
+        rate_values = self.trueskill.rate_values
+
+        for match_id, p1_id, p2_id, score1, score2 in matches:
+            r1 = ratings.get(p1_id, default)
+            r2 = ratings.get(p2_id, default)
+            if history is not None:
+                history.append((p1_id, match_id, *r1))
+                history.append((p2_id, match_id, *r2))
+            ratings[p1_id], ratings[p2_id] = rate_values(r1, r2, 1 if score1 > score2 else 2)
+        return ratings
+
+    def rebuild(self, cursor) -> ReplayStats:
+        """Recompute every rating from scratch and rewrite ratings_history"""
+        start = time.perf_counter()
+        cursor.execute('''
+            SELECT match_id, player1_id, player2_id, player1_score, player2_score
+            FROM matches
+            ORDER BY timestamp ASC, match_id ASC
+        ''')
+        matches = cursor.fetchall()
+        history = []
+        ratings = self.replay(matches, history=history)
+
+        default = self.trueskill.create_rating()
+        cursor.execute('SELECT player_id FROM players')
+        player_ids = [row[0] for row in cursor.fetchall()]
+
+        cursor.execute('DELETE FROM ratings_history')
+        cursor.executemany('''
+            INSERT INTO ratings_history (player_id, match_id, mu, sigma)
+            VALUES (?, ?, ?, ?)
+        ''', history)
+        cursor.executemany('''
+            UPDATE players
+            SET mu = ?, sigma = ?, last_updated = datetime('now')
+            WHERE player_id = ?
+        ''', [(*ratings.get(pid, (default.mu, default.sigma)), pid) for pid in player_ids])
+
+        return ReplayStats(len(matches), len(player_ids), time.perf_counter() - start)
+
+    def replay_from(self, cursor, timestamp, match_id: int, seed: dict,
+                    changed: set = None) -> bool:
+        """Re-rate the matches ordered after (timestamp, match_id).
+
+        ``seed`` maps player_id -> (mu, sigma) for the players whose rating at
+        that point no longer matches ``ratings_history``. Every other player
+        starts from their stored pre-match snapshot, so only matches that
+        involve an affected player are re-rated and only changed rows are
+        written. Returns False when a snapshot is missing. When ``changed`` is
+        given, players whose history or current rating may have been rewritten
+        are added to it.
+        """
+        cursor.execute('''
+            SELECT m.match_id, m.player1_id, m.player2_id,
+                m.player1_score, m.player2_score,
+                h1.mu, h1.sigma, h2.mu, h2.sigma
+            FROM matches m
+            LEFT JOIN ratings_history h1
+                ON h1.match_id = m.match_id AND h1.player_id = m.player1_id
+            LEFT JOIN ratings_history h2
+                ON h2.match_id = m.match_id AND h2.player_id = m.player2_id
+            WHERE m.timestamp > ? OR (m.timestamp = ? AND m.match_id > ?)
+            ORDER BY m.timestamp ASC, m.match_id ASC
+        ''', (timestamp, timestamp, match_id))
+
+        ratings = dict(seed)
+        history_updates = []
+        rate_values = self.trueskill.rate_values
+        for mid, p1_id, p2_id, score1, score2, mu1, sigma1, mu2, sigma2 in cursor.fetchall():
+            if mu1 is None or mu2 is None:
+                return False
+
+            stored = {p1_id: (mu1, sigma1), p2_id: (mu2, sigma2)}
+            for pid in (p1_id, p2_id):
+                if pid not in ratings:
+                    continue
+                if ratings[pid] == stored[pid]:
+                    # Back in step with the recorded history
+                    del ratings[pid]
+                else:
+                    history_updates.append((*ratings[pid], mid, pid))
+
+            if p1_id not in ratings and p2_id not in ratings:
+                continue
+
+            ratings[p1_id], ratings[p2_id] = rate_values(
+                ratings.get(p1_id, stored[p1_id]),
+                ratings.get(p2_id, stored[p2_id]),
+                1 if score1 > score2 else 2
+            )
+
+        if changed is not None:
+            changed.update(pid for _, _, _, pid in history_updates)
+            changed.update(ratings)
+        cursor.executemany('''
+            UPDATE ratings_history SET mu = ?, sigma = ?
+            WHERE match_id = ? AND player_id = ?
+        ''', history_updates)
+        cursor.executemany('''
+            UPDATE players
+            SET mu = ?, sigma = ?, last_updated = datetime('now')
+            WHERE player_id = ? AND (mu != ? OR sigma != ?)
+        ''', [(mu, sigma, pid, mu, sigma) for pid, (mu, sigma) in ratings.items()])
+        return True
+
+    def season_ratings(self, cursor, season_id: int) -> dict:
+        """Ratings produced by replaying one season from default ratings"""
+        cursor.execute('''
+            SELECT match_id, player1_id, player2_id, player1_score, player2_score
+            FROM matches
+            WHERE season = ?
+            ORDER BY timestamp ASC, match_id ASC
+        ''', (season_id,))
+        return self.replay(cursor.fetchall())
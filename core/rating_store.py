@@ -0,0 +1,203 @@
+# core/rating_store.py
+"""In-memory copy of every player's current rating.
+
+Reads are served from arrays and checked against the ``data_version``
+counter, which every committed write advances by one whichever process
+made it. A mismatch reloads the players table. Writers in this process
+call ``write_through`` inside their transaction so the arrays follow their
+own commits without a reload.
+"""
+import threading
+from collections import deque
+import numpy as np
+from core.models import Player
+
+class RatingStore:
+    _stores = {}
+    _stores_lock = threading.Lock()
+
+    @classmethod
+    def for_handler(cls, db_handler) -> 'RatingStore':
+        """Shared store for the handler's database"""
+        with cls._stores_lock:
+            store = cls._stores.get(db_handler.db_name)
+            if store is None:
+                store = cls._stores[db_handler.db_name] = cls(db_handler)
+            return store
+
+    def __init__(self, db_handler):
+        self.db_handler = db_handler
+        self.version = None
+        self.player_ids = np.zeros(0, dtype=np.int64)
+        self.mu = np.zeros(0)
+        self.sigma = np.zeros(0)
+        self.names = []
+        self.last_updated = []
+        self._index = {}
+        # (version, player_ids) of recent write-throughs, for dependants
+        # that update incrementally
+        self._changes = deque(maxlen=256)
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'reloads': 0, 'write_throughs': 0, 'bypassed': 0}
+
+    def get(self, player_id: int) -> Player:
+        return self.get_many([player_id])[0]
+
+    def get_many(self, player_ids) -> list[Player]:
+        """Players in the order given, with a single staleness check"""
+        with self.db_handler.connection() as conn:
+            cursor = conn.cursor()
+            if not self._sync(conn, cursor):
+                # Uncommitted writes in this thread: read them directly
+                players = []
+                for player_id in player_ids:
+                    cursor.execute('''
+                        SELECT player_id, name, mu, sigma, last_updated
+                        FROM players WHERE player_id = ?
+                    ''', (player_id,))
+                    row = cursor.fetchone()
+                    if not row:
+                        raise ValueError(f"Player {player_id} not found")
+                    players.append(Player(*row))
+                return players
+
+        with self._lock:
+            players = []
+            for player_id in player_ids:
+                index = self._index.get(player_id)
+                if index is None:
+                    raise ValueError(f"Player {player_id} not found")
+                players.append(self._player(index))
+            return players
+
+    def ladder(self) -> list[Player]:
+        """Players ordered by conservative rating (mu - 3*sigma)"""
+        with self.db_handler.connection() as conn:
+            cursor = conn.cursor()
+            if not self._sync(conn, cursor):
+                cursor.execute('''
+                    SELECT player_id, name, mu, sigma, last_updated
+                    FROM players ORDER BY (mu - 3 * sigma) DESC
+                ''')
+                return [Player(*row) for row in cursor.fetchall()]
+
+        with self._lock:
+            order = np.argsort(-(self.mu - 3 * self.sigma), kind='stable')
+            return [self._player(index) for index in order]
+
+    def players(self) -> list[tuple]:
+        """(player_id, name) of every player, ordered by name"""
+        with self.db_handler.connection() as conn:
+            cursor = conn.cursor()
+            if not self._sync(conn, cursor):
+                cursor.execute('SELECT player_id, name FROM players ORDER BY name')
+                return cursor.fetchall()
+
+        with self._lock:
+            return sorted(zip(self.player_ids.tolist(), self.names), key=lambda p: p[1])
+
+    def snapshot(self, since: int = None) -> tuple:
+        """Copies of (version, player_ids, names, mu, sigma, changed).
+
+        ``changed`` holds the players written through after version
+        ``since``, or None when that is unknown and dependants must rebuild.
+        """
+        with self.db_handler.connection() as conn:
+            if not self._sync(conn, conn.cursor()):
+                raise RuntimeError("snapshot() inside a write transaction")
+
+        with self._lock:
+            changed = None
+            if since is not None and since <= self.version:
+                versions = [version for version, _ in self._changes if version > since]
+                if versions == list(range(since + 1, self.version + 1)):
+                    changed = {pid for version, pids in self._changes if version > since
+                               for pid in pids}
+            return (self.version, self.player_ids.copy(), list(self.names),
+                    self.mu.copy(), self.sigma.copy(), changed)
+
+    def write_through(self, cursor, player_ids):
+        """Apply these players' rows to the store once the transaction commits.
+
+        Must be called after the writes, inside the same transaction. The
+        rows are only applied if the store was current when the transaction
+        started; otherwise the next read reloads.
+        """
+        player_ids = list(set(player_ids))
+        rows = []
+        for start in range(0, len(player_ids), 500):
+            chunk = player_ids[start:start + 500]
+            cursor.execute(f'''
+                SELECT player_id, name, mu, sigma, last_updated
+                FROM players WHERE player_id IN ({', '.join('?' * len(chunk))})
+            ''', chunk)
+            rows.extend(cursor.fetchall())
+        self.db_handler.after_commit(lambda version: self._apply(rows, version))
+
+    def unaffected_write(self):
+        """Follow a transaction that writes no player rows to its new data_version.
+
+        Must be called inside the transaction; without it the commit's
+        version bump makes the next read reload every player.
+        """
+        self.db_handler.after_commit(lambda version: self._apply([], version))
+
+    def _sync(self, conn, cursor) -> bool:
+        """Reload if the database moved on; False inside a write transaction"""
+        if conn.in_transaction:
+            self.stats['bypassed'] += 1
+            return False
+        version = self.db_handler.data_version(cursor)
+        if version == self.version:
+            self.stats['hits'] += 1
+            return True
+        cursor.execute('''
+            SELECT player_id, name, mu, sigma, last_updated
+            FROM players ORDER BY player_id
+        ''')
+        rows = cursor.fetchall()
+        with self._lock:
+            self._load(rows)
+            self.version = version
+            self._changes.clear()
+        self.stats['reloads'] += 1
+        return True
+
+    def _load(self, rows):
+        self.player_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.names = [row[1] for row in rows]
+        self.mu = np.array([row[2] for row in rows], dtype=float)
+        self.sigma = np.array([row[3] for row in rows], dtype=float)
+        self.last_updated = [row[4] for row in rows]
+        self._index = {pid: index for index, pid in enumerate(self.player_ids.tolist())}
+
+    def _apply(self, rows, version):
+        with self._lock:
+            if version is None or self.version is None or self.version != version - 1:
+                return
+            new = [row for row in rows if row[0] not in self._index]
+            if new:
+                self._index.update((row[0], len(self.names) + i) for i, row in enumerate(new))
+                self.player_ids = np.append(self.player_ids, [row[0] for row in new])
+                self.mu = np.append(self.mu, np.zeros(len(new)))
+                self.sigma = np.append(self.sigma, np.zeros(len(new)))
+                self.names.extend(row[1] for row in new)
+                self.last_updated.extend(row[4] for row in new)
+            for pid, name, mu, sigma, last_updated in rows:
+                index = self._index[pid]
+                self.names[index] = name
+                self.mu[index] = mu
+                self.sigma[index] = sigma
+                self.last_updated[index] = last_updated
+            self.version = version
+            self._changes.append((version, [row[0] for row in rows]))
+            self.stats['write_throughs'] += 1
+
+    def _player(self, index: int) -> Player:
+        return Player(
+            player_id=int(self.player_ids[index]),
+            name=self.names[index],
+            mu=float(self.mu[index]),
+            sigma=float(self.sigma[index]),
+            last_updated=self.last_updated[index]
+        )
@@ -0,0 +1,136 @@
+# core/season_stats.py
+"""Maintenance of the ``player_season_stats`` aggregate table.
+
+Recording a match appends to the two players' rows in O(1). Anything that
+rewrites the past (deletes, replays) refreshes the affected players from
+``match_participants`` and ``ratings_history`` instead.
+"""
+
+_COLUMNS = ('played', 'wins', 'losses', 'points_for', 'points_against',
+            'current_streak', 'peak_mu', 'last_match_id')
+
+def apply_match(cursor, match_id: int):
+    """Fold a match into both players' season rows.
+
+    Only valid for a match ordered after every other match of its players in
+    that season, which is what record_match produces.
+    """
+    cursor.execute('''
+        INSERT INTO player_season_stats
+        (player_id, season, played, wins, losses, points_for, points_against,
+         current_streak, peak_mu, last_match_id)
+        SELECT mp.player_id, mp.season, 1, mp.won, 1 - mp.won,
+            mp.points_for, mp.points_against,
+            CASE WHEN mp.won THEN 1 ELSE -1 END, rh.mu, mp.match_id
+        FROM match_participants mp
+        LEFT JOIN ratings_history rh
+            ON rh.match_id = mp.match_id AND rh.player_id = mp.player_id
+        WHERE mp.match_id = ?
+        ON CONFLICT(player_id, season) DO UPDATE SET
+            played = played + 1,
+            wins = wins + excluded.wins,
+            losses = losses + excluded.losses,
+            points_for = points_for + excluded.points_for,
+            points_against = points_against + excluded.points_against,
+            current_streak = CASE WHEN excluded.wins
+                THEN MAX(current_streak, 0) + 1
+                ELSE MIN(current_streak, 0) - 1 END,
+            peak_mu = MAX(COALESCE(peak_mu, excluded.peak_mu),
+                          COALESCE(excluded.peak_mu, peak_mu)),
+            last_match_id = excluded.last_match_id
+    ''', (match_id,))
+
+def compute(cursor, player_id: int = None, from_season: int = None) -> dict:
+    """Aggregate rows from scratch, keyed by (player_id, season).
+
+    Values follow ``_COLUMNS``. Restrict to one player and/or to seasons
+    from ``from_season`` onwards to keep refreshes proportional to the
+    affected history.
+    """
+    conditions, params = [], []
+    if player_id is not None:
+        conditions.append('mp.player_id = ?')
+        params.append(player_id)
+    if from_season is not None:
+        conditions.append('mp.season >= ?')
+        params.append(from_season)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+    cursor.execute(f'''
+        SELECT mp.player_id, mp.season, mp.match_id, mp.won,
+            mp.points_for, mp.points_against, rh.mu
+        FROM match_participants mp
+        LEFT JOIN ratings_history rh
+            ON rh.match_id = mp.match_id AND rh.player_id = mp.player_id
+        {where}
+        ORDER BY mp.player_id, mp.season, mp.timestamp, mp.match_id
+    ''', params)
+
+    stats = {}
+    for pid, season, match_id, won, points_for, points_against, mu in cursor.fetchall():
+        row = stats.setdefault((pid, season), [0, 0, 0, 0, 0, 0, None, None])
+        row[0] += 1
+        row[1] += won
+        row[2] += 1 - won
+        row[3] += points_for
+        row[4] += points_against
+        row[5] = (max(row[5], 0) + 1) if won else (min(row[5], 0) - 1)
+        if mu is not None and (row[6] is None or mu > row[6]):
+            row[6] = mu
+        row[7] = match_id
+    return {key: tuple(row) for key, row in stats.items()}
+
+def _write(cursor, stats: dict):
+    cursor.executemany(f'''
+        INSERT OR REPLACE INTO player_season_stats
+        (player_id, season, {', '.join(_COLUMNS)})
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [(*key, *row) for key, row in stats.items()])
+
+def refresh(cursor, player_ids, from_season: int = None):
+    """Recompute the given players' rows for ``from_season`` onwards"""
+    for pid in set(player_ids):
+        if from_season is None:
+            cursor.execute('DELETE FROM player_season_stats WHERE player_id = ?', (pid,))
+        else:
+            cursor.execute('''
+                DELETE FROM player_season_stats WHERE player_id = ? AND season >= ?
+            ''', (pid, from_season))
+        _write(cursor, compute(cursor, pid, from_season))
+
+def refresh_peaks(cursor, player_ids, from_season: int = None):
+    """Recompute only peak_mu, for replayed players whose results are unchanged"""
+    cursor.executemany('''
+        UPDATE player_season_stats
+        SET peak_mu = (
+            SELECT MAX(rh.mu)
+            FROM match_participants mp
+            JOIN ratings_history rh
+                ON rh.match_id = mp.match_id AND rh.player_id = mp.player_id
+            WHERE mp.player_id = player_season_stats.player_id
+                AND mp.season = player_season_stats.season
+        )
+        WHERE player_id = ? AND season >= ?
+    ''', [(pid, from_season if from_season is not None else -1) for pid in set(player_ids)])
+
+def rebuild(cursor) -> list[dict]:
+    """Rebuild the whole table and return the rows that were out of date"""
+    expected = compute(cursor)
+    cursor.execute(f'''
+        SELECT player_id, season, {', '.join(_COLUMNS)} FROM player_season_stats
+    ''')
+    stored = {(row[0], row[1]): tuple(row[2:]) for row in cursor.fetchall()}
+
+    diffs = []
+    for key in sorted(expected.keys() | stored.keys()):
+        if expected.get(key) != stored.get(key):
+            diffs.append({
+                'player_id': key[0],
+                'season': key[1],
+                'stored': dict(zip(_COLUMNS, stored[key])) if key in stored else None,
+                'expected': dict(zip(_COLUMNS, expected[key])) if key in expected else None,
+            })
+
+    cursor.execute('DELETE FROM player_season_stats')
+    _write(cursor, expected)
+    return diffs
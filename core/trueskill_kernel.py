@@ -0,0 +1,106 @@
+# core/trueskill_kernel.py
+"""Closed-form TrueSkill update for a two-player match without draws.
+
+With one player per team and ``draw_probability=0`` the factor graph behind
+``trueskill.rate_1vs1`` converges after a single message pass, so the update
+reduces to the v/w truncation functions below. The complementary error
+function mirrors the one in ``trueskill.backends``, and the tiny draw margin
+the library derives for ``draw_probability=0`` is kept, so both paths agree
+to floating point noise.
+"""
+import math
+from functools import lru_cache
+import numpy as np
+from trueskill import calc_draw_margin, global_env
+
+_SQRT2 = math.sqrt(2)
+_INV_SQRT_2PI = 1 / math.sqrt(2 * math.pi)
+
+def _erfc(x: float) -> float:
+    z = abs(x)
+    t = 1. / (1. + z / 2.)
+    r = t * math.exp(-z * z - 1.26551223 + t * (1.00002368 + t * (
+        0.37409196 + t * (0.09678418 + t * (-0.18628806 + t * (
+            0.27886807 + t * (-1.13520398 + t * (1.48851587 + t * (
+                -0.82215223 + t * 0.17087277
+            )))
+        )))
+    )))
+    return 2. - r if x < 0 else r
+
+def _erfc_array(x: np.ndarray) -> np.ndarray:
+    z = np.abs(x)
+    t = 1. / (1. + z / 2.)
+    r = t * np.exp(-z * z - 1.26551223 + t * (1.00002368 + t * (
+        0.37409196 + t * (0.09678418 + t * (-0.18628806 + t * (
+            0.27886807 + t * (-1.13520398 + t * (1.48851587 + t * (
+                -0.82215223 + t * 0.17087277
+            )))
+        )))
+    )))
+    return np.where(x < 0, 2. - r, r)
+
+@lru_cache(maxsize=8)
+def _draw_margin(env) -> float:
+    # Not exactly zero: the library's ppf(0.5) is an approximation
+    return calc_draw_margin(0, 2, env)
+
+def _env_params(beta, tau):
+    env = global_env()
+    beta = env.beta if beta is None else beta
+    tau = env.tau if tau is None else tau
+    return beta, tau, _draw_margin(env)
+
+def rate_1vs1(winner_mu: float, winner_sigma: float,
+              loser_mu: float, loser_sigma: float,
+              beta: float = None, tau: float = None) -> tuple:
+    """Scalar update; returns (winner_mu, winner_sigma, loser_mu, loser_sigma)"""
+    beta, tau, draw_margin = _env_params(beta, tau)
+    var_w = winner_sigma * winner_sigma + tau * tau
+    var_l = loser_sigma * loser_sigma + tau * tau
+    c_sq = 2 * beta * beta + var_w + var_l
+    c = math.sqrt(c_sq)
+    t = (winner_mu - loser_mu - draw_margin) / c
+
+    denom = 0.5 * _erfc(-t / _SQRT2)
+    v = _INV_SQRT_2PI * math.exp(-t * t / 2) / denom if denom else -t
+    w = v * (v + t)
+    if not 0 < w < 1:
+        raise FloatingPointError('TrueSkill update is numerically unstable')
+
+    return (
+        winner_mu + var_w / c * v,
+        math.sqrt(var_w * (1 - var_w / c_sq * w)),
+        loser_mu - var_l / c * v,
+        math.sqrt(var_l * (1 - var_l / c_sq * w)),
+    )
+
+def rate_1vs1_batch(winner_mu, winner_sigma, loser_mu, loser_sigma,
+                    beta: float = None, tau: float = None) -> tuple:
+    """Vectorised update for independent pairings.
+
+    Takes array-likes of equal shape and returns four float64 arrays
+    (winner_mu, winner_sigma, loser_mu, loser_sigma).
+    """
+    beta, tau, draw_margin = _env_params(beta, tau)
+    winner_mu = np.asarray(winner_mu, dtype=np.float64)
+    loser_mu = np.asarray(loser_mu, dtype=np.float64)
+    var_w = np.square(np.asarray(winner_sigma, dtype=np.float64)) + tau * tau
+    var_l = np.square(np.asarray(loser_sigma, dtype=np.float64)) + tau * tau
+    c_sq = 2 * beta * beta + var_w + var_l
+    c = np.sqrt(c_sq)
+    t = (winner_mu - loser_mu - draw_margin) / c
+
+    denom = 0.5 * _erfc_array(-t / _SQRT2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        v = np.where(denom > 0, _INV_SQRT_2PI * np.exp(-t * t / 2) / denom, -t)
+    w = v * (v + t)
+    if not np.all((w > 0) & (w < 1)):
+        raise FloatingPointError('TrueSkill update is numerically unstable')
+
+    return (
+        winner_mu + var_w / c * v,
+        np.sqrt(var_w * (1 - var_w / c_sq * w)),
+        loser_mu - var_l / c * v,
+        np.sqrt(var_l * (1 - var_l / c_sq * w)),
+    )
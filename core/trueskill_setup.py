@@ -1,4 +1,5 @@
 from trueskill import Rating, rate_1vs1, setup
+from core.trueskill_kernel import rate_1vs1 as rate_1vs1_fast
 
 class TrueSkillSystem:
     def __init__(self):
@@ -10,8 +11,22 @@ class TrueSkillSystem:
     
     def rate_match(self, rating1: Rating, rating2: Rating, winner: int):
         # Winner: 1 or 2
+        new_r1, new_r2 = self.rate_values((rating1.mu, rating1.sigma),
+                                          (rating2.mu, rating2.sigma), winner)
+        return Rating(*new_r1), Rating(*new_r2)
+
+    def rate_values(self, rating1: tuple, rating2: tuple, winner: int):
+        """Same as rate_match on plain (mu, sigma) tuples, via the closed-form kernel"""
+        if winner == 1:
+            mu1, sigma1, mu2, sigma2 = rate_1vs1_fast(*rating1, *rating2)
+        else:
+            mu2, sigma2, mu1, sigma1 = rate_1vs1_fast(*rating2, *rating1)
+        return (mu1, sigma1), (mu2, sigma2)
+
+    def rate_match_reference(self, rating1: Rating, rating2: Rating, winner: int):
+        """Rate through the trueskill library's factor graph"""
         if winner == 1:
             new_r1, new_r2 = rate_1vs1(rating1, rating2)
         else:
             new_r2, new_r1 = rate_1vs1(rating2, rating1)
-        return new_r1, new_r2
\ No newline at end of file
+        return new_r1, new_r2
@@ -0,0 +1,56 @@
+# core/win_matrix.py
+"""Pairwise TrueSkill win probabilities for every pair of players.
+
+The matrix is built once from the RatingStore and then follows its
+write-throughs: a recorded match changes two players, so only their two
+rows and columns are recomputed.
+"""
+import threading
+import numpy as np
+
+def win_probability(mu1, sigma1, mu2, sigma2, beta: float):
+    """Probability that player 1 beats player 2; works elementwise on arrays"""
+    denominator = np.sqrt(2 * beta**2 + sigma1**2 + sigma2**2)
+    return 1 / (1 + np.exp(-(mu1 - mu2) / denominator))
+
+class WinProbabilityMatrix:
+    def __init__(self, store, beta: float):
+        self.store = store
+        self.beta = beta
+        self.version = None
+        self.player_ids = np.zeros(0, dtype=np.int64)
+        self.names = []
+        self.matrix = np.zeros((0, 0))
+        self._lock = threading.Lock()
+        self.stats = {'builds': 0, 'updates': 0, 'hits': 0}
+
+    def get(self) -> dict:
+        """``matrix[i][j]`` is the probability that player i beats player j"""
+        with self._lock:
+            version, player_ids, names, mu, sigma, changed = self.store.snapshot(self.version)
+            if version == self.version:
+                self.stats['hits'] += 1
+            elif changed is not None and np.array_equal(player_ids, self.player_ids):
+                self._update(mu, sigma, changed)
+                self.stats['updates'] += 1
+            else:
+                self.matrix = win_probability(mu[:, None], sigma[:, None],
+                                              mu[None, :], sigma[None, :], self.beta)
+                self.stats['builds'] += 1
+            self.version, self.player_ids, self.names = version, player_ids, names
+            return {
+                'player_ids': self.player_ids.tolist(),
+                'names': list(self.names),
+                'matrix': self.matrix.copy()
+            }
+
+    def _update(self, mu, sigma, changed):
+        # Same elementwise arguments as a full build, so the values match it exactly
+        index = {pid: i for i, pid in enumerate(self.player_ids.tolist())}
+        rows = np.array(sorted(index[pid] for pid in changed), dtype=np.int64)
+        if not len(rows):
+            return
+        self.matrix[rows, :] = win_probability(mu[rows, None], sigma[rows, None],
+                                               mu[None, :], sigma[None, :], self.beta)
+        self.matrix[:, rows] = win_probability(mu[:, None], sigma[:, None],
+                                               mu[None, rows], sigma[None, rows], self.beta)
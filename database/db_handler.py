@@ -1,167 +1,232 @@
 # database/db_handler.py
 import sqlite3
 import os
+import threading
 from contextlib import contextmanager
+from database.migrations import migrate
 
 DB_FILE = os.path.join(os.path.dirname(__file__), '..', 'rankings.db')
 
-class DatabaseHandler:
-    def __init__(self, db_name='rankings.db'):
+class ConnectionPool:
+    """Long-lived SQLite connections shared by every handler of one database.
+
+    A thread keeps the connection it checked out until its outermost
+    ``connection()`` block exits, so nested calls share one connection and
+    one transaction. Released connections go back to an idle list for the
+    next caller instead of being closed.
+    """
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(self, db_name: str, max_idle: int = 8):
         self.db_name = db_name
         self.is_memory = ':memory:' in db_name or 'mode=memory' in db_name
-        self._init_db()
-    
-    def _init_db(self):
-        # Create tables immediately for persistent databases
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stats = {'hits': 0, 'misses': 0, 'nested': 0, 'opened': 0, 'closed': 0}
+
+    @classmethod
+    def for_database(cls, db_name: str) -> 'ConnectionPool':
+        with cls._pools_lock:
+            if db_name not in cls._pools:
+                cls._pools[db_name] = cls(db_name)
+            return cls._pools[db_name]
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_name, uri=True, timeout=30,
+                               check_same_thread=False,
+                               cached_statements=256)
+        conn.execute("PRAGMA foreign_keys = ON")
         if not self.is_memory:
-            with self.connection() as conn:
-                self._create_tables(conn)
-    
-    def _create_tables(self, conn):
-        conn.executescript('''
-            CREATE TABLE IF NOT EXISTS players (
-                player_id INTEGER PRIMARY KEY,
-                name TEXT UNIQUE NOT NULL,
-                mu REAL NOT NULL,
-                sigma REAL NOT NULL,
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-
-            CREATE TABLE IF NOT EXISTS matches (
-                match_id INTEGER PRIMARY KEY,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                player1_id INTEGER NOT NULL,
-                player2_id INTEGER NOT NULL,
-                player1_score INTEGER NOT NULL,
-                player2_score INTEGER NOT NULL,
-                season INTEGER NOT NULL DEFAULT 1,
-                FOREIGN KEY(player1_id) REFERENCES players(player_id) ON DELETE CASCADE,
-                FOREIGN KEY(player2_id) REFERENCES players(player_id) ON DELETE CASCADE
-            );
-
-            CREATE TABLE IF NOT EXISTS system_settings (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL
-            );
-
-            CREATE TABLE IF NOT EXISTS matchups (
-                player_a_id INTEGER NOT NULL,
-                player_b_id INTEGER NOT NULL,
-                matches_played INTEGER DEFAULT 0,
-                wins_a INTEGER DEFAULT 0,
-                wins_b INTEGER DEFAULT 0,
-                PRIMARY KEY (player_a_id, player_b_id),
-                FOREIGN KEY(player_a_id) REFERENCES players(player_id) ON DELETE CASCADE,
-                FOREIGN KEY(player_b_id) REFERENCES players(player_id) ON DELETE CASCADE
-            );
-        
-            CREATE TABLE IF NOT EXISTS ratings_history (
-                history_id INTEGER PRIMARY KEY,
-                player_id INTEGER NOT NULL,
-                match_id INTEGER NOT NULL,
-                mu REAL NOT NULL,
-                sigma REAL NOT NULL,
-                FOREIGN KEY(player_id) REFERENCES players(player_id),
-                FOREIGN KEY(match_id) REFERENCES matches(match_id)
-            );
-            -- Keep existing tables from previous definition --
-                           
-            CREATE TABLE IF NOT EXISTS PlayerRatingHistory (
-                history_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                player_id INTEGER NOT NULL,
-                match_id INTEGER, -- Optional: Link to the specific match
-                timestamp DATETIME NOT NULL,
-                mu_after REAL NOT NULL,
-                sigma_after REAL NOT NULL,
-                FOREIGN KEY (player_id) REFERENCES Players (player_id) ON DELETE CASCADE
-                -- Optional FOREIGN KEY (match_id) REFERENCES Matches (match_id)
-            );
-        ''')
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA mmap_size = 268435456")
+        conn.execute("PRAGMA cache_size = -16000")
+        migrate(conn)
+        with self._lock:
+            self.stats['opened'] += 1
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._idle:
+                self.stats['hits'] += 1
+                return self._idle.pop()
+            self.stats['misses'] += 1
+        return self._open()
+
+    def _release(self, conn: sqlite3.Connection):
+        with self._lock:
+            # In-memory databases vanish with their last connection, so
+            # those are always kept
+            if self.is_memory or len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+            self.stats['closed'] += 1
+        conn.close()
 
     @contextmanager
     def connection(self):
-        conn = sqlite3.connect(self.db_name, uri=True)
-        conn.execute("PRAGMA foreign_keys = ON")  
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            # Nested block: the outermost one owns commit/rollback
+            with self._lock:
+                self.stats['nested'] += 1
+            yield conn
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
+        self._local.after_commit = callbacks = []
+        self._local.cache_changes = 0
+        changes = conn.total_changes
+        version = None
         try:
-            if self.is_memory:
-                self._create_tables(conn)
             yield conn
+            if conn.total_changes - self._local.cache_changes != changes:
+                version = self._bump_version(conn)
             conn.commit()
         except Exception:
             conn.rollback()
             raise
         finally:
-            if not self.is_memory:
-                conn.close()
+            self._local.conn = None
+            self._local.after_commit = None
+            self._release(conn)
 
-def get_rankings():
-    with sqlite3.connect(DB_FILE) as conn:
-        c = conn.cursor()
-        c.execute("""
-            SELECT player_id, name, mu, sigma
-            FROM players
-            ORDER BY mu DESC
-        """)
-        players = c.fetchall()
-
-    return [
-        {
-            "id": row[0],
-            "name": row[1],
-            "mu": row[2],
-            "sigma": row[3],
-            "form": get_player_form(row[0])
-        }
-        for row in players
-    ]
-
-def get_recent_matches():
-    with sqlite3.connect(DB_FILE) as conn:
-        c = conn.cursor()
-        c.execute("""
-            SELECT
-                m.match_id,
-                p1.name AS player1_name,
-                p2.name AS player2_name,
-                m.player1_score,
-                m.player2_score
-            FROM matches m
-            JOIN players p1 ON m.player1_id = p1.player_id
-            JOIN players p2 ON m.player2_id = p2.player_id
-            ORDER BY m.match_id DESC
-        """)
-        rows = c.fetchall()
+        for callback in callbacks:
+            callback(version)
+
+    @staticmethod
+    def _bump_version(conn) -> int:
+        # Runs inside the writing transaction, so each commit advances the
+        # counter by exactly one
+        conn.execute('UPDATE data_version SET version = version + 1')
+        return conn.execute('SELECT version FROM data_version').fetchone()[0]
+
+    @contextmanager
+    def cache_writes(self):
+        """Writes in this block only fill caches derived from other tables,
+        so on their own they do not advance ``data_version``.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            raise RuntimeError("cache_writes() needs an open connection() block")
+        before = conn.total_changes
+        try:
+            yield
+        finally:
+            self._local.cache_changes += conn.total_changes - before
 
-    return [
-        {
-            "match_id": row[0],
-            "player1": row[1],
-            "player2": row[2],
-            "score1": row[3],
-            "score2": row[4],
-        }
-        for row in rows
-    ]
+    def after_commit(self, callback):
+        """Call ``callback(data_version)`` once this thread's outermost
+        transaction commits; it is dropped if the transaction rolls back.
+        """
+        callbacks = getattr(self._local, 'after_commit', None)
+        if callbacks is None:
+            raise RuntimeError("after_commit() needs an open connection() block")
+        callbacks.append(callback)
 
+    def snapshot_stats(self) -> dict:
+        """Consistent copy of the counters plus the idle connection count"""
+        with self._lock:
+            return {**self.stats, 'idle': len(self._idle)}
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self.stats['closed'] += len(idle)
+        for conn in idle:
+            conn.close()
+
+class DatabaseHandler:
+    def __init__(self, db_name='rankings.db'):
+        self.db_name = db_name
+        self.pool = ConnectionPool.for_database(db_name)
+        self.is_memory = self.pool.is_memory
+        self._init_db()
+    
+    def _init_db(self):
+        # Opening the first connection applies any pending migrations
+        with self.connection():
+            pass
 
-def get_player_form(player_id, num_matches=5):
-    with sqlite3.connect(DB_FILE) as conn:
+    def connection(self):
+        return self.pool.connection()
+
+    def after_commit(self, callback):
+        self.pool.after_commit(callback)
+
+    def cache_writes(self):
+        return self.pool.cache_writes()
+
+    def data_version(self, cursor=None) -> int:
+        """Counter that advances with every committed write, from any process"""
+        if cursor is not None:
+            return cursor.execute('SELECT version FROM data_version').fetchone()[0]
+        with self.connection() as conn:
+            return self.data_version(conn.cursor())
+
+    def pool_stats(self) -> dict:
+        """Hit/miss counters for the shared connection pool"""
+        stats = self.pool.snapshot_stats()
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+_default_handler = None
+
+def _get_default_handler() -> DatabaseHandler:
+    global _default_handler
+    if _default_handler is None:
+        _default_handler = DatabaseHandler(DB_FILE)
+    return _default_handler
+
+def get_rankings(form_length=5, db_handler=None):
+    """Players by mu with their last ``form_length`` results, in one query.
+
+    Each player's form is bounded by the timestamp of their Nth most recent
+    match, so the join is a short primary-key range scan per player instead
+    of a window over the whole match history.
+    """
+    db_handler = db_handler or _get_default_handler()
+    with db_handler.connection() as conn:
         c = conn.cursor()
         c.execute("""
-            SELECT player1_id, player2_id, player1_score, player2_score
-            FROM matches
-            WHERE player1_id = ? OR player2_id = ?
-            ORDER BY match_id DESC
-            LIMIT ?
-        """, (player_id, player_id, num_matches))
+            SELECT player_id, name, mu, sigma, won
+            FROM (
+                SELECT p.player_id, p.name, p.mu, p.sigma, mp.won,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY p.player_id
+                        ORDER BY mp.timestamp DESC, mp.match_id DESC
+                    ) AS rn
+                FROM players p
+                LEFT JOIN match_participants mp
+                    ON mp.player_id = p.player_id
+                    AND mp.timestamp >= COALESCE((
+                        SELECT timestamp FROM match_participants x
+                        WHERE x.player_id = p.player_id
+                        ORDER BY timestamp DESC, match_id DESC
+                        LIMIT 1 OFFSET ?
+                    ), '')
+            )
+            WHERE rn <= ?
+            ORDER BY mu DESC, player_id, rn
+        """, (max(form_length - 1, 0), max(form_length, 1)))
         rows = c.fetchall()
 
-    form = []
-    for p1_id, p2_id, p1_score, p2_score in rows:
-        if player_id == p1_id:
-            won = p1_score > p2_score
-        else:
-            won = p2_score > p1_score
-        form.append('W' if won else 'L')
-    return form
-
+    rankings = []
+    for player_id, name, mu, sigma, won in rows:
+        if not rankings or rankings[-1]["id"] != player_id:
+            rankings.append({
+                "id": player_id,
+                "name": name,
+                "mu": mu,
+                "sigma": sigma,
+                "form": []
+            })
+        if won is not None and form_length > 0:
+            rankings[-1]["form"].append('W' if won else 'L')
+    return rankings
@@ -0,0 +1,281 @@
+# database/migrations.py
+"""Versioned schema migrations keyed on ``PRAGMA user_version``.
+
+Each migration brings the schema from version N-1 to N and runs inside its
+own transaction together with the version bump, so a database is never left
+half-migrated. Append new migrations to ``MIGRATIONS``; never edit one that
+has already shipped.
+"""
+
+def _base_schema(conn):
+    """Tables as they existed before versioning; safe on pre-existing files"""
+    for statement in (
+        '''CREATE TABLE IF NOT EXISTS players (
+            player_id INTEGER PRIMARY KEY,
+            name TEXT UNIQUE NOT NULL,
+            mu REAL NOT NULL,
+            sigma REAL NOT NULL,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )''',
+        '''CREATE TABLE IF NOT EXISTS matches (
+            match_id INTEGER PRIMARY KEY,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            player1_id INTEGER NOT NULL,
+            player2_id INTEGER NOT NULL,
+            player1_score INTEGER NOT NULL,
+            player2_score INTEGER NOT NULL,
+            season INTEGER NOT NULL DEFAULT 1,
+            FOREIGN KEY(player1_id) REFERENCES players(player_id) ON DELETE CASCADE,
+            FOREIGN KEY(player2_id) REFERENCES players(player_id) ON DELETE CASCADE
+        )''',
+        '''CREATE TABLE IF NOT EXISTS system_settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )''',
+        '''CREATE TABLE IF NOT EXISTS matchups (
+            player_a_id INTEGER NOT NULL,
+            player_b_id INTEGER NOT NULL,
+            matches_played INTEGER DEFAULT 0,
+            wins_a INTEGER DEFAULT 0,
+            wins_b INTEGER DEFAULT 0,
+            PRIMARY KEY (player_a_id, player_b_id),
+            FOREIGN KEY(player_a_id) REFERENCES players(player_id) ON DELETE CASCADE,
+            FOREIGN KEY(player_b_id) REFERENCES players(player_id) ON DELETE CASCADE
+        )''',
+        '''CREATE TABLE IF NOT EXISTS ratings_history (
+            history_id INTEGER PRIMARY KEY,
+            player_id INTEGER NOT NULL,
+            match_id INTEGER NOT NULL,
+            mu REAL NOT NULL,
+            sigma REAL NOT NULL,
+            FOREIGN KEY(player_id) REFERENCES players(player_id),
+            FOREIGN KEY(match_id) REFERENCES matches(match_id)
+        )''',
+        '''CREATE TABLE IF NOT EXISTS PlayerRatingHistory (
+            history_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            player_id INTEGER NOT NULL,
+            match_id INTEGER,
+            timestamp DATETIME NOT NULL,
+            mu_after REAL NOT NULL,
+            sigma_after REAL NOT NULL,
+            FOREIGN KEY (player_id) REFERENCES Players (player_id) ON DELETE CASCADE
+        )''',
+    ):
+        conn.execute(statement)
+
+    # Files created before seasons existed lack the column
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(matches)')}
+    if 'season' not in columns:
+        conn.execute('ALTER TABLE matches ADD COLUMN season INTEGER NOT NULL DEFAULT 1')
+
+def _query_indexes(conn):
+    """Indexes behind the per-player, chronological and per-season lookups"""
+    for statement in (
+        # player1_id = ? OR player2_id = ? becomes two index range scans
+        'CREATE INDEX IF NOT EXISTS idx_matches_player1 ON matches(player1_id, timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_matches_player2 ON matches(player2_id, timestamp)',
+        # Replay order and date-range filters
+        'CREATE INDEX IF NOT EXISTS idx_matches_timestamp ON matches(timestamp, match_id)',
+        'CREATE INDEX IF NOT EXISTS idx_matches_season ON matches(season, timestamp, match_id)',
+        # Covering indexes for rating history by player and by match
+        'CREATE INDEX IF NOT EXISTS idx_ratings_history_player '
+        'ON ratings_history(player_id, match_id, mu, sigma)',
+        'CREATE INDEX IF NOT EXISTS idx_ratings_history_match '
+        'ON ratings_history(match_id, player_id, mu, sigma)',
+    ):
+        conn.execute(statement)
+    conn.execute('ANALYZE')
+
+def _match_participants(conn):
+    """One row per (match, player) so per-player queries avoid OR predicates"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS match_participants (
+            match_id INTEGER NOT NULL,
+            player_id INTEGER NOT NULL,
+            opponent_id INTEGER NOT NULL,
+            won INTEGER NOT NULL,
+            points_for INTEGER NOT NULL,
+            points_against INTEGER NOT NULL,
+            season INTEGER NOT NULL,
+            timestamp TIMESTAMP NOT NULL,
+            PRIMARY KEY (player_id, timestamp, match_id),
+            FOREIGN KEY(match_id) REFERENCES matches(match_id) ON DELETE CASCADE,
+            FOREIGN KEY(player_id) REFERENCES players(player_id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_participants_match ON match_participants(match_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_participants_opponent '
+                 'ON match_participants(player_id, opponent_id, won)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_participants_season '
+                 'ON match_participants(season, player_id)')
+    conn.execute('''
+        INSERT OR IGNORE INTO match_participants
+        SELECT match_id, player1_id, player2_id, player1_score > player2_score,
+            player1_score, player2_score, season, timestamp
+        FROM matches
+        UNION ALL
+        SELECT match_id, player2_id, player1_id, player2_score > player1_score,
+            player2_score, player1_score, season, timestamp
+        FROM matches
+    ''')
+
+def _player_season_stats(conn):
+    """Per-player, per-season aggregates maintained by MatchProcessor.
+
+    current_streak is +n after n straight wins and -n after n straight
+    losses; peak_mu is the highest pre-match rating recorded that season.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS player_season_stats (
+            player_id INTEGER NOT NULL,
+            season INTEGER NOT NULL,
+            played INTEGER NOT NULL DEFAULT 0,
+            wins INTEGER NOT NULL DEFAULT 0,
+            losses INTEGER NOT NULL DEFAULT 0,
+            points_for INTEGER NOT NULL DEFAULT 0,
+            points_against INTEGER NOT NULL DEFAULT 0,
+            current_streak INTEGER NOT NULL DEFAULT 0,
+            peak_mu REAL,
+            last_match_id INTEGER,
+            PRIMARY KEY (player_id, season),
+            FOREIGN KEY(player_id) REFERENCES players(player_id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    ''')
+    # The streak is the number of trailing results equal to the last one:
+    # everything after the last row that differs from it
+    conn.execute('''
+        INSERT OR REPLACE INTO player_season_stats
+        (player_id, season, played, wins, losses, points_for, points_against,
+         current_streak, peak_mu, last_match_id)
+        SELECT player_id, season, COUNT(*), SUM(won), COUNT(*) - SUM(won),
+            SUM(points_for), SUM(points_against),
+            (CASE WHEN MAX(last_won) THEN 1 ELSE -1 END)
+                * (COUNT(*) - COALESCE(MAX(CASE WHEN won != last_won THEN n END), 0)),
+            MAX(mu), MAX(last_match_id)
+        FROM (
+            SELECT mp.player_id, mp.season, mp.won, mp.points_for, mp.points_against, rh.mu,
+                ROW_NUMBER() OVER (
+                    PARTITION BY mp.player_id, mp.season ORDER BY mp.timestamp, mp.match_id
+                ) AS n,
+                FIRST_VALUE(mp.won) OVER latest AS last_won,
+                FIRST_VALUE(mp.match_id) OVER latest AS last_match_id
+            FROM match_participants mp
+            LEFT JOIN ratings_history rh
+                ON rh.match_id = mp.match_id AND rh.player_id = mp.player_id
+            WINDOW latest AS (
+                PARTITION BY mp.player_id, mp.season ORDER BY mp.timestamp DESC, mp.match_id DESC
+            )
+        )
+        GROUP BY player_id, season
+    ''')
+
+def _season_ratings(conn):
+    """Per-season ratings updated on every match.
+
+    season_ratings_state lists the seasons whose rows are complete; seasons
+    missing from it are replayed once, on first use.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS season_ratings (
+            season INTEGER NOT NULL,
+            player_id INTEGER NOT NULL,
+            mu REAL NOT NULL,
+            sigma REAL NOT NULL,
+            matches INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (season, player_id),
+            FOREIGN KEY(player_id) REFERENCES players(player_id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS season_ratings_state (
+            season INTEGER PRIMARY KEY,
+            matches INTEGER NOT NULL DEFAULT 0,
+            built_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+def _data_version(conn):
+    """Counter bumped once by every committed write transaction"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)')
+
+def _player_features(conn):
+    """Rolling recent results per player, newest first as '1'/'0'.
+
+    Holds the last 20 results, the window core.player_features keeps.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS player_features (
+            player_id INTEGER PRIMARY KEY,
+            recent TEXT NOT NULL DEFAULT '',
+            FOREIGN KEY(player_id) REFERENCES players(player_id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    ''')
+    # Per-opponent tallies are read from both sides of matchups
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_matchups_player_b ON matchups(player_b_id)')
+    rows = conn.execute('''
+        SELECT player_id, won FROM (
+            SELECT player_id, won, ROW_NUMBER() OVER (
+                PARTITION BY player_id ORDER BY timestamp DESC, match_id DESC
+            ) AS recency
+            FROM match_participants
+        )
+        WHERE recency <= 20
+        ORDER BY player_id, recency
+    ''')
+    recent = {}
+    for player_id, won in rows:
+        recent[player_id] = recent.get(player_id, '') + ('1' if won else '0')
+    conn.executemany('INSERT OR REPLACE INTO player_features (player_id, recent) VALUES (?, ?)',
+                     recent.items())
+
+def _match_page_indexes(conn):
+    """Newest-first match pages per player and per season"""
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_participants_player_match '
+                 'ON match_participants(player_id, match_id)')
+    # Ordered by (season, match_id) since match_id is the rowid
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_matches_season_id ON matches(season)')
+
+MIGRATIONS = [
+    _base_schema,          # 1
+    _query_indexes,        # 2
+    _match_participants,   # 3
+    _player_season_stats,  # 4
+    _season_ratings,       # 5
+    _data_version,         # 6
+    _player_features,      # 7
+    _match_page_indexes,   # 8
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def get_version(conn) -> int:
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def migrate(conn) -> int:
+    """Apply pending migrations and return the resulting schema version"""
+    if get_version(conn) >= SCHEMA_VERSION:
+        return get_version(conn)
+
+    if conn.in_transaction:
+        conn.commit()
+    while True:
+        # Take the write lock before re-reading the version so concurrent
+        # processes don't apply the same migration twice
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            version = get_version(conn)
+            if version >= SCHEMA_VERSION:
+                conn.rollback()
+                return version
+            MIGRATIONS[version](conn)
+            conn.execute(f'PRAGMA user_version = {version + 1}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
@@ -0,0 +1,205 @@
+# gui/api.py
+"""Versioned JSON API under /api/v1.
+
+Every endpoint wraps an existing MatchProcessor / EnhancedPredictor method.
+Bodies are compact JSON, gzipped when the client accepts it, and carry the
+response cache's data-version ETag. ``fields`` picks which keys of each
+object are returned; list endpoints page with ``limit`` and the
+``next_cursor`` of the previous page. Rating histories are streamed in
+batches rather than built in memory.
+"""
+import gzip
+import itertools
+import json
+import zlib
+from flask import Blueprint, Response, request
+
+# Smaller bodies are not worth compressing
+_GZIP_MIN_BYTES = 512
+# Rows per chunk written to a streamed body
+_STREAM_ROWS = 500
+
+LADDER_FIELDS = ('rank', 'player_id', 'name', 'mu', 'sigma', 'conservative')
+PLAYER_FIELDS = ('player_id', 'name', 'mu', 'sigma', 'conservative', 'last_updated',
+                 'peak_mu', 'played', 'wins', 'losses', 'form', 'victim', 'nemesis')
+HISTORY_FIELDS = ('match_id', 'timestamp', 'mu', 'sigma')
+H2H_FIELDS = ('player1_id', 'player1_name', 'player2_id', 'player2_name',
+              'total_matches', 'wins_player1', 'wins_player2')
+PREDICTION_FIELDS = ('player1_id', 'player1_name', 'player2_id', 'player2_name',
+                     'model_a', 'model_b', 'final_prediction', 'model_weights')
+
+class ApiError(Exception):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+def _dumps(payload) -> str:
+    return json.dumps(payload, separators=(',', ':'))
+
+def _json(payload, status: int = 200) -> Response:
+    return Response(_dumps(payload), status, mimetype='application/json')
+
+def _fields(allowed) -> tuple:
+    """Keys requested with ``fields=a,b``, or all of ``allowed``"""
+    raw = request.args.get('fields', '').strip()
+    if not raw:
+        return allowed
+    fields = tuple(dict.fromkeys(f.strip() for f in raw.split(',') if f.strip()))
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise ApiError(f"Unknown fields: {', '.join(unknown)}; "
+                       f"choose from {', '.join(allowed)}")
+    return fields
+
+def _select(item: dict, fields) -> dict:
+    return {f: item[f] for f in fields}
+
+def _int_arg(name: str, default=None, minimum: int = 0, maximum: int = None):
+    raw = request.args.get(name)
+    if raw is None or raw == '':
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ApiError(f"{name} must be an integer")
+    if value < minimum or (maximum is not None and value > maximum):
+        bounds = f"{minimum}..{maximum}" if maximum is not None else f">= {minimum}"
+        raise ApiError(f"{name} must be {bounds}")
+    return value
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def _compress(response: Response) -> Response:
+    response.vary.add('Accept-Encoding')
+    if (response.status_code != 200 or not request.accept_encodings['gzip']
+            or 'Content-Encoding' in response.headers):
+        return response
+    if response.is_streamed:
+        response.response = _gzip_chunks(response.response)
+        response.headers.pop('Content-Length', None)
+    elif response.content_length and response.content_length >= _GZIP_MIN_BYTES:
+        response.set_data(gzip.compress(response.get_data(), compresslevel=6))
+    else:
+        return response
+    response.headers['Content-Encoding'] = 'gzip'
+    etag, _ = response.get_etag()
+    if etag:
+        # Same content, different bytes
+        response.set_etag(etag, weak=True)
+    return response
+
+def create_api(processor, predictor, response_cache) -> Blueprint:
+    api = Blueprint('api', __name__, url_prefix='/api/v1')
+    api.after_request(_compress)
+
+    @api.errorhandler(ApiError)
+    def api_error(e):
+        return _json({'error': str(e)}, e.status)
+
+    @api.route('/ladder')
+    @response_cache.cached()
+    def ladder():
+        fields = _fields(LADDER_FIELDS)
+        limit = _int_arg('limit', 50, minimum=1, maximum=1000)
+        start = _int_arg('cursor', 0)
+        players = processor.get_ladder()
+        page = [{
+            'rank': rank,
+            'player_id': p.player_id,
+            'name': p.name,
+            'mu': p.mu,
+            'sigma': p.sigma,
+            'conservative': p.mu - 3 * p.sigma
+        } for rank, p in enumerate(players[start:start + limit], start=start + 1)]
+        end = start + limit
+        return _json({
+            'total': len(players),
+            'players': [_select(row, fields) for row in page],
+            'next_cursor': end if end < len(players) else None
+        })
+
+    @api.route('/players/<int:player_id>')
+    @response_cache.cached()
+    def player(player_id):
+        fields = _fields(PLAYER_FIELDS)
+        try:
+            stats = processor.get_player_stats(player_id)
+        except ValueError as e:
+            raise ApiError(str(e), 404)
+        p = stats['player']
+        recent = processor.get_player_recent_matches(player_id, limit=5)
+        return _json(_select({
+            'player_id': p.player_id,
+            'name': p.name,
+            'mu': p.mu,
+            'sigma': p.sigma,
+            'conservative': p.mu - 3 * p.sigma,
+            'last_updated': str(p.last_updated),
+            'peak_mu': stats['peak_rating'],
+            'played': stats['total_matches'],
+            'wins': stats['wins'],
+            'losses': stats['losses'],
+            'form': ''.join(m['result'] for m in recent),
+            'victim': stats['victim'],
+            'nemesis': stats['nemesis']
+        }, fields))
+
+    @api.route('/players/<int:player_id>/history')
+    @response_cache.cached(store=False)
+    def history(player_id):
+        fields = _fields(HISTORY_FIELDS)
+        limit = _int_arg('limit', minimum=1)
+        try:
+            rows = processor.iter_rating_history(player_id, after=_int_arg('cursor'))
+        except ValueError as e:
+            raise ApiError(str(e), 404)
+
+        def generate():
+            yield f'{{"player_id":{player_id},"history":['
+            taken = itertools.islice(rows, limit) if limit else rows
+            last = None
+            while True:
+                chunk = list(itertools.islice(taken, _STREAM_ROWS))
+                if not chunk:
+                    break
+                body = _dumps([_select(row, fields) for row in chunk])[1:-1]
+                yield body if last is None else ',' + body
+                last = chunk[-1]['match_id']
+            # A further row means there is another page
+            more = limit and last is not None and next(rows, None) is not None
+            yield f'],"next_cursor":{_dumps(last if more else None)}}}'
+
+        return Response(generate(), mimetype='application/json')
+
+    @api.route('/h2h/<int:player1_id>/<int:player2_id>')
+    @response_cache.cached()
+    def head_to_head(player1_id, player2_id):
+        fields = _fields(H2H_FIELDS)
+        try:
+            p1, p2 = processor.ratings.get_many((player1_id, player2_id))
+        except ValueError as e:
+            raise ApiError(str(e), 404)
+        h2h = processor.get_head_to_head(player1_id, player2_id)
+        return _json(_select({**h2h, 'player1_name': p1.name, 'player2_name': p2.name}, fields))
+
+    @api.route('/predict')
+    @response_cache.cached()
+    def predict():
+        fields = _fields(PREDICTION_FIELDS)
+        player1_id = _int_arg('player1')
+        player2_id = _int_arg('player2')
+        if player1_id is None or player2_id is None:
+            raise ApiError("Pass ?player1=<id>&player2=<id>")
+        try:
+            prediction = predictor.predict_win_probability(player1_id, player2_id)
+        except ValueError as e:
+            raise ApiError(str(e), 404)
+        return _json(_select(prediction, fields))
+
+    return api
@@ -3,19 +3,29 @@ import sys
 import os
 import sqlite3
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
-from database.db_handler import get_rankings, get_recent_matches
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, jsonify
+from database.db_handler import get_rankings
 from core.match_processor import MatchProcessor
 from core.prediction_model import EnhancedPredictor
+from gui.response_cache import ResponseCache
+from gui.api import create_api
+from datetime import date
 processor = MatchProcessor(DB_FILE)
 predictor = EnhancedPredictor(DB_FILE)
+response_cache = ResponseCache(processor.db_handler.data_version)
 
 app = Flask(__name__, template_folder="templates", static_folder="static")
 app.secret_key = "tung-tung-tung-sahur"
+app.register_blueprint(create_api(processor, predictor, response_cache))
+# Comment line sent to idle /events streams so proxies keep them open
+EVENTS_KEEPALIVE_SECONDS = 15
+# Rating charts are downsampled to this many points server-side
+CHART_MAX_POINTS = 500
 
 @app.route("/")
+@response_cache.cached()
 def index():
-    trueskill_table = get_rankings()
+    trueskill_table = get_rankings(db_handler=processor.db_handler)
     wlt_table_raw = processor.get_win_loss_table()
     delta_map = {}
     current_season = processor.get_current_season()
@@ -65,6 +75,7 @@ def players():
     return render_template("players.html")
 
 @app.route("/predict")
+@response_cache.cached()
 def predict():
     players = processor.get_all_players()
 
@@ -89,11 +100,11 @@ def predict():
 
     if p1_id:
         player1 = build_player_summary(p1_id)
-        p1_history = processor.get_unified_rating_history(p1_id)
+        p1_history = processor.get_unified_rating_history(p1_id, max_points=CHART_MAX_POINTS)
 
     if p2_id:
         player2 = build_player_summary(p2_id)
-        p2_history = processor.get_unified_rating_history(p2_id)
+        p2_history = processor.get_unified_rating_history(p2_id, max_points=CHART_MAX_POINTS)
 
     if player1 and player2:
         h2h = processor.get_head_to_head(player1["id"], player2["id"])
@@ -131,23 +142,32 @@ def predict():
 
 
 @app.route("/matches", methods=["GET"])
+@response_cache.cached()
 def matches():
-    page = int(request.args.get("page", 1))
-    per_page = 10
-    all_matches = get_recent_matches()
-    start = (page - 1) * per_page
-    end = start + per_page
-    paginated_matches = all_matches[start:end]
-
-    total_pages = (len(all_matches) + per_page - 1) // per_page
+    player_id = request.args.get("player", type=int)
+    season = request.args.get("season", type=int)
+    page = processor.get_matches_page(
+        before=request.args.get("before", type=int),
+        after=request.args.get("after", type=int),
+        limit=10,
+        player_id=player_id,
+        season=season
+    )
     
     # Get players for the add match modal
     players = processor.get_all_players()
+
+    # Only the filters in use, carried over to the paging links
+    filters = {name: value for name, value in (("player", player_id), ("season", season))
+               if value is not None}
     
     return render_template("matches.html",
-                           matches=paginated_matches,
-                           page=page,
-                           total_pages=total_pages,
+                           matches=page["matches"],
+                           newer=page["newer"],
+                           older=page["older"],
+                           total=page["total"],
+                           filters=filters,
+                           seasons=processor.get_available_seasons(),
                            players=players)  # Pass players to the template
 
 
@@ -155,11 +175,12 @@ def get_initials(full_name):
     return ''.join([part[0].upper() for part in full_name.split()])
 
 @app.route('/player/<int:player_id>')
+@response_cache.cached()
 def player_profile(player_id):
     try:
         # Get stats from your CLI function
         stats = processor.get_player_stats(player_id)
-        rating_history = processor.get_rating_history(player_id)
+        rating_history = processor.get_rating_history(player_id, max_points=CHART_MAX_POINTS)
         p = stats['player']  # This is already a Player object from DB
         recent_matches = processor.get_player_recent_matches(player_id, limit=5)
 
@@ -200,6 +221,7 @@ def submit_match():
             player2_id = int(request.form["player2"])
             score1 = int(request.form["score1"])
             score2 = int(request.form["score2"])
+            played_at = request.form.get("played_at") or None
 
             print("🎯 Submitted form:", {
                 "player1_id": player1_id,
@@ -213,7 +235,8 @@ def submit_match():
                 return redirect(url_for("matches"))  # Changed: redirect to matches
 
             # Call your working record_match
-            match = processor.record_match(player1_id, player2_id, score1, score2)
+            match = processor.record_match(player1_id, player2_id, score1, score2,
+                                           played_at=played_at)
 
             flash(f"✅ Match {match.match_id} recorded!", "success")
             return redirect(url_for("matches"))
@@ -253,7 +276,23 @@ def delete_match():
     # Always redirect back to matches page
     return redirect(url_for("matches"))
 
+@app.route("/edit-match", methods=["POST"])
+def edit_match():
+    try:
+        match_id = int(request.form["match_id"])
+        score1 = int(request.form["score1"])
+        score2 = int(request.form["score2"])
+        processor.edit_match(match_id, score1, score2)
+        flash(f"✅ Match {match_id} updated to {score1}-{score2}!", "success")
+    except (KeyError, ValueError) as ve:
+        flash(f"Error: {ve}", "danger")
+    except Exception as e:
+        flash(f"An unexpected error occurred while editing: {e}", "danger")
+
+    return redirect(url_for("matches"))
+
 @app.route("/weekly-wrapped")
+@response_cache.cached(vary=date.today)
 def weekly_wrapped():
     from datetime import datetime, timedelta
     
@@ -274,7 +313,36 @@ def weekly_wrapped():
                          summary=summary,
                          date_range=date_range)
 
+@app.route("/events")
+def events():
+    """Server-sent match and rating changes for live dashboards"""
+    feed = processor.live_feed
+    last_id = request.headers.get("Last-Event-ID", type=int)
+
+    def stream():
+        backlog, after = feed.subscribe(last_id)
+        try:
+            yield "retry: 5000\n\n" + "".join(backlog)
+            while True:
+                messages, after = feed.wait(after, EVENTS_KEEPALIVE_SECONDS)
+                yield "".join(messages) if messages else ": keepalive\n\n"
+        finally:
+            feed.unsubscribe()
+
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/stats")
+def stats():
+    return jsonify({
+        "connection_pool": processor.db_handler.pool_stats(),
+        "win_matrix": processor.win_matrix.stats,
+        "live_feed": processor.live_feed.stats,
+        "response_cache": {**response_cache.stats, "hit_ratio": response_cache.hit_ratio()}
+    })
+
 @app.route("/get_season_ladder/<int:season_id>")
+@response_cache.cached()
 def get_season_ladder(season_id):
     try:
         ladder = processor.get_season_ladder(season_id)
@@ -287,6 +355,45 @@ def get_season_ladder(season_id):
         return jsonify(ladder_data)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+@app.route("/ladder_as_of")
+@response_cache.cached()
+def ladder_as_of():
+    when = request.args.get("at", "").strip()
+    if not when:
+        return jsonify({"error": "Pass ?at=<match id, date or timestamp>"}), 400
+    try:
+        ladder = processor.get_ladder_as_of(int(when) if when.isdigit() else when)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify([{
+        "name": p.name,
+        "mu": round(p.mu, 2),
+        "sigma": round(p.sigma, 2),
+        "conservative": round(p.mu - 3 * p.sigma, 2)
+    } for p in ladder])
+
+@app.route("/predict_many", methods=["POST"])
+def predict_many():
+    body = request.get_json(silent=True) or {}
+    pairs = body.get("pairs")
+    if not isinstance(pairs, list) or not all(
+            isinstance(pair, list) and len(pair) == 2 for pair in pairs):
+        return jsonify({"error": 'Send {"pairs": [[id1, id2], ...]}'}), 400
+    try:
+        return jsonify(predictor.predict_many(pairs))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route("/win_matrix")
+@response_cache.cached()
+def win_matrix():
+    data = processor.get_win_probability_matrix()
+    return jsonify({
+        "player_ids": data["player_ids"],
+        "names": data["names"],
+        "matrix": data["matrix"].round(4).tolist()
+    })
     
 
 if __name__ == "__main__":
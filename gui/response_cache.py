@@ -0,0 +1,91 @@
+# gui/response_cache.py
+"""Rendered responses cached until the data changes.
+
+Entries are keyed on the database's ``data_version``, which every committed
+write advances, so nothing is ever served stale and no view needs to
+invalidate anything. Responses carry an ETag built from the same version;
+a matching If-None-Match gets a 304 without running the view.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import make_response, request
+
+class ResponseCache:
+    def __init__(self, data_version, capacity: int = 256):
+        self.data_version = data_version
+        self.capacity = capacity
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Changes the ETags on restart, when templates may have changed
+        self._boot = format(int(time.time()), 'x')
+        self.stats = {'hits': 0, 'misses': 0, 'not_modified': 0}
+
+    def cached(self, vary=None, store: bool = True):
+        """Cache a GET view's 200 responses per path and query string.
+
+        ``vary`` returns anything else the page depends on, such as today's
+        date for pages built around the current week. With ``store=False``
+        (streamed responses) only the ETag and 304 handling apply.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                version = self.data_version()
+                key = (request.path, tuple(sorted(request.args.items(multi=True))),
+                       vary() if vary else None)
+                digest = hashlib.blake2b(repr(key).encode('utf-8'), digest_size=6).hexdigest()
+                etag = f"{self._boot}-{version}-{digest}"
+
+                # Weak comparison, as for any If-None-Match: compressed
+                # variants carry the same tag marked weak
+                if request.if_none_match.contains_weak(etag):
+                    self._count('not_modified')
+                    return self._finish(make_response('', 304), etag)
+
+                with self._lock:
+                    if version != self.version:
+                        # Versions only grow, so older entries can never hit again
+                        self._entries.clear()
+                        self.version = version
+                    entry = self._entries.get(key)
+                    if entry is not None:
+                        self._entries.move_to_end(key)
+                        self.stats['hits'] += 1
+                if entry is not None:
+                    body, mimetype = entry
+                    return self._finish(make_response(body, 200, {'Content-Type': mimetype}), etag)
+
+                self._count('misses')
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                if not store:
+                    return self._finish(response, etag)
+                with self._lock:
+                    if self.version == version:
+                        self._entries[key] = (response.get_data(), response.content_type)
+                        while len(self._entries) > self.capacity:
+                            self._entries.popitem(last=False)
+                return self._finish(response, etag)
+            return wrapper
+        return decorator
+
+    def hit_ratio(self) -> float:
+        served = self.stats['hits'] + self.stats['not_modified']
+        lookups = served + self.stats['misses']
+        return served / lookups if lookups else 0.0
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    @staticmethod
+    def _finish(response, etag: str):
+        response.set_etag(etag)
+        # Browsers keep the page but revalidate it on every visit
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
@@ -1,8 +1,12 @@
+import csv
+import io
+import json
 import sqlite3
 import unittest
 from datetime import datetime
 from database.db_handler import DatabaseHandler
 from core.match_processor import MatchProcessor
+from core.trueskill_setup import TrueSkillSystem
 
 class TestCore(unittest.TestCase):
     def setUp(self):
@@ -17,6 +21,7 @@ class TestCore(unittest.TestCase):
     def tearDown(self):
         # Clear data but keep tables
         with self.processor.db_handler.connection() as conn:
+            conn.execute('DELETE FROM ratings_history')
             conn.execute('DELETE FROM players')
             conn.execute('DELETE FROM matches')
             conn.execute('DELETE FROM matchups')
@@ -61,5 +66,748 @@ class TestCore(unittest.TestCase):
             self.assertEqual(row[0], 1)  # wins_a
             self.assertEqual(row[1], 0)  # wins_b
 
+    def test_nested_connections_are_shared(self):
+        """Nested blocks reuse the outer connection and its transaction"""
+        handler = self.processor.db_handler
+        before = handler.pool_stats()
+        with handler.connection() as outer:
+            with handler.connection() as inner:
+                self.assertIs(inner, outer)
+        with handler.connection() as again:
+            self.assertIs(again, outer)
+
+        stats = handler.pool_stats()
+        self.assertEqual(stats['nested'] - before['nested'], 1)
+        self.assertEqual(stats['misses'], before['misses'])
+
+    def test_participants_follow_record_and_delete(self):
+        """match_participants mirrors matches and feeds the per-player stats"""
+        a = self.processor.add_player("Alice").player_id
+        b = self.processor.add_player("Bob").player_id
+        self.processor.record_match(a, b, 11, 4)
+        second = self.processor.record_match(b, a, 11, 9)
+        self.processor.record_match(a, b, 11, 2)
+        self.processor.delete_match(second.match_id)
+
+        with self.processor.db_handler.connection() as conn:
+            rows = conn.execute('''
+                SELECT player_id, opponent_id, won, points_for, points_against
+                FROM match_participants ORDER BY match_id, player_id
+            ''').fetchall()
+        self.assertEqual(rows, [(a, b, 1, 11, 4), (b, a, 0, 4, 11), (a, b, 1, 11, 2), (b, a, 0, 2, 11)])
+
+        stats = self.processor.get_player_stats(b)
+        self.assertEqual((stats['total_matches'], stats['wins'], stats['losses']), (2, 0, 2))
+        table = {row['name']: row for row in self.processor.get_win_loss_table()}
+        self.assertEqual((table['Alice']['wins'], table['Alice']['losses']), (2, 0))
+
+    def test_rankings_include_recent_form(self):
+        """get_rankings returns every player with their last N results"""
+        from database.db_handler import get_rankings
+        a = self.processor.add_player("Alice").player_id
+        b = self.processor.add_player("Bob").player_id
+        idle = self.processor.add_player("Idle").player_id
+        for s1, s2 in [(11, 3), (4, 11), (11, 8), (11, 6)]:
+            self.processor.record_match(a, b, s1, s2)
+
+        rankings = {p['id']: p for p in get_rankings(form_length=3, db_handler=self.processor.db_handler)}
+        self.assertEqual(rankings[a]['form'], ['W', 'W', 'L'])
+        self.assertEqual(rankings[b]['form'], ['L', 'L', 'W'])
+        self.assertEqual(rankings[idle]['form'], [])
+        ranked = get_rankings(form_length=0, db_handler=self.processor.db_handler)
+        self.assertEqual([p['form'] for p in ranked], [[], [], []])
+
+    def _ratings(self):
+        with self.processor.db_handler.connection() as conn:
+            players = conn.execute('SELECT player_id, mu, sigma FROM players ORDER BY player_id').fetchall()
+            history = conn.execute('''
+                SELECT match_id, player_id, mu, sigma FROM ratings_history
+                ORDER BY match_id, player_id
+            ''').fetchall()
+        return players, history
+
+    def test_delete_match_matches_full_replay(self):
+        """Incremental replay after a delete must equal a full recompute"""
+        ids = [self.processor.add_player(f"Player {i}").player_id for i in range(4)]
+        results = [(0, 1), (2, 3), (1, 2), (0, 3), (3, 1), (2, 0), (1, 0), (3, 2)]
+        matches = [self.processor.record_match(ids[a], ids[b], 11, 7) for a, b in results]
+
+        self.processor.delete_match(matches[2].match_id)
+        incremental = self._ratings()
+
+        with self.processor.db_handler.connection() as conn:
+            self.processor._recalculate_all_ratings(conn)
+        self.assertEqual(incremental, self._ratings())
+
+    def test_rebuild_ratings_reproduces_history(self):
+        """A full rebuild reproduces what record_match wrote"""
+        ids = [self.processor.add_player(f"Player {i}").player_id for i in range(3)]
+        for a, b in [(0, 1), (1, 2), (2, 0), (0, 1)]:
+            self.processor.record_match(ids[a], ids[b], 11, 9)
+        before = self._ratings()
+
+        stats = self.processor.rebuild_ratings()
+        self.assertEqual(stats.matches, 4)
+        self.assertEqual(before, self._ratings())
+
+    def test_replay_stops_at_recorded_history(self):
+        """Re-rating any match unchanged rewrites nothing after it"""
+        ids = [self.processor.add_player(f"Player {i}").player_id for i in range(6)]
+        for n in range(60):
+            a, b = ids[n % 6], ids[(n * 7 + 1) % 6]
+            if a != b:
+                self.processor.record_match(a, b, 11, n % 10)
+        before = self._ratings()
+        snapshots = {}
+        for match_id, pid, mu, sigma in before[1]:
+            snapshots.setdefault(match_id, {})[pid] = (mu, sigma)
+
+        with self.processor.db_handler.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT match_id, timestamp, player1_id, player2_id FROM matches')
+            for match_id, timestamp, p1, p2 in cursor.fetchall():
+                rated = self.processor.trueskill.rate_values(
+                    snapshots[match_id][p1], snapshots[match_id][p2], 1)
+                seed = dict(zip((p1, p2), rated))
+                changed = set(seed)
+                self.assertTrue(self.processor.replayer.replay_from(cursor, timestamp, match_id,
+                                                                    seed, changed))
+                self.assertEqual(changed, {p1, p2})
+        self.assertEqual(before, self._ratings())
+
+    def test_season_stats_follow_record_and_delete(self):
+        """Aggregates kept on write agree with a rebuild from scratch"""
+        ids = [self.processor.add_player(f"Player {i}").player_id for i in range(3)]
+        results = [(0, 1), (0, 2), (1, 0), (0, 2), (2, 1), (0, 1)]
+        matches = [self.processor.record_match(ids[a], ids[b], 11, 6) for a, b in results]
+        self.assertEqual(self.processor.verify_aggregates(), [])
+
+        self.processor.delete_match(matches[2].match_id)
+        self.assertEqual(self.processor.verify_aggregates(), [])
+
+        stats = self.processor.get_player_stats(ids[0])
+        self.assertEqual((stats['total_matches'], stats['wins'], stats['losses']), (4, 4, 0))
+        with self.processor.db_handler.connection() as conn:
+            streak = conn.execute('''
+                SELECT current_streak FROM player_season_stats WHERE player_id = ?
+            ''', (ids[0],)).fetchone()[0]
+        self.assertEqual(streak, 4)
+
+    def test_import_matches(self):
+        """Bulk import keeps timestamps, creates players and resumes"""
+        rows = [
+            {'player1': 'Ann', 'player2': 'Bob', 'score1': '11', 'score2': '4',
+             'timestamp': '2024-03-02T10:00:00'},
+            {'player1': 'Bob', 'player2': 'Cat', 'score1': 11, 'score2': 9,
+             'timestamp': '2024-03-01 09:30:00'},
+            {'player1': 'Cat', 'player2': 'Ann', 'score1': 7, 'score2': 11,
+             'timestamp': '2024-03-03 18:15:00', 'season': 1},
+        ]
+        with self.processor.db_handler.connection() as conn:
+            conn.execute("INSERT INTO system_settings (key, value) VALUES ('import_checkpoint:t', '1')")
+
+        stats = self.processor.import_matches(rows, chunk_size=1, checkpoint='t')
+        self.assertEqual((stats.matches, stats.skipped, stats.players_created), (2, 1, 3))
+
+        with self.processor.db_handler.connection() as conn:
+            imported = conn.execute('SELECT timestamp, season FROM matches ORDER BY match_id').fetchall()
+            history = conn.execute('SELECT COUNT(*) FROM ratings_history').fetchone()[0]
+            checkpoint = conn.execute(
+                "SELECT value FROM system_settings WHERE key = 'import_checkpoint:t'").fetchone()
+        self.assertEqual(imported[0][0], '2024-03-01 09:30:00')
+        self.assertEqual(imported[1], ('2024-03-03 18:15:00', 1))
+        self.assertEqual(history, 4)
+        self.assertIsNone(checkpoint)
+
+    def test_failed_import_rates_committed_chunks(self):
+        """Chunks committed before a bad row are rated, now or on the next start"""
+        rows = [
+            {'player1': 'Ann', 'player2': 'Bob', 'score1': 11, 'score2': 4},
+            {'player1': 'Bob', 'player2': 'Ann', 'score1': 11, 'score2': 9},
+            {'player1': 'Ann', 'player2': 'Bob', 'score1': 5, 'score2': 5},
+        ]
+        with self.assertRaises(ValueError):
+            self.processor.import_matches(rows, chunk_size=1)
+
+        def pending():
+            with self.processor.db_handler.connection() as conn:
+                return conn.execute(
+                    "SELECT COUNT(*) FROM system_settings WHERE key = 'ratings_replay_pending'").fetchone()[0]
+
+        imported = self._ratings()
+        self.assertEqual(len(imported[1]), 4)
+        self.assertEqual(pending(), 0)
+        self.processor.rebuild_ratings()
+        self.assertEqual(imported, self._ratings())
+
+        # A crash between the chunks and the replay leaves the marker behind
+        with self.processor.db_handler.connection() as conn:
+            conn.execute('DELETE FROM ratings_history')
+            conn.execute('UPDATE players SET mu = 25.0, sigma = 25.0 / 3')
+            conn.execute("INSERT INTO system_settings (key, value) VALUES ('ratings_replay_pending', '1')")
+        MatchProcessor(db_name='file:testing?mode=memory&cache=shared')
+        self.assertEqual(imported, self._ratings())
+        self.assertEqual(pending(), 0)
+        self.assertEqual(self.processor.verify_aggregates(), [])
+
+    def test_export_formats_agree(self):
+        """CSV, JSONL and columnar exports carry the same rows"""
+        from core.match_export import read_columnar
+        ids = [self.processor.add_player(f"Player {i}").player_id for i in range(3)]
+        matches = [self.processor.record_match(ids[a], ids[b], 11, 8)
+                   for a, b in [(0, 1), (1, 2), (2, 0), (0, 2)]]
+        since = matches[1].match_id
+
+        csv_out, jsonl_out, binary_out = io.StringIO(), io.StringIO(), io.BytesIO()
+        self.processor.export('ratings_history', csv_out, 'csv', batch_size=3)
+        self.processor.export('ratings_history', jsonl_out, 'jsonl', batch_size=3)
+        count = self.processor.export('ratings_history', binary_out, 'columnar', batch_size=3)
+        self.assertEqual(count, 8)
+
+        binary_out.seek(0)
+        columnar = [dict(zip(names, row)) for names, rows in read_columnar(binary_out) for row in rows]
+        jsonl = [json.loads(line) for line in jsonl_out.getvalue().splitlines()]
+        csv_rows = list(csv.DictReader(io.StringIO(csv_out.getvalue())))
+        self.assertEqual(columnar, jsonl)
+        self.assertEqual([int(r['match_id']) for r in csv_rows], [r['match_id'] for r in jsonl])
+
+        # since is only accepted where rows are never rewritten
+        matches_out = io.StringIO()
+        self.assertEqual(self.processor.export('matches', matches_out, 'jsonl', since), 2)
+        self.assertTrue(all(json.loads(line)['match_id'] > since
+                            for line in matches_out.getvalue().splitlines()))
+        with self.assertRaises(ValueError):
+            self.processor.export('ratings_history', io.StringIO(), 'csv', since)
+
+    def test_season_ratings_track_writes(self):
+        """Maintained season ratings stay equal to a fresh replay of the season"""
+        ids = [self.processor.add_player(f"Player {i}").player_id for i in range(4)]
+        first = self.processor.record_match(ids[0], ids[1], 11, 5)
+        with self.processor.db_handler.connection() as conn:
+            season = conn.execute('SELECT season FROM matches WHERE match_id = ?',
+                                  (first.match_id,)).fetchone()[0]
+
+        def fresh():
+            with self.processor.db_handler.connection() as conn:
+                ratings = self.processor.replayer.season_ratings(conn.cursor(), season)
+            return {pid: ratings.get(pid, (25.0, 25.0 / 3)) for pid in ids}
+
+        def cached():
+            return {p.player_id: (p.mu, p.sigma) for p in self.processor.get_season_ladder(season)}
+
+        self.assertEqual(cached(), fresh())
+        for a, b in [(1, 2), (2, 3), (3, 0)]:
+            self.processor.record_match(ids[a], ids[b], 11, 9)
+        self.assertEqual(cached(), fresh())
+
+        self.processor.delete_match(first.match_id)
+        with self.processor.db_handler.connection() as conn:
+            state = conn.execute('SELECT COUNT(*) FROM season_ratings_state WHERE season = ?',
+                                 (season,)).fetchone()[0]
+        self.assertEqual(state, 0)
+        self.assertEqual(cached(), fresh())
+
+    def test_season_ladder_read_keeps_data_version(self):
+        """Building season ratings on a read is a cache fill, not a write"""
+        a = self.processor.add_player("Alice").player_id
+        b = self.processor.add_player("Bob").player_id
+        self.processor.record_match(a, b, 11, 5)
+        with self.processor.db_handler.connection() as conn:
+            season = conn.execute('SELECT season FROM matches').fetchone()[0]
+            conn.execute('DELETE FROM season_ratings_state')
+            conn.execute('DELETE FROM season_ratings')
+
+        version = self.processor.db_handler.data_version()
+        self.assertEqual(len(self.processor.get_season_ladder(season)), 2)
+        self.assertEqual(self.processor.db_handler.data_version(), version)
+        with self.processor.db_handler.connection() as conn:
+            built = conn.execute('SELECT COUNT(*) FROM season_ratings_state WHERE season = ?',
+                                 (season,)).fetchone()[0]
+        self.assertEqual(built, 1)
+
+    def test_new_season_seeds_ratings_lazily(self):
+        """A new season has no rows until its players record a match"""
+        a = self.processor.add_player("Alice").player_id
+        b = self.processor.add_player("Bob").player_id
+        self.processor.add_player("Idle")
+        self.processor.record_match(a, b, 11, 3)
+        previous = self.processor.get_current_season()
+        season = self.processor.start_new_season()
+        try:
+            self.processor.record_match(b, a, 11, 7)
+            with self.processor.db_handler.connection() as conn:
+                rows = conn.execute('''
+                    SELECT player_id, matches FROM season_ratings WHERE season = ? ORDER BY player_id
+                ''', (season,)).fetchall()
+            self.assertEqual(rows, [(a, 1), (b, 1)])
+
+            ladder = self.processor.get_season_ladder(season)
+            self.assertEqual(ladder[0].player_id, b)
+            self.assertEqual(len(ladder), 3)
+        finally:
+            with self.processor.db_handler.connection() as conn:
+                conn.execute("UPDATE system_settings SET value = ? WHERE key = 'current_season'", (previous,))
+
+    def test_new_season_with_imported_matches_is_replayed(self):
+        """Starting a season that already holds matches doesn't hide them"""
+        previous = self.processor.get_current_season()
+        with self.processor.db_handler.connection() as conn:
+            upcoming = self.processor._get_current_season(conn.cursor()) + 1
+        self.processor.import_matches([{'player1': 'Ann', 'player2': 'Bob', 'score1': 11,
+                                        'score2': 4, 'season': upcoming}])
+        try:
+            self.assertEqual(self.processor.start_new_season(), upcoming)
+            ladder = self.processor.get_season_ladder(upcoming)
+            self.assertEqual(ladder[0].name, 'Ann')
+            self.assertGreater(ladder[0].mu, 25.0)
+        finally:
+            with self.processor.db_handler.connection() as conn:
+                conn.execute("UPDATE system_settings SET value = ? WHERE key = 'current_season'", (previous,))
+
+    def test_ladder_as_of_matches_prefix_replay(self):
+        """Historical ladders equal a replay of the matches up to that point"""
+        ids = [self.processor.add_player(f"Player {i}").player_id for i in range(4)]
+        results = [(0, 1), (2, 3), (1, 2), (3, 0), (1, 3), (0, 2)]
+        matches = []
+        for a, b in results:
+            match = self.processor.record_match(ids[a], ids[b], 11, 5)
+            matches.append((match.match_id, ids[a], ids[b], 11, 5))
+
+        for n in (2, 5):
+            expected = self.processor.replayer.replay(matches[:n])
+            ladder = self.processor.get_ladder_as_of(matches[n - 1][0])
+            self.assertEqual({p.player_id: (p.mu, p.sigma) for p in ladder if p.player_id in expected},
+                             expected)
+
+        before = self.processor.get_ladder_as_of('2000-01-01')
+        self.assertTrue(all(p.mu == 25.0 for p in before))
+
+    def test_edit_match_matches_full_replay(self):
+        """Score corrections re-rate in place and agree with a full recompute"""
+        ids = [self.processor.add_player(f"Player {i}").player_id for i in range(4)]
+        results = [(0, 1), (2, 3), (1, 2), (0, 3), (3, 1), (2, 0)]
+        matches = [self.processor.record_match(ids[a], ids[b], 11, 7) for a, b in results]
+
+        before = self._ratings()
+        self.processor.get_ladder()
+        reloads = self.processor.ratings.stats['reloads']
+        self.processor.edit_match(matches[2].match_id, 11, 9)
+        self.assertEqual(before, self._ratings())
+        self.processor.get_ladder()
+        self.assertEqual(self.processor.ratings.stats['reloads'], reloads)
+
+        self.processor.edit_match(matches[2].match_id, 8, 11)
+        edited = self._ratings()
+        self.assertNotEqual(before, edited)
+        self.assertEqual(self.processor.verify_aggregates(), [])
+        h2h = self.processor.get_head_to_head(ids[1], ids[2])
+        self.assertEqual((h2h['total_matches'], h2h['wins_player1'], h2h['wins_player2']), (1, 0, 1))
+
+        with self.processor.db_handler.connection() as conn:
+            self.processor._recalculate_all_ratings(conn)
+        self.assertEqual(edited, self._ratings())
+
+    def test_backdated_match_matches_full_replay(self):
+        """A late entry is rated in place and agrees with a full recompute"""
+        ids = [self.processor.add_player(f"Player {i}").player_id for i in range(4)]
+        for a, b in [(0, 1), (2, 3), (1, 2), (0, 3), (3, 1)]:
+            self.processor.record_match(ids[a], ids[b], 11, 7)
+
+        late = self.processor.record_match(ids[2], ids[0], 11, 4, played_at='2001-05-06T14:30:00')
+        self.assertEqual(late.timestamp, '2001-05-06 14:30:00')
+        with self.processor.db_handler.connection() as conn:
+            first = conn.execute('''
+                SELECT match_id FROM matches ORDER BY timestamp, match_id LIMIT 1
+            ''').fetchone()[0]
+        self.assertEqual(first, late.match_id)
+
+        backdated = self._ratings()
+        self.assertEqual(self.processor.verify_aggregates(), [])
+        with self.processor.db_handler.connection() as conn:
+            self.processor._recalculate_all_ratings(conn)
+        self.assertEqual(backdated, self._ratings())
+
+    def test_future_match_is_rejected(self):
+        """Only the present or the past can be recorded, keeping replay order"""
+        a, b, c = (self.processor.add_player(name).player_id for name in ("A", "B", "C"))
+        self.processor.record_match(a, b, 11, 5)
+        with self.assertRaises(ValueError):
+            self.processor.record_match(a, c, 11, 5, played_at='2099-01-01')
+        self.processor.record_match(c, a, 11, 5)
+        self.processor.record_match(b, a, 11, 5)
+
+        with self.processor.db_handler.connection() as conn:
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM matches').fetchone()[0], 3)
+        recorded = self._ratings()
+        self.assertEqual(self.processor.verify_aggregates(), [])
+        self.processor.rebuild_ratings()
+        self.assertEqual(recorded, self._ratings())
+
+    def test_recent_played_at_joins_current_season(self):
+        """A played_at after every match belongs to the current season"""
+        from datetime import timedelta, timezone
+        a = self.processor.add_player("Alice").player_id
+        b = self.processor.add_player("Bob").player_id
+        self.processor.record_match(a, b, 11, 5, played_at='2001-01-01 10:00:00')
+        previous = self.processor.get_current_season()
+        season = self.processor.start_new_season()
+        try:
+            just_now = datetime.now(timezone.utc) - timedelta(seconds=1)
+            match = self.processor.record_match(b, a, 11, 5, played_at=just_now)
+            with self.processor.db_handler.connection() as conn:
+                stored = conn.execute('SELECT season FROM matches WHERE match_id = ?',
+                                      (match.match_id,)).fetchone()[0]
+            self.assertEqual(stored, season)
+            ladder = {p.player_id: p.mu for p in self.processor.get_season_ladder(season)}
+            self.assertGreater(ladder[b], ladder[a])
+        finally:
+            with self.processor.db_handler.connection() as conn:
+                conn.execute("UPDATE system_settings SET value = ? WHERE key = 'current_season'", (previous,))
+
+        with self.assertRaises(ValueError):
+            self.processor.import_matches([{'player1': 'Alice', 'player2': 'Bob', 'score1': 11,
+                                            'score2': 5, 'timestamp': '2099-01-01'}])
+
+    def test_rating_store_stays_coherent(self):
+        """Cached ratings follow write-through, foreign writes and rollbacks"""
+        store = self.processor.ratings
+        ids = [self.processor.add_player(f"Player {i}").player_id for i in range(3)]
+        self.processor.get_ladder()
+
+        reloads = store.stats['reloads']
+        self.processor.record_match(ids[0], ids[1], 11, 5)
+        self.processor.record_match(ids[2], ids[0], 11, 9, played_at='2001-01-01 00:00:00')
+        cached = sorted((p.player_id, p.mu, p.sigma) for p in self.processor.get_ladder())
+        self.assertEqual(store.stats['reloads'], reloads)
+        self.assertEqual(cached, self._ratings()[0])
+
+        # A write that bypasses the store, as another process would make
+        with self.processor.db_handler.connection() as conn:
+            conn.execute('UPDATE players SET mu = 40 WHERE player_id = ?', (ids[1],))
+        self.assertEqual(store.get(ids[1]).mu, 40)
+        self.assertEqual(store.stats['reloads'], reloads + 1)
+
+        with self.assertRaises(ValueError):
+            with self.processor.db_handler.connection() as conn:
+                self.processor.record_match(ids[0], ids[2], 11, 3)
+                raise ValueError("abort")
+        stored = {pid: mu for pid, mu, _ in self._ratings()[0]}
+        self.assertEqual(store.get(ids[0]).mu, stored[ids[0]])
+
+    def test_win_matrix_updates_incrementally(self):
+        """Patched rows and columns equal a full rebuild and single predictions"""
+        import numpy as np
+        from core.win_matrix import WinProbabilityMatrix
+        ids = [self.processor.add_player(f"Player {i}").player_id for i in range(5)]
+        self.processor.record_match(ids[0], ids[1], 11, 4)
+        self.processor.get_win_probability_matrix()
+
+        stats = dict(self.processor.win_matrix.stats)
+        self.processor.record_match(ids[3], ids[2], 11, 8)
+        data = self.processor.get_win_probability_matrix()
+        self.assertEqual(self.processor.win_matrix.stats['updates'], stats['updates'] + 1)
+        self.assertEqual(self.processor.win_matrix.stats['builds'], stats['builds'])
+
+        fresh = WinProbabilityMatrix(self.processor.ratings, self.processor.trueskill_env.beta).get()
+        np.testing.assert_array_equal(data['matrix'], fresh['matrix'])
+        i, j = data['player_ids'].index(ids[3]), data['player_ids'].index(ids[0])
+        prediction = self.processor.predict_win_probability(ids[3], ids[0])
+        self.assertEqual(data['matrix'][i][j], prediction['player1_win_prob'])
+
+    def test_predict_many_matches_single_predictions(self):
+        """Batch predictions equal predict_win_probability pair by pair"""
+        from core.prediction_model import EnhancedPredictor
+        predictor = EnhancedPredictor(self.processor.db_handler.db_name)
+        ids = [self.processor.add_player(f"Player {i}").player_id for i in range(4)]
+        for a, b in [(0, 1), (0, 1), (1, 0), (2, 0), (0, 2), (1, 2), (0, 1)]:
+            self.processor.record_match(ids[a], ids[b], 11, 6)
+
+        pairs = [(a, b) for a in ids for b in ids if a != b]
+        self.assertEqual(predictor.predict_many(pairs),
+                         [predictor.predict_win_probability(a, b) for a, b in pairs])
+        with self.assertRaises(ValueError):
+            predictor.predict_many([(ids[0], 10**9)])
+
+    def test_features_follow_writes(self):
+        """Feature rows survive every write path and the cache follows them"""
+        from core.player_features import FeatureCache
+        ids = [self.processor.add_player(f"Player {i}").player_id for i in range(3)]
+        matches = [self.processor.record_match(ids[a], ids[b], 11, 6)
+                   for a, b in [(0, 1), (1, 0), (0, 2), (2, 1), (0, 1)]]
+        self.processor.delete_match(matches[1].match_id)
+        self.processor.edit_match(matches[3].match_id, 5, 11)
+        self.processor.record_match(ids[2], ids[0], 11, 3, played_at='2001-01-01 00:00:00')
+        self.assertEqual(self.processor.rebuild_features(write=False), [])
+
+        cache = self.processor.features
+        first = cache.get_many(ids)
+        self.assertEqual(first[ids[0]].recent, '1110')
+        self.assertEqual(first[ids[0]].h2h[ids[1]], (2, 2))
+        self.assertEqual((first[ids[1]].played, first[ids[1]].wins), (3, 1))
+
+        self.processor.record_match(ids[1], ids[2], 11, 9)
+        misses = cache.stats['misses']
+        after = cache.get_many(ids)
+        self.assertEqual(cache.stats['misses'], misses + 2)
+        self.assertEqual(after, FeatureCache(self.processor.db_handler).get_many(ids))
+        self.assertEqual(after[ids[1]].recent, '1010')
+
+    def test_backtest_uses_only_prior_matches(self):
+        """Walk-forward scores equal predicting each match before recording it"""
+        import math
+        from core.prediction_model import EnhancedPredictor
+        predictor = EnhancedPredictor(self.processor.db_handler.db_name)
+        ids = [self.processor.add_player(f"Player {i}").player_id for i in range(4)]
+        results = [(0, 1, 11, 5), (2, 3, 7, 11), (0, 2, 11, 9), (1, 3, 11, 4), (3, 0, 11, 8),
+                   (1, 2, 6, 11), (0, 1, 11, 2), (2, 0, 11, 7), (3, 1, 9, 11), (0, 3, 11, 3)]
+        losses = {'model_a': 0.0, 'model_b': 0.0, 'blend': 0.0}
+        for a, b, s1, s2 in results:
+            prediction = predictor.predict_win_probability(ids[a], ids[b])
+            won = s1 > s2
+            for name, key in [('model_a', 'model_a'), ('model_b', 'model_b'), ('blend', 'final_prediction')]:
+                losses[name] -= math.log(prediction[key] if won else 1 - prediction[key])
+            self.processor.record_match(ids[a], ids[b], s1, s2)
+
+        report = self.processor.backtest(batch_size=3)
+        self.assertEqual(report.matches, len(results))
+        for name, loss in losses.items():
+            self.assertAlmostEqual(report.models[name].log_loss, loss / len(results), places=12)
+        blend = report.models['blend']
+        self.assertEqual(sum(count for _, _, count, _, _ in blend.calibration), len(results))
+        self.assertAlmostEqual(dict(report.weight_sweep)[0.5], blend.log_loss, places=12)
+
+    def test_response_cache_follows_data_version(self):
+        """Pages are reused and revalidated until a write changes the data"""
+        from flask import Flask
+        from gui.response_cache import ResponseCache
+        app = Flask(__name__)
+        cache = ResponseCache(self.processor.db_handler.data_version)
+        calls = []
+
+        @app.route('/ladder')
+        @cache.cached()
+        def ladder():
+            calls.append(1)
+            return ','.join(p.name for p in self.processor.get_ladder())
+
+        a = self.processor.add_player("Alice").player_id
+        b = self.processor.add_player("Bob").player_id
+        client = app.test_client()
+        first = client.get('/ladder')
+        second = client.get('/ladder')
+        self.assertEqual((len(calls), second.data), (1, first.data))
+        self.assertEqual(second.headers['ETag'], first.headers['ETag'])
+        self.assertEqual(client.get('/ladder', headers={'If-None-Match': first.headers['ETag']}).status_code, 304)
+        self.assertNotEqual(client.get('/ladder?page=2').headers['ETag'], first.headers['ETag'])
+
+        self.processor.record_match(b, a, 11, 3)
+        fresh = client.get('/ladder', headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual((fresh.status_code, fresh.data), (200, b'Bob,Alice'))
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(cache.stats, {'hits': 1, 'misses': 3, 'not_modified': 1})
+
+    def test_match_pages_walk_history_by_keyset(self):
+        """Cursors visit every match once in both directions, with filters"""
+        ids = [self.processor.add_player(f"Player {i}").player_id for i in range(3)]
+        matches = [self.processor.record_match(ids[i % 3], ids[(i + 1) % 3], 11, 7).match_id
+                   for i in range(7)]
+
+        def walk(**filters):
+            seen, before = [], None
+            while True:
+                page = self.processor.get_matches_page(before=before, limit=3, **filters)
+                seen.extend(m['match_id'] for m in page['matches'])
+                if page['older'] is None:
+                    return seen, page
+                before = page['older']
+
+        seen, last = walk()
+        self.assertEqual(seen, matches[::-1])
+        self.assertEqual(last['total'], 7)
+        back = self.processor.get_matches_page(after=last['newer'], limit=3)
+        self.assertEqual([m['match_id'] for m in back['matches']], matches[3:0:-1])
+
+        seen, last = walk(player_id=ids[0])
+        self.assertEqual(seen, [m for i, m in enumerate(matches) if i % 3 != 1][::-1])
+        self.assertEqual(last['total'], len(seen))
+        season = self.processor.get_current_season()
+        self.assertEqual(walk(player_id=ids[0], season=season)[0], seen)
+        self.assertEqual(self.processor.get_matches_page(season=season + 1000)['matches'], [])
+
+    def test_api_pages_ladder_and_streams_history(self):
+        """/api/v1 pages by cursor, selects fields and gzips streamed histories"""
+        import gzip
+        from flask import Flask
+        from core.prediction_model import EnhancedPredictor
+        from gui.api import create_api
+        from gui.response_cache import ResponseCache
+        app = Flask(__name__)
+        app.register_blueprint(create_api(
+            self.processor, EnhancedPredictor(self.processor.db_handler.db_name),
+            ResponseCache(self.processor.db_handler.data_version)))
+        client = app.test_client()
+
+        ids = [self.processor.add_player(f"Player {i}").player_id for i in range(3)]
+        matches = [self.processor.record_match(ids[0], ids[1 + i % 2], 11, 5).match_id
+                   for i in range(5)]
+
+        first = client.get('/api/v1/ladder?limit=2&fields=rank,player_id').get_json()
+        self.assertEqual(first['players'][0], {'rank': 1, 'player_id': ids[0]})
+        rest = client.get(f"/api/v1/ladder?limit=2&cursor={first['next_cursor']}").get_json()
+        self.assertEqual(([p['rank'] for p in rest['players']], rest['next_cursor']), ([3], None))
+        self.assertEqual(client.get('/api/v1/ladder?fields=elo').status_code, 400)
+
+        page = client.get(f'/api/v1/players/{ids[0]}/history?limit=3&fields=match_id').get_json()
+        self.assertEqual(page['history'], [{'match_id': m} for m in matches[:3]])
+        page = client.get(f"/api/v1/players/{ids[0]}/history?limit=3&cursor={page['next_cursor']}")
+        self.assertEqual(([r['match_id'] for r in page.get_json()['history']],
+                          page.get_json()['next_cursor']), (matches[3:], None))
+
+        full = client.get(f'/api/v1/players/{ids[0]}/history', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(full.headers['Content-Encoding'], 'gzip')
+        history = json.loads(gzip.decompress(full.get_data()))['history']
+        self.assertEqual(history, list(self.processor.iter_rating_history(ids[0])))
+        revalidated = client.get(f'/api/v1/players/{ids[0]}/history',
+                                 headers={'If-None-Match': full.headers['ETag']})
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(client.get('/api/v1/players/999/history').status_code, 404)
+
+    def test_live_feed_publishes_once_per_commit(self):
+        """Each write becomes one rendered event shared by every viewer"""
+        from core.live_feed import LiveFeed
+        feed = self.processor.live_feed = LiveFeed(self.processor.ratings, poll_seconds=0)
+        a = self.processor.add_player("Alice").player_id
+        b = self.processor.add_player("Bob").player_id
+        c = self.processor.add_player("Cara").player_id
+        self.processor.record_match(a, b, 11, 4)
+        self.assertEqual(feed.stats['published'], 0)   # nobody watching yet
+
+        def data(message):
+            return json.loads(message.split('data: ', 1)[1])
+
+        viewers = [feed.subscribe() for _ in range(3)]
+        match = self.processor.record_match(b, c, 11, 9)
+        received = [feed.wait(after, 0) for _, after in viewers]
+        self.assertEqual(feed.stats['published'], 1)
+        self.assertTrue(all(messages == received[0][0] for messages, _ in received))
+        event = data(received[0][0][0])
+        self.assertIn('event: match_recorded', received[0][0][0])
+        self.assertEqual(event['match']['match_id'], match.match_id)
+        from database.db_handler import get_rankings
+        ladder = [p['id'] for p in get_rankings(db_handler=self.processor.db_handler)]
+        self.assertEqual({r['player_id']: r['rank'] for r in event['ratings']},
+                         {b: ladder.index(b) + 1, c: ladder.index(c) + 1})
+        self.assertEqual(event['form'], {str(b): 'WL', str(c): 'L'})
+
+        after = received[0][1]
+        self.processor.delete_match(match.match_id)
+        messages, after = feed.wait(after, 0)
+        event = data(messages[0])
+        self.assertEqual(event['match'], {'match_id': match.match_id})
+        self.assertEqual(event['form'], {str(b): 'L', str(c): ''})
+        self.assertEqual({r['player_id']: r['previous_rank'] for r in event['ratings']},
+                         {b: ladder.index(b) + 1, c: ladder.index(c) + 1})
+
+        # A write without the hook is found by polling data_version
+        with self.processor.db_handler.connection() as conn:
+            conn.execute('UPDATE players SET mu = mu + 1 WHERE player_id = ?', (a,))
+        messages, _ = feed.wait(after, 0)
+        self.assertIn('event: ratings_changed', messages[0])
+        self.assertEqual([r['player_id'] for r in data(messages[0])['ratings']], [a])
+
+        # Reconnecting viewers catch up, or are told to reload
+        self.assertEqual(len(feed.subscribe(after - 1)[0]), 2)
+        self.assertIn('event: refresh', feed.subscribe(after + 100)[0][0])
+
+    def test_rating_histories_downsample_keeping_extremes(self):
+        """max_points bounds chart series but keeps the ends, peak and trough"""
+        import numpy as np
+        from core.downsample import downsample
+        a = self.processor.add_player("Alice").player_id
+        b = self.processor.add_player("Bob").player_id
+        c = self.processor.add_player("Cara").player_id
+        for i in range(40):
+            winner, loser = (a, b) if i % 5 else (b, c)
+            self.processor.record_match(winner, loser, 11, 5)
+
+        full = self.processor.get_unified_rating_history(c)
+        self.assertEqual(len(full), 40)
+        for method in ('lttb', 'min_max'):
+            for history, key in ((self.processor.get_unified_rating_history(c, 10, method), 'global_match_num'),
+                                 (self.processor.get_rating_history(a, 10, method), 'match_num')):
+                self.assertLessEqual(len(history), 10)
+                numbers = [point[key] for point in history]
+                self.assertEqual(numbers, sorted(set(numbers)))
+            sampled = self.processor.get_unified_rating_history(c, 10, method)
+            self.assertEqual((sampled[0], sampled[-1]), (full[0], full[-1]))
+            self.assertEqual(max(p['mu'] for p in sampled), max(p['mu'] for p in full))
+            self.assertEqual(min(p['mu'] for p in sampled), min(p['mu'] for p in full))
+
+        y = np.sin(np.linspace(0, 20, 1000)) + np.linspace(0, 1, 1000)
+        self.assertEqual(downsample(np.arange(5), y[:5], 10).tolist(), [0, 1, 2, 3, 4])
+        # Trough and peak next to each other, inside one bucket
+        spike = np.zeros(1000)
+        spike[500], spike[501] = -5, 5
+        for points in (4, 100):
+            picked = downsample(np.arange(1000), spike, points).tolist()
+            self.assertEqual(len(picked), points)
+            self.assertEqual(picked, sorted(set(picked)))
+            self.assertIn(500, picked)
+            self.assertIn(501, picked)
+        with self.assertRaises(ValueError):
+            downsample(np.arange(1000), y, 3)
+        with self.assertRaises(ValueError):
+            downsample(np.arange(1000), y, 100, 'mean')
+
+class TestMigrations(unittest.TestCase):
+    def test_upgrades_legacy_schema(self):
+        """Pre-season files get the season column, indexes and a version"""
+        from database.migrations import SCHEMA_VERSION, get_version, migrate
+        conn = sqlite3.connect(':memory:')
+        conn.execute('''
+            CREATE TABLE matches (
+                match_id INTEGER PRIMARY KEY,
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                player1_id INTEGER, player2_id INTEGER,
+                player1_score INTEGER, player2_score INTEGER
+            )
+        ''')
+        conn.execute('INSERT INTO matches (player1_id, player2_id, player1_score, player2_score) VALUES (1, 2, 11, 5)')
+
+        self.assertEqual(migrate(conn), SCHEMA_VERSION)
+        self.assertEqual(get_version(conn), SCHEMA_VERSION)
+        self.assertEqual(conn.execute('SELECT season FROM matches').fetchone(), (1,))
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        self.assertIn('idx_matches_player1', indexes)
+        self.assertEqual(conn.execute('''
+            SELECT player_id, played, wins, current_streak FROM player_season_stats ORDER BY player_id
+        ''').fetchall(), [(1, 1, 1, 1), (2, 1, 0, -1)])
+        self.assertEqual(conn.execute('SELECT player_id, recent FROM player_features ORDER BY player_id')
+                         .fetchall(), [(1, '1'), (2, '0')])
+        self.assertEqual(migrate(conn), SCHEMA_VERSION)
+
+class TestTrueSkillKernel(unittest.TestCase):
+    def test_kernel_matches_library(self):
+        """Closed-form kernel agrees with trueskill.rate_1vs1 to 1e-9"""
+        import numpy as np
+        from trueskill import Rating, rate_1vs1
+        from core.trueskill_kernel import rate_1vs1 as rate_scalar, rate_1vs1_batch
+        TrueSkillSystem()  # draw_probability=0 on the global environment
+
+        rng = np.random.default_rng(0)
+        inputs = np.column_stack([
+            rng.uniform(0, 50, 500), rng.uniform(0.5, 8.4, 500),
+            rng.uniform(0, 50, 500), rng.uniform(0.5, 8.4, 500),
+        ])
+        expected = []
+        for w_mu, w_sigma, l_mu, l_sigma in inputs:
+            winner, loser = rate_1vs1(Rating(w_mu, w_sigma), Rating(l_mu, l_sigma))
+            expected.append((winner.mu, winner.sigma, loser.mu, loser.sigma))
+            np.testing.assert_allclose(rate_scalar(w_mu, w_sigma, l_mu, l_sigma),
+                                       expected[-1], rtol=0, atol=1e-9)
+
+        batch = np.column_stack(rate_1vs1_batch(*inputs.T))
+        np.testing.assert_allclose(batch, expected, rtol=0, atol=1e-9)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file